@@ -1,27 +1,43 @@
 import html
 import logging
 import re
+from functools import partial
 
+import aiohttp
 import voluptuous as vol
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import llm
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.util.json import JsonObjectType
 
-from .cache import SQLiteCache
+from .cache import EMPTY_RESULT_MAX_AGE, SQLiteCache, error_max_age
 from .const import (
     CONF_BRAVE_API_KEY,
+    CONF_BRAVE_CACHE_MAX_AGE,
     CONF_BRAVE_COUNTRY_CODE,
+    CONF_BRAVE_FILLER_WORDS,
     CONF_BRAVE_LATITUDE,
     CONF_BRAVE_LONGITUDE,
+    CONF_BRAVE_MAX_RETRIES,
+    CONF_BRAVE_NORMALISE_QUERY,
     CONF_BRAVE_NUM_RESULTS,
     CONF_BRAVE_POST_CODE,
+    CONF_BRAVE_RETRY_DEADLINE,
     CONF_BRAVE_TIMEZONE,
     DOMAIN,
+    SERVICE_DEFAULTS,
 )
+from .http_client import Provider, ProviderClient
+from .metrics import record_lookup, track_tool_call, track_upstream_call
+from .normalise import QueryRules, filler_words, normalise_query
 
 _LOGGER = logging.getLogger(__name__)
 
+PROVIDER = Provider(
+    __name__,
+    "Brave Search",
+    aiohttp.ClientTimeout(total=10, connect=3, sock_read=7),
+)
+
 
 class SearchWebTool(llm.Tool):
     """Tool for searching the web."""
@@ -52,6 +68,7 @@ class SearchWebTool(llm.Tool):
 
         return text
 
+    @track_tool_call
     async def async_call(
         self,
         hass: HomeAssistant,
@@ -63,9 +80,8 @@ class SearchWebTool(llm.Tool):
         entry = next(iter(hass.config_entries.async_entries(DOMAIN)))
         config_data = {**config_data, **entry.options}
 
-        query = tool_input.tool_args["query"]
+        raw_query = tool_input.tool_args["query"]
         use_extra_snippets = True
-        _LOGGER.info("Web search requested for: %s", query)
 
         api_key = config_data.get(CONF_BRAVE_API_KEY)
         num_results = config_data.get(CONF_BRAVE_NUM_RESULTS, 2)
@@ -74,19 +90,48 @@ class SearchWebTool(llm.Tool):
         timezone = config_data.get(CONF_BRAVE_TIMEZONE)
         country_code = config_data.get(CONF_BRAVE_COUNTRY_CODE)
         post_code = config_data.get(CONF_BRAVE_POST_CODE)
+        cache_max_age = config_data.get(
+            CONF_BRAVE_CACHE_MAX_AGE, SERVICE_DEFAULTS.get(CONF_BRAVE_CACHE_MAX_AGE)
+        )
+
+        query = raw_query
+        if config_data.get(
+            CONF_BRAVE_NORMALISE_QUERY, SERVICE_DEFAULTS.get(CONF_BRAVE_NORMALISE_QUERY)
+        ):
+            rules = QueryRules(
+                stopwords=filler_words(
+                    config_data.get(
+                        CONF_BRAVE_FILLER_WORDS,
+                        SERVICE_DEFAULTS.get(CONF_BRAVE_FILLER_WORDS),
+                    )
+                )
+            )
+            query = normalise_query(raw_query, rules)
+        _LOGGER.info("Web search requested for: %s", query)
 
         if not api_key:
             return {"error": "Brave API key not configured"}
 
         try:
-            session = async_get_clientsession(hass)
+            client = ProviderClient(
+                hass,
+                PROVIDER,
+                retries=config_data.get(
+                    CONF_BRAVE_MAX_RETRIES,
+                    SERVICE_DEFAULTS.get(CONF_BRAVE_MAX_RETRIES),
+                ),
+                deadline=config_data.get(
+                    CONF_BRAVE_RETRY_DEADLINE,
+                    SERVICE_DEFAULTS.get(CONF_BRAVE_RETRY_DEADLINE),
+                ),
+            )
             headers = {
                 "Accept": "application/json",
                 "X-Subscription-Token": api_key,
             }
 
             params = {
-                "q": query,
+                "q": raw_query,
                 "count": num_results,
                 "result_filter": "web",
                 "summary": "true",
@@ -111,52 +156,112 @@ class SearchWebTool(llm.Tool):
             if post_code:
                 headers["X-Loc-Postal-Code"] = str(post_code)
 
-            cache = SQLiteCache()
-            cached_response = cache.get(__name__, params)
+            # The normalised query only keys the cache, the search uses it as asked
+            cache_params = {**params, "q": query}
+
+            search = partial(
+                self._async_search,
+                headers=headers,
+                params=params,
+                cache_params=cache_params,
+                use_extra_snippets=use_extra_snippets,
+                cache_max_age=cache_max_age,
+            )
+            fetch = partial(search, client)
+
+            # Refreshes outlive this call, so each gets a client with its own deadline
+            async def refresh() -> JsonObjectType:
+                return await search(client.renewed())
 
+            # Location headers localise results but are not part of params
+            cache = SQLiteCache()
+            await cache.async_set_fingerprint(
+                __name__,
+                {k: v for k, v in headers.items() if k.startswith("X-Loc-")},
+            )
+            cached_response = await cache.async_get(
+                __name__, cache_params, refresh=refresh, query_key="q"
+            )
+
+            record_lookup(
+                __name__,
+                params,
+                normalised=query != raw_query,
+                hit=bool(cached_response),
+            )
             if cached_response:
                 return self.wrap_response(cached_response)
 
-            async with session.get(
-                "https://api.search.brave.com/res/v1/web/search",
-                headers=headers,
-                params=params,
-            ) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    results = []
-                    for result in data.get("web", {}).get("results", []):
-                        title = result.get("title", "")
-                        description = result.get("description", "")
-
-                        # just use the first 2 snippets
-                        extra_snippets = result.get("extra_snippets", [])[0:2]
-
-                        if use_extra_snippets and extra_snippets:
-                            # TODO: would love to filter/sort by relevance
-                            result_content = [
-                                await self.cleanup_text(snippet)
-                                for snippet in extra_snippets
-                            ]
-                        else:
-                            result_content = await self.cleanup_text(description)
-
-                        result = {"title": title, "description": result_content}
-
-                        results.append(result)
-
-                    response = {"results": results if results else "No results found"}
-
-                    if results:
-                        cache.set(__name__, params, response)
-                        return self.wrap_response(response)
-
-                    return response
-                _LOGGER.error(
-                    f"Web search received a HTTP {resp.status} error from Brave"
-                )
-                return {"error": f"Search error: {resp.status}"}
+            return await cache.async_coalesce(__name__, cache_params, fetch)
 
         except Exception as e:
             _LOGGER.error("Web search error: %s", e)
             return {"error": f"Error searching web: {e!s}"}
+
+    @track_upstream_call
+    async def _async_search(
+        self,
+        client: ProviderClient,
+        headers: dict,
+        params: dict,
+        cache_params: dict,
+        *,
+        use_extra_snippets: bool,
+        cache_max_age: int,
+    ) -> JsonObjectType:
+        """Query Brave and cache the results."""
+        cache = SQLiteCache()
+
+        resp = await client.get(
+            "https://api.search.brave.com/res/v1/web/search",
+            headers=headers,
+            params=params,
+        )
+        if resp.status == 200:
+            data = resp.json()
+            results = []
+            for result in data.get("web", {}).get("results", []):
+                title = result.get("title", "")
+                description = result.get("description", "")
+
+                # just use the first 2 snippets
+                extra_snippets = result.get("extra_snippets", [])[0:2]
+
+                if use_extra_snippets and extra_snippets:
+                    # TODO: would love to filter/sort by relevance
+                    result_content = [
+                        await self.cleanup_text(snippet) for snippet in extra_snippets
+                    ]
+                else:
+                    result_content = await self.cleanup_text(description)
+
+                result = {"title": title, "description": result_content}
+
+                results.append(result)
+
+            response = {"results": results if results else "No results found"}
+
+            if results:
+                await cache.async_set(
+                    __name__, cache_params, response, cache_max_age * 60, query_key="q"
+                )
+                return self.wrap_response(response)
+
+            await cache.async_set(
+                __name__,
+                cache_params,
+                response,
+                min(cache_max_age * 60, EMPTY_RESULT_MAX_AGE),
+                allow_stale=False,
+            )
+            return response
+        _LOGGER.error("Web search received a HTTP %s error from Brave", resp.status)
+        response = {"error": f"Search error: {resp.status}"}
+        await cache.async_set(
+            __name__,
+            cache_params,
+            response,
+            min(cache_max_age * 60, error_max_age(resp.status, resp.headers)),
+            allow_stale=False,
+        )
+        return response
@@ -1,26 +1,41 @@
 import logging
+from functools import partial
 
+import aiohttp
 import voluptuous as vol
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import llm
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.util import dt
 from homeassistant.util.json import JsonObjectType
 
-from .cache import SQLiteCache
+from .cache import EMPTY_RESULT_MAX_AGE, SQLiteCache, error_max_age
 from .const import (
     CONF_GOOGLE_PLACES_API_KEY,
+    CONF_GOOGLE_PLACES_CACHE_MAX_AGE,
+    CONF_GOOGLE_PLACES_FILLER_WORDS,
     CONF_GOOGLE_PLACES_LATITUDE,
     CONF_GOOGLE_PLACES_LONGITUDE,
+    CONF_GOOGLE_PLACES_MAX_RETRIES,
+    CONF_GOOGLE_PLACES_NORMALISE_QUERY,
     CONF_GOOGLE_PLACES_NUM_RESULTS,
     CONF_GOOGLE_PLACES_RADIUS,
     CONF_GOOGLE_PLACES_RANKING,
+    CONF_GOOGLE_PLACES_RETRY_DEADLINE,
     DOMAIN,
     SERVICE_DEFAULTS,
 )
+from .http_client import Provider, ProviderClient
+from .metrics import record_lookup, track_tool_call, track_upstream_call
+from .normalise import QueryRules, filler_words, normalise_query
 
 _LOGGER = logging.getLogger(__name__)
 
+PROVIDER = Provider(
+    __name__,
+    "Google Places",
+    aiohttp.ClientTimeout(total=10, connect=3, sock_read=7),
+)
+
 
 class FindPlacesTool(llm.Tool):
     """Tool for finding places."""
@@ -53,6 +68,7 @@ class FindPlacesTool(llm.Tool):
         response["instruction"] = self.response_instruction
         return response
 
+    @track_tool_call
     async def async_call(
         self,
         hass: HomeAssistant,
@@ -64,7 +80,7 @@ class FindPlacesTool(llm.Tool):
         entry = next(iter(hass.config_entries.async_entries(DOMAIN)))
         config_data = {**config_data, **entry.options}
 
-        query = tool_input.tool_args["query"]
+        raw_query = tool_input.tool_args["query"]
 
         api_key = config_data.get(CONF_GOOGLE_PLACES_API_KEY)
         num_results = config_data.get(
@@ -79,14 +95,44 @@ class FindPlacesTool(llm.Tool):
         rank_pref = config_data.get(
             CONF_GOOGLE_PLACES_RANKING, SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_RANKING)
         ).upper()
+        cache_max_age = config_data.get(
+            CONF_GOOGLE_PLACES_CACHE_MAX_AGE,
+            SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_CACHE_MAX_AGE),
+        )
+
+        query = raw_query
+        if config_data.get(
+            CONF_GOOGLE_PLACES_NORMALISE_QUERY,
+            SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_NORMALISE_QUERY),
+        ):
+            rules = QueryRules(
+                stopwords=filler_words(
+                    config_data.get(
+                        CONF_GOOGLE_PLACES_FILLER_WORDS,
+                        SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_FILLER_WORDS),
+                    )
+                )
+            )
+            query = normalise_query(raw_query, rules)
 
         if not api_key:
             return {"error": "Google Places API key not configured"}
 
         try:
-            session = async_get_clientsession(hass)
+            client = ProviderClient(
+                hass,
+                PROVIDER,
+                retries=config_data.get(
+                    CONF_GOOGLE_PLACES_MAX_RETRIES,
+                    SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_MAX_RETRIES),
+                ),
+                deadline=config_data.get(
+                    CONF_GOOGLE_PLACES_RETRY_DEADLINE,
+                    SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_RETRY_DEADLINE),
+                ),
+            )
             params = {
-                "textQuery": query,
+                "textQuery": raw_query,
                 "pageSize": num_results,
             }
 
@@ -104,11 +150,6 @@ class FindPlacesTool(llm.Tool):
                     },
                 }
 
-            cache = SQLiteCache()
-            cached_response = cache.get(__name__, params)
-            if cached_response:
-                return cached_response
-
             field_mask = ",".join(
                 [
                     "places.displayName",
@@ -127,68 +168,127 @@ class FindPlacesTool(llm.Tool):
                 "X-Goog-FieldMask": field_mask,
             }
 
-            async with session.post(
-                "https://places.googleapis.com/v1/places:searchText",
-                json=params,
+            # The normalised query only keys the cache, the search uses it as asked
+            cache_params = {**params, "textQuery": query}
+
+            search = partial(
+                self._async_search,
                 headers=headers,
-            ) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    results = []
-
-                    for place in data.get("places", []):
-                        this_place = {
-                            "name": place.get("displayName", {}).get("text", None),
-                            "address": place.get("shortFormattedAddress", None),
-                            "rating": f"{place.get('rating')} out of 5"
-                            if place.get("rating")
-                            else "Not rated",
-                            "phone": place.get("nationalPhoneNumber", "Not available"),
-                        }
-
-                        opening_hours = place.get("regularOpeningHours")
-                        if opening_hours:
-                            this_place["open_now"] = opening_hours.get("openNow", False)
-                            next_closes = opening_hours.get("nextCloseTime")
-                            next_opens = opening_hours.get("nextOpenTime")
-
-                            if next_closes:
-                                utc_time = dt.parse_datetime(next_closes)
-                                local_time = dt.as_local(utc_time).strftime(
-                                    "%Y-%m-%d %H:%M"
-                                )
-                                this_place["next_closes_at"] = local_time
-
-                            if next_opens:
-                                utc_time = dt.parse_datetime(next_opens)
-                                local_time = dt.as_local(utc_time).strftime(
-                                    "%Y-%m-%d %H:%M"
-                                )
-                                this_place["next_opens_at"] = local_time
-
-                        results.append(this_place)
-
-                    if results:
-                        cache.set(
-                            __name__,
-                            params,
-                            {
-                                "results": results,
-                                "instructions": self.response_directive,
-                            },
-                        )
-
-                    return (
-                        {"results": results, "instruction": self.response_directive}
-                        if results
-                        else {"result": "No places found"}
-                    )
+                params=params,
+                cache_params=cache_params,
+                cache_max_age=cache_max_age,
+            )
+            fetch = partial(search, client)
 
-                _LOGGER.error(
-                    f"Places search received a HTTP {resp.status} error from Google: {await resp.text()}"
-                )
-                return {"error": f"Places search error: {resp.status}"}
+            # Refreshes outlive this call, so each gets a client with its own deadline
+            async def refresh() -> JsonObjectType:
+                return await search(client.renewed())
+
+            cache = SQLiteCache()
+            await cache.async_set_fingerprint(__name__, {"field_mask": field_mask})
+            cached_response = await cache.async_get(
+                __name__, cache_params, refresh=refresh
+            )
+            record_lookup(
+                __name__,
+                params,
+                normalised=query != raw_query,
+                hit=bool(cached_response),
+            )
+            if cached_response:
+                return cached_response
+
+            return await cache.async_coalesce(__name__, cache_params, fetch)
 
         except Exception as e:
             _LOGGER.error("Places search error: %s", e)
             return {"error": f"Error finding places: {e!s}"}
+
+    @track_upstream_call
+    async def _async_search(
+        self,
+        client: ProviderClient,
+        headers: dict,
+        params: dict,
+        cache_params: dict,
+        cache_max_age: int,
+    ) -> JsonObjectType:
+        """Query Google Places and cache the results."""
+        cache = SQLiteCache()
+
+        # Text search only reads, so it is safe to retry despite being a POST
+        resp = await client.post(
+            "https://places.googleapis.com/v1/places:searchText",
+            json=params,
+            headers=headers,
+            idempotent=True,
+        )
+        if resp.status == 200:
+            data = resp.json()
+            results = []
+
+            for place in data.get("places", []):
+                this_place = {
+                    "name": place.get("displayName", {}).get("text", None),
+                    "address": place.get("shortFormattedAddress", None),
+                    "rating": f"{place.get('rating')} out of 5"
+                    if place.get("rating")
+                    else "Not rated",
+                    "phone": place.get("nationalPhoneNumber", "Not available"),
+                }
+
+                opening_hours = place.get("regularOpeningHours")
+                if opening_hours:
+                    this_place["open_now"] = opening_hours.get("openNow", False)
+                    next_closes = opening_hours.get("nextCloseTime")
+                    next_opens = opening_hours.get("nextOpenTime")
+
+                    if next_closes:
+                        utc_time = dt.parse_datetime(next_closes)
+                        local_time = dt.as_local(utc_time).strftime("%Y-%m-%d %H:%M")
+                        this_place["next_closes_at"] = local_time
+
+                    if next_opens:
+                        utc_time = dt.parse_datetime(next_opens)
+                        local_time = dt.as_local(utc_time).strftime("%Y-%m-%d %H:%M")
+                        this_place["next_opens_at"] = local_time
+
+                results.append(this_place)
+
+            if results:
+                await cache.async_set(
+                    __name__,
+                    cache_params,
+                    {
+                        "results": results,
+                        "instructions": self.response_directive,
+                    },
+                    cache_max_age * 60,
+                )
+
+                return {"results": results, "instruction": self.response_directive}
+
+            response = {"result": "No places found"}
+            await cache.async_set(
+                __name__,
+                cache_params,
+                response,
+                min(cache_max_age * 60, EMPTY_RESULT_MAX_AGE),
+                allow_stale=False,
+            )
+            return response
+
+        _LOGGER.error(
+            "Places search received a HTTP %s error from Google: %s",
+            resp.status,
+            resp.text(),
+        )
+        response = {"error": f"Places search error: {resp.status}"}
+        await cache.async_set(
+            __name__,
+            cache_params,
+            response,
+            min(cache_max_age * 60, error_max_age(resp.status, resp.headers)),
+            allow_stale=False,
+        )
+        return response
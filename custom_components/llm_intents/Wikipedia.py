@@ -1,21 +1,50 @@
+import asyncio
 import logging
 import re
 import urllib.parse
+from functools import partial
 
+import aiohttp
 import voluptuous as vol
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import llm
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.util.json import JsonObjectType
 
-from .cache import SQLiteCache
+from .cache import (
+    EMPTY_RESULT_MAX_AGE,
+    SQLiteCache,
+    cache_control_max_age,
+    error_max_age,
+)
 from .const import (
+    CONF_WIKIPEDIA_CACHE_MAX_AGE,
+    CONF_WIKIPEDIA_FILLER_WORDS,
+    CONF_WIKIPEDIA_MAX_RETRIES,
+    CONF_WIKIPEDIA_NORMALISE_QUERY,
     CONF_WIKIPEDIA_NUM_RESULTS,
+    CONF_WIKIPEDIA_RETRIEVAL_MODE,
+    CONF_WIKIPEDIA_RETRY_DEADLINE,
+    CONF_WIKIPEDIA_SUMMARY_CONCURRENCY,
+    CONF_WIKIPEDIA_SUMMARY_TIMEOUT,
     DOMAIN,
+    SERVICE_DEFAULTS,
 )
+from .http_client import Provider, ProviderClient
+from .metrics import record_lookup, track_tool_call, track_upstream_call
+from .normalise import QueryRules, filler_words, normalise_query
 
 _LOGGER = logging.getLogger(__name__)
 
+PROVIDER = Provider(
+    __name__,
+    "Wikipedia",
+    aiohttp.ClientTimeout(total=8, connect=3, sock_read=5),
+)
+
+API_URL = "https://en.wikipedia.org/w/api.php"
+# Article summaries are cached by page for much longer than search results
+ARTICLE_MAX_AGE = 7 * 24 * 60 * 60
+
 
 class SearchWikipediaTool(llm.Tool):
     """Tool for searching Wikipedia."""
@@ -31,6 +60,7 @@ class SearchWikipediaTool(llm.Tool):
         }
     )
 
+    @track_tool_call
     async def async_call(
         self,
         hass: HomeAssistant,
@@ -42,72 +72,398 @@ class SearchWikipediaTool(llm.Tool):
         entry = next(iter(hass.config_entries.async_entries(DOMAIN)))
         config_data = {**config_data, **entry.options}
 
-        query = tool_input.tool_args["query"]
-        _LOGGER.info("Wikipedia search requested for: %s", query)
+        raw_query = tool_input.tool_args["query"]
 
         num_results = config_data.get(CONF_WIKIPEDIA_NUM_RESULTS, 1)
+        cache_max_age = config_data.get(
+            CONF_WIKIPEDIA_CACHE_MAX_AGE,
+            SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_CACHE_MAX_AGE),
+        )
+        summary_concurrency = config_data.get(
+            CONF_WIKIPEDIA_SUMMARY_CONCURRENCY,
+            SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_SUMMARY_CONCURRENCY),
+        )
+        summary_timeout = config_data.get(
+            CONF_WIKIPEDIA_SUMMARY_TIMEOUT,
+            SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_SUMMARY_TIMEOUT),
+        )
+
+        query = raw_query
+        if config_data.get(
+            CONF_WIKIPEDIA_NORMALISE_QUERY,
+            SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_NORMALISE_QUERY),
+        ):
+            rules = QueryRules(
+                stopwords=filler_words(
+                    config_data.get(
+                        CONF_WIKIPEDIA_FILLER_WORDS,
+                        SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_FILLER_WORDS),
+                    )
+                )
+            )
+            query = normalise_query(raw_query, rules)
+        _LOGGER.info("Wikipedia search requested for: %s", query)
 
         try:
-            session = async_get_clientsession(hass)
-
-            # First, search for pages
-            search_params = {
-                "action": "query",
-                "format": "json",
-                "list": "search",
-                "srsearch": query,
-                "srlimit": num_results,
-            }
+            client = ProviderClient(
+                hass,
+                PROVIDER,
+                retries=config_data.get(
+                    CONF_WIKIPEDIA_MAX_RETRIES,
+                    SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_MAX_RETRIES),
+                ),
+                deadline=config_data.get(
+                    CONF_WIKIPEDIA_RETRY_DEADLINE,
+                    SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_RETRY_DEADLINE),
+                ),
+            )
+
+            if (
+                config_data.get(
+                    CONF_WIKIPEDIA_RETRIEVAL_MODE,
+                    SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_RETRIEVAL_MODE),
+                )
+                == "extracts"
+            ):
+                # Search and fetch the introduction of each page in one request
+                query_key = "gsrsearch"
+                search_params = {
+                    "action": "query",
+                    "format": "json",
+                    "formatversion": 2,
+                    "generator": "search",
+                    "gsrsearch": raw_query,
+                    "gsrlimit": num_results,
+                    "prop": "extracts",
+                    "exintro": 1,
+                    "explaintext": 1,
+                    "exlimit": num_results,
+                }
+            else:
+                # First, search for pages
+                query_key = "srsearch"
+                search_params = {
+                    "action": "query",
+                    "format": "json",
+                    "list": "search",
+                    "srsearch": raw_query,
+                    "srlimit": num_results,
+                }
+
+            # The normalised query only keys the cache, the search uses it as asked
+            cache_params = {**search_params, query_key: query}
+
+            search = partial(
+                self._async_search,
+                query=raw_query,
+                search_params=search_params,
+                cache_params=cache_params,
+                query_key=query_key,
+                cache_max_age=cache_max_age,
+                summary_concurrency=summary_concurrency,
+                summary_timeout=summary_timeout,
+            )
+            fetch = partial(search, client)
+
+            # Refreshes outlive this call, so each gets a client with its own deadline
+            async def refresh() -> JsonObjectType:
+                return await search(client.renewed())
 
             cache = SQLiteCache()
-            cached_response = cache.get(__name__, search_params)
+            cached_response = await cache.async_get(
+                __name__, cache_params, refresh=refresh, query_key=query_key
+            )
+            record_lookup(
+                __name__,
+                search_params,
+                normalised=query != raw_query,
+                hit=bool(cached_response),
+            )
             if cached_response:
+                if "articles" in cached_response:
+                    # Only the titles are cached with the search
+                    return await self._async_results(
+                        client,
+                        cached_response["articles"],
+                        {},
+                        use_extracts="generator" in search_params,
+                        cache_max_age=cache_max_age,
+                        summary_concurrency=summary_concurrency,
+                        summary_timeout=summary_timeout,
+                    )
                 return cached_response
 
-            async with session.get(
-                "https://en.wikipedia.org/w/api.php",
-                params=search_params,
-            ) as resp:
-                if resp.status != 200:
-                    _LOGGER.error(
-                        f"Wikipedia search received a HTTP {resp.status} error from Wikipedia"
+            return await cache.async_coalesce(__name__, cache_params, fetch)
+
+        except Exception as e:
+            _LOGGER.error("Wikipedia search error: %s", e)
+            return {"error": f"Error searching Wikipedia: {e!s}"}
+
+    @track_upstream_call
+    async def _async_search(
+        self,
+        client: ProviderClient,
+        query: str,
+        search_params: dict,
+        cache_params: dict,
+        query_key: str,
+        cache_max_age: int,
+        summary_concurrency: int,
+        summary_timeout: int,
+    ) -> JsonObjectType:
+        """Query Wikipedia and cache the results."""
+        cache = SQLiteCache()
+
+        resp = await client.get(API_URL, params=search_params)
+        if resp.status != 200:
+            _LOGGER.error(
+                "Wikipedia search received a HTTP %s error from Wikipedia", resp.status
+            )
+            response = {"error": f"Wikipedia search error: {resp.status}"}
+            await cache.async_set(
+                __name__,
+                cache_params,
+                response,
+                min(cache_max_age * 60, error_max_age(resp.status, resp.headers)),
+                allow_stale=False,
+            )
+            return response
+
+        search_data = resp.json()
+
+        extracts = {}
+        if "generator" in search_params:
+            # Pages come back unordered, with their search rank as the index
+            pages = sorted(
+                search_data.get("query", {}).get("pages", []),
+                key=lambda page: page.get("index", 0),
+            )
+            articles = [_article(page) for page in pages]
+            extracts = await self._async_store_extracts(pages, cache_max_age)
+        else:
+            # Clean HTML tags from snippets
+            articles = [
+                _article(result, re.sub(r"<[^>]+>", "", result.get("snippet", "")))
+                for result in search_data.get("query", {}).get("search", [])
+            ]
+
+        if not articles:
+            response = {"result": f"No Wikipedia articles found for '{query}'"}
+            await cache.async_set(
+                __name__,
+                cache_params,
+                response,
+                min(cache_max_age * 60, EMPTY_RESULT_MAX_AGE),
+                allow_stale=False,
+            )
+            return response
+
+        await cache.async_set(
+            __name__,
+            cache_params,
+            {"articles": articles},
+            cache_max_age * 60,
+            query_key=query_key,
+        )
+
+        return await self._async_results(
+            client,
+            articles,
+            extracts,
+            use_extracts="generator" in search_params,
+            cache_max_age=cache_max_age,
+            summary_concurrency=summary_concurrency,
+            summary_timeout=summary_timeout,
+        )
+
+    async def _async_results(
+        self,
+        client: ProviderClient,
+        articles: list[dict],
+        extracts: dict,
+        *,
+        use_extracts: bool,
+        cache_max_age: int,
+        summary_concurrency: int,
+        summary_timeout: int,
+    ) -> JsonObjectType:
+        """Combine the articles found by a search with their summaries."""
+        if use_extracts:
+            missing = [article for article in articles if article["id"] not in extracts]
+            if missing:
+                extracts = {
+                    **extracts,
+                    **await self._async_extracts(
+                        client, missing, cache_max_age, summary_timeout
+                    ),
+                }
+
+        # Get summaries for articles without an extract, a few at a time
+        semaphore = asyncio.Semaphore(summary_concurrency)
+
+        async def summarise(article: dict) -> dict:
+            extract = extracts.get(article["id"])
+            if not extract:
+                async with semaphore:
+                    extract = await self._async_summary(
+                        client, article, cache_max_age, summary_timeout
                     )
-                    return {"error": f"Wikipedia search error: {resp.status}"}
 
-                search_data = await resp.json()
-                search_results = search_data.get("query", {}).get("search", [])
+            return {"title": article["title"], "summary": extract}
 
-                if not search_results:
-                    return {"result": f"No Wikipedia articles found for '{query}'"}
+        return {"results": await asyncio.gather(*map(summarise, articles))}
 
-                # Get summaries for each result
-                results = []
-                for result in search_results:
-                    title = result.get("title", "")
-                    snippet = result.get("snippet", "")
+    async def _async_extracts(
+        self,
+        client: ProviderClient,
+        articles: list[dict],
+        cache_max_age: int,
+        summary_timeout: int,
+    ) -> dict:
+        """Return the extracts of articles, fetching any not cached in one request."""
+        cache = SQLiteCache()
+        extracts = {}
+        for article in articles:
+            cached = await cache.async_get_entry(
+                __name__, {"article": article["id"]}, count=False
+            )
+            if cached is not None and cached[1]:
+                extracts[article["id"]] = cached[0]["extract"]
 
-                    # Clean HTML tags from snippet
-                    snippet = re.sub(r"<[^>]+>", "", snippet)
+        pageids = [
+            str(article["id"])
+            for article in articles
+            if article["id"] not in extracts and isinstance(article["id"], int)
+        ]
+        if not pageids:
+            return extracts
 
-                    # Try to get full summary
-                    summary_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{urllib.parse.quote(title)}"
-                    try:
-                        async with session.get(summary_url) as summary_resp:
-                            if summary_resp.status == 200:
-                                summary_data = await summary_resp.json()
-                                extract = summary_data.get("extract", snippet)
-                            else:
-                                extract = snippet
-                    except Exception:
-                        extract = snippet
+        params = {
+            "action": "query",
+            "format": "json",
+            "formatversion": 2,
+            "pageids": "|".join(pageids),
+            "prop": "extracts",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": len(pageids),
+        }
+        try:
+            resp = await client.get(
+                API_URL,
+                params=params,
+                request_timeout=_summary_timeout(summary_timeout),
+            )
+            if resp.status != 200:
+                return extracts
+            data = resp.json()
+        except Exception:
+            return extracts
 
-                    results.append({"title": title, "summary": extract})
+        pages = data.get("query", {}).get("pages", [])
+        return {**extracts, **await self._async_store_extracts(pages, cache_max_age)}
 
-                if results:
-                    cache.set(__name__, search_params, {"results": results})
+    async def _async_store_extracts(
+        self, pages: list[dict], cache_max_age: int
+    ) -> dict:
+        """Cache the extract of each page by its id, returning them."""
+        cache = SQLiteCache()
+        extracts = {}
+        for page in pages:
+            if not page.get("extract"):
+                continue
+            article_id = _article(page)["id"]
+            extracts[article_id] = page["extract"]
+            await cache.async_set(
+                __name__,
+                {"article": article_id},
+                {"extract": page["extract"]},
+                ARTICLE_MAX_AGE if cache_max_age else 0,
+            )
+        return extracts
 
-                return {"results": results}
+    async def _async_summary(
+        self,
+        client: ProviderClient,
+        article: dict,
+        cache_max_age: int,
+        summary_timeout: int,
+    ) -> str:
+        """Return an article summary, revalidating a stale cached copy if possible."""
+        cache = SQLiteCache()
+        title, snippet = article["title"], article["snippet"]
+        article_params = {"article": article["id"]}
+        article_max_age = ARTICLE_MAX_AGE if cache_max_age else 0
 
-        except Exception as e:
-            _LOGGER.error("Wikipedia search error: %s", e)
-            return {"error": f"Error searching Wikipedia: {e!s}"}
+        headers = {}
+        # Articles are parts of a search, so only the search counts as a lookup
+        cached = await cache.async_get_entry(__name__, article_params, count=False)
+        if cached is not None:
+            entry, fresh = cached
+            if fresh:
+                return entry["extract"]
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        summary_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{urllib.parse.quote(title)}"
+        try:
+            summary_resp = await client.get(
+                summary_url,
+                headers=headers,
+                request_timeout=_summary_timeout(summary_timeout),
+            )
+            # Wikipedia says how long a summary stays fresh, within our own limit
+            max_age = cache_control_max_age(summary_resp.headers)
+            if max_age is None or max_age > article_max_age:
+                max_age = article_max_age
+
+            if summary_resp.status == 304 and cached is not None:
+                await cache.async_revalidate(
+                    __name__,
+                    article_params,
+                    entry,
+                    max_age,
+                    keep_for=article_max_age,
+                )
+                return entry["extract"]
+
+            if summary_resp.status != 200:
+                return snippet
+
+            summary_data = summary_resp.json()
+            entry = {
+                "extract": summary_data.get("extract", snippet),
+                "etag": summary_resp.headers.get("ETag"),
+                "last_modified": summary_resp.headers.get("Last-Modified"),
+            }
+        except Exception:
+            return snippet
+
+        # Summaries with validators are kept past max_age so they can be revalidated
+        revalidatable = entry["etag"] or entry["last_modified"]
+        await cache.async_set(
+            __name__,
+            article_params,
+            entry,
+            max_age,
+            keep_for=article_max_age if revalidatable else 0,
+        )
+        return entry["extract"]
+
+
+def _article(page: dict, snippet: str = "") -> dict:
+    # Articles are identified by page id, which survives renames, or failing that title.
+    # Generator searches have no snippet, so the title stands in if no summary is found
+    title = page.get("title", "")
+    return {
+        "id": page.get("pageid") or title,
+        "title": title,
+        "snippet": snippet or title,
+    }
+
+
+def _summary_timeout(timeout: int) -> aiohttp.ClientTimeout:
+    # The summary timeout setting caps each request, connecting included
+    return aiohttp.ClientTimeout(total=timeout, connect=PROVIDER.timeout.connect)
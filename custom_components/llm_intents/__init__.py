@@ -5,28 +5,45 @@ __all__ = ["DOMAIN"]
 import logging
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.core import Event, HomeAssistant
 from homeassistant.helpers import config_validation as cv
 
+from .cache import SQLiteCache
 from .const import ADDON_NAME
+from .http_client import async_close_session
 from .llm_functions import cleanup_llm_functions, setup_llm_functions
+from .services import async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
+PLATFORMS = [Platform.SENSOR]
+
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the Tools for Assist integration."""
     hass.data.setdefault(DOMAIN, {})
     _LOGGER.info(f"Setting up {ADDON_NAME} integration")
+    async_setup_services(hass)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Tools for Assist from a config entry."""
     _LOGGER.info(f"Setting up {ADDON_NAME} for entry: %s", entry.entry_id)
+    await SQLiteCache().async_setup(hass, {**entry.data, **entry.options})
+
+    # Entries are not unloaded when Home Assistant stops, so flush the cache then
+    async def _async_close_cache(event: Event) -> None:
+        await SQLiteCache().async_close()
+
+    entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close_cache)
+    )
     await setup_llm_functions(hass, entry.data)
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     _LOGGER.info(f"{ADDON_NAME} functions successfully set up")
     return True
 
@@ -34,6 +51,11 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     _LOGGER.info(f"Unloading {ADDON_NAME} for entry: %s", entry.entry_id)
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+
     await cleanup_llm_functions(hass)
+    await SQLiteCache().async_close()
+    await async_close_session(hass)
     _LOGGER.info(f"{ADDON_NAME} functions successfully unloaded")
     return True
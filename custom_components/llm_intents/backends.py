@@ -0,0 +1,1098 @@
+"""Storage backends for the tool cache."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import time
+import zlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import unquote, urlsplit
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# codec name -> (compress, decompress); the codec is recorded against every entry
+CODECS: dict[str, tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (zlib.compress, zlib.decompress),
+}
+if zstandard is not None:
+    CODECS["zstd"] = (
+        zstandard.ZstdCompressor().compress,
+        zstandard.ZstdDecompressor().decompress,
+    )
+DEFAULT_CODEC = "zstd" if "zstd" in CODECS else "zlib"
+
+BACKEND_SQLITE = "sqlite"
+BACKEND_MEMORY = "memory"
+BACKEND_REDIS = "redis"
+BACKENDS = [BACKEND_SQLITE, BACKEND_MEMORY, BACKEND_REDIS]
+
+# (tool, key, created_at, fresh_until, expires_at, data_json, scope, query), in the
+# argument order of CacheBackend.async_set
+EntryRow = tuple[str, str, int, int, int, str, str | None, str | None]
+
+
+def _decompress(codec: str, data: bytes) -> str | None:
+    if codec not in CODECS:
+        logger.debug("Skipping cache entry stored with unavailable codec %s", codec)
+        return None
+
+    try:
+        return CODECS[codec][1](data).decode()
+    except Exception as e:
+        logger.debug("Failed to decompress cached data: %s", e)
+        return None
+
+
+class CacheBackend(ABC):
+    """
+    Where serialised cache entries are kept.
+
+    Keys are opaque hashes built by the cache from the tool, its config
+    fingerprint and its params, so instances sharing a backend with the same
+    config also share entries. Entries are (data_json, fresh_until, expires_at)
+    rows; expired rows must never be returned.
+    """
+
+    name: str
+    # Shared backends are bounded by the server rather than an eviction policy
+    shared = False
+
+    def __init__(self) -> None:
+        """Start with no tool namespaces recorded."""
+        # tool -> (config fingerprint, generation)
+        self.namespaces: dict[str, tuple[str, int]] = {}
+
+    async def async_open(self):
+        """Connect to the store, loading any persisted namespaces."""
+
+    async def async_close(self):
+        """Flush pending writes and disconnect."""
+
+    async def async_commit(self):
+        """Flush grouped writes, for backends that buffer them."""
+
+    async def async_snapshot(self):
+        """Save an in-memory store to disk, for backends that keep one."""
+
+    async def async_set_namespace(
+        self, tool: str, fingerprint: str, generation: int | None = None
+    ):
+        """Record a tool's config fingerprint, and the generation if restoring one."""
+        self.namespaces[tool] = (fingerprint, generation or 0)
+
+    @abstractmethod
+    async def async_get(self, key: str) -> tuple[str, int, int] | None:
+        """Return the unexpired (data_json, fresh_until, expires_at) for key."""
+
+    @abstractmethod
+    async def async_set(
+        self,
+        tool: str,
+        key: str,
+        created_at: int,
+        fresh_until: int,
+        expires_at: int,
+        data_json: str,
+        scope: str | None = None,
+        query: str | None = None,
+    ) -> list[tuple[str, str]]:
+        """Store an entry, returning the (key, tool) of any entries evicted."""
+
+    @abstractmethod
+    async def async_delete(self, keys: list[str]) -> list[tuple[str, str]]:
+        """Remove the given entries, returning the (key, tool) of those found."""
+
+    @abstractmethod
+    async def async_keys(self) -> list[str]:
+        """Return the key of every stored entry, oldest first."""
+
+    @abstractmethod
+    def async_entries(self) -> AsyncIterator[EntryRow]:
+        """Yield every unexpired entry, oldest first."""
+
+    @abstractmethod
+    async def async_expire(self) -> list[str]:
+        """Remove expired entries, returning their keys."""
+
+    @abstractmethod
+    async def async_clear(self, tool: str | None) -> list[str]:
+        """Remove all entries, or only those of tool, returning their keys."""
+
+    @abstractmethod
+    async def async_usage(self) -> dict[str, tuple[int, int]]:
+        """Return the stored (entries, bytes), keyed by tool."""
+
+    @abstractmethod
+    async def async_similarity_rows(self) -> list[tuple[str, str, str]]:
+        """Return (key, scope, query) for every entry indexed by query."""
+
+
+class MemoryBackend(CacheBackend):
+    """Entries kept in process only, lost on restart."""
+
+    name = BACKEND_MEMORY
+
+    def __init__(self, max_bytes: int) -> None:
+        """Keep entries in memory, evicting any over max_bytes."""
+        super().__init__()
+        self.max_bytes = max_bytes
+        # key -> (tool, created_at, fresh_until, expires_at, data_json, scope, query)
+        self._entries: dict[
+            str, tuple[str, int, int, int, str, str | None, str | None]
+        ] = {}
+        self._bytes = 0
+
+    async def async_get(self, key: str) -> tuple[str, int, int] | None:
+        """Return the unexpired entry for key from memory."""
+        entry = self._entries.get(key)
+        if entry is None or entry[3] <= time.time():
+            return None
+
+        _, _, fresh_until, expires_at, data_json, _, _ = entry
+        return data_json, fresh_until, expires_at
+
+    async def async_set(
+        self,
+        tool: str,
+        key: str,
+        created_at: int,
+        fresh_until: int,
+        expires_at: int,
+        data_json: str,
+        scope: str | None = None,
+        query: str | None = None,
+    ) -> list[tuple[str, str]]:
+        """Store an entry, evicting those closest to expiry over the byte cap."""
+        self._remove(key)
+        self._entries[key] = (
+            tool,
+            created_at,
+            fresh_until,
+            expires_at,
+            data_json,
+            scope,
+            query,
+        )
+        self._bytes += len(data_json)
+
+        if self._bytes <= self.max_bytes:
+            return []
+
+        # Same policy as SQLite: drop entries closest to expiry down to 90%
+        target = int(self.max_bytes * 0.9)
+        evicted = []
+        for evicted_key in sorted(self._entries, key=lambda k: self._entries[k][3]):
+            if self._bytes <= target:
+                break
+            evicted.append((evicted_key, self._entries[evicted_key][0]))
+            self._remove(evicted_key)
+        return evicted
+
+    async def async_delete(self, keys: list[str]) -> list[tuple[str, str]]:
+        """Remove the given entries, returning the (key, tool) of those found."""
+        deleted = [(key, self._entries[key][0]) for key in keys if key in self._entries]
+        for key, _ in deleted:
+            self._remove(key)
+        return deleted
+
+    async def async_keys(self) -> list[str]:
+        """Return every stored key, in the order stored."""
+        return list(self._entries)
+
+    async def async_entries(self) -> AsyncIterator[EntryRow]:
+        """Yield every unexpired entry, in the order stored."""
+        now = time.time()
+        for key, (tool, *row) in list(self._entries.items()):
+            if row[2] > now:
+                yield (tool, key, *row)
+
+    async def async_expire(self) -> list[str]:
+        """Remove expired entries, returning their keys."""
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if entry[3] <= now]
+        for key in expired:
+            self._remove(key)
+        return expired
+
+    async def async_clear(self, tool: str | None) -> list[str]:
+        """Remove all entries, or only those of tool, returning their keys."""
+        deleted = [
+            key
+            for key, entry in self._entries.items()
+            if tool is None or entry[0] == tool
+        ]
+        for key in deleted:
+            self._remove(key)
+        return deleted
+
+    async def async_usage(self) -> dict[str, tuple[int, int]]:
+        """Return the stored (entries, bytes), keyed by tool."""
+        usage: dict[str, tuple[int, int]] = {}
+        for tool, _, _, _, data_json, _, _ in self._entries.values():
+            rows, size = usage.get(tool, (0, 0))
+            usage[tool] = (rows + 1, size + len(data_json))
+        return usage
+
+    async def async_similarity_rows(self) -> list[tuple[str, str, str]]:
+        """Return (key, scope, query) for every entry indexed by query."""
+        return [
+            (key, entry[5], entry[6])
+            for key, entry in self._entries.items()
+            if entry[6] is not None
+        ]
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[4])
+
+
+class SQLiteBackend(CacheBackend):
+    """Entries kept in a local SQLite database."""
+
+    name = BACKEND_SQLITE
+    SCHEMA_VERSION = 8
+    ENTRIES_PAGE_SIZE = 500
+
+    def __init__(
+        self,
+        db_path: str = ":memory:",
+        max_bytes: int = 20 * 1024 * 1024,
+        *,
+        memory_only: bool = False,
+    ) -> None:
+        """Use the database at db_path, held in memory between snapshots if memory_only."""
+        super().__init__()
+        self._db_path = db_path
+        self._conn: sqlite3.Connection | None = None
+        self.max_bytes = max_bytes
+        self.memory_only = memory_only
+        self._db_bytes = 0
+        self._snapshot_changes = 0
+
+        # A single worker thread owns the connection, so all disk I/O happens off
+        # the event loop and statements are naturally serialised.
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="llm_intents_cache"
+        )
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._init_db()
+        return self._conn
+
+    def _init_db(self) -> None:
+        if self._db_path != ":memory:":
+            # ensure folder exists
+            Path(self._db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        if self.memory_only and self._db_path != ":memory:":
+            self._conn = sqlite3.connect(":memory:")
+            self._restore()
+        else:
+            self._conn = sqlite3.connect(self._db_path)
+            if self._db_path != ":memory:":
+                # Appending to a WAL and syncing only at checkpoints keeps SD card
+                # writes down, at the risk of losing the last commit on power loss
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+
+        self._migrate()
+        self._db_bytes = self._total_size()
+        self.namespaces = {
+            tool: (fingerprint, generation)
+            for tool, fingerprint, generation in self._conn.execute(
+                "SELECT tool, fingerprint, generation FROM namespaces"
+            )
+        }
+        self._snapshot_changes = self._conn.total_changes
+
+    def _migrate(self) -> None:
+        conn = self._conn
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == self.SCHEMA_VERSION:
+            return
+
+        # Cached responses are disposable, so any layout change simply rebuilds
+        logger.debug(
+            "Rebuilding cache schema from version %s to %s",
+            version,
+            self.SCHEMA_VERSION,
+        )
+        conn.execute("DROP TABLE IF EXISTS cache")
+        conn.execute("DROP TABLE IF EXISTS namespaces")
+        conn.execute("""
+            CREATE TABLE cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                tool TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                fresh_until INTEGER NOT NULL,
+                expires_at INTEGER NOT NULL,
+                codec TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                scope TEXT,
+                query TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX idx_cache_expires_at ON cache (expires_at)")
+        conn.execute("""
+            CREATE TABLE namespaces (
+                tool TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                generation INTEGER NOT NULL
+            )
+        """)
+        conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        conn.commit()
+
+    def _open(self) -> None:
+        self._connection()
+
+        # Earlier versions kept a throwaway database inside the package directory
+        Path(__file__).resolve().with_name("cache.db").unlink(missing_ok=True)
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._commit()
+            self._snapshot()
+            self._conn.close()
+            self._conn = None
+
+    def _commit(self) -> None:
+        if self._conn is not None and self._conn.in_transaction:
+            self._conn.commit()
+
+    def _restore(self) -> None:
+        if not Path(self._db_path).exists():
+            return
+
+        source = sqlite3.connect(self._db_path)
+        try:
+            source.backup(self._conn)
+        except sqlite3.DatabaseError as e:
+            logger.debug("Failed to restore cache snapshot: %s", e)
+        finally:
+            source.close()
+
+    def _snapshot(self) -> None:
+        if not self.memory_only or self._db_path == ":memory:" or self._conn is None:
+            return
+        if self._conn.total_changes == self._snapshot_changes:
+            return
+
+        self._commit()
+        target = sqlite3.connect(self._db_path)
+        try:
+            self._conn.backup(target)
+        finally:
+            target.close()
+        self._snapshot_changes = self._conn.total_changes
+        logger.debug("Saved cache snapshot to disk")
+
+    def _total_size(self) -> int:
+        row = self._connection().execute("SELECT SUM(size) FROM cache").fetchone()
+        return row[0] or 0
+
+    def _expire(self) -> list[str]:
+        cursor = self._connection().execute(
+            "DELETE FROM cache WHERE expires_at <= ? RETURNING key",
+            (int(time.time()),),
+        )
+        deleted = [key for (key,) in cursor]
+        if deleted:
+            self._db_bytes = self._total_size()
+        return deleted
+
+    def _evict(self) -> list[tuple[str, str]]:
+        # Entries closest to expiry have the least remaining value; trim to 90% of
+        # the cap so that a full cache does not evict on every single write.
+        target = int(self.max_bytes * 0.9)
+        conn = self._connection()
+        evicted = []
+        cursor = conn.execute("SELECT key, tool, size FROM cache ORDER BY expires_at")
+        for key, tool, size in cursor:
+            if self._db_bytes <= target:
+                break
+            evicted.append((key, tool))
+            self._db_bytes -= size
+        cursor.close()
+
+        conn.executemany("DELETE FROM cache WHERE key = ?", [(k,) for k, _ in evicted])
+        logger.debug("Cache size limit reached, evicted %s entries", len(evicted))
+        return evicted
+
+    def _delete(self, keys: list[str]) -> list[tuple[str, str]]:
+        conn = self._connection()
+        deleted = []
+        for key in keys:
+            row = conn.execute(
+                "DELETE FROM cache WHERE key = ? RETURNING tool, size", (key,)
+            ).fetchone()
+            if row is not None:
+                deleted.append((key, row[0]))
+                self._db_bytes -= row[1]
+        return deleted
+
+    def _keys(self) -> list[str]:
+        cursor = self._connection().execute("SELECT key FROM cache ORDER BY id")
+        return [key for (key,) in cursor]
+
+    def _entries_after(self, after_id: int) -> tuple[int, list[EntryRow]]:
+        cursor = self._connection().execute(
+            """
+            SELECT id, tool, key, created_at, fresh_until, expires_at, codec, data,
+                scope, query
+            FROM cache WHERE id > ? AND expires_at > ? ORDER BY id LIMIT ?
+        """,
+            (after_id, int(time.time()), self.ENTRIES_PAGE_SIZE),
+        )
+
+        rows = []
+        for row_id, tool, key, created_at, fresh_until, expires_at, *rest in cursor:
+            codec, data, scope, query = rest
+            after_id = row_id
+            data_json = _decompress(codec, data)
+            if data_json is not None:
+                rows.append(
+                    (
+                        tool,
+                        key,
+                        created_at,
+                        fresh_until,
+                        expires_at,
+                        data_json,
+                        scope,
+                        query,
+                    )
+                )
+        return after_id, rows
+
+    def _clear(self, tool: str | None) -> list[str]:
+        conn = self._connection()
+        if tool is None:
+            cursor = conn.execute("DELETE FROM cache RETURNING key")
+        else:
+            cursor = conn.execute(
+                "DELETE FROM cache WHERE tool = ? RETURNING key", (tool,)
+            )
+        deleted = [key for (key,) in cursor]
+        conn.commit()
+        self._db_bytes = self._total_size()
+        return deleted
+
+    def _usage(self) -> dict[str, tuple[int, int]]:
+        cursor = self._connection().execute(
+            "SELECT tool, COUNT(*), SUM(size) FROM cache GROUP BY tool"
+        )
+        return {tool: (rows, size) for tool, rows, size in cursor}
+
+    def _set_namespace(
+        self, tool: str, fingerprint: str, generation: int | None
+    ) -> None:
+        # Opening the connection loads the stored namespaces, so decide here
+        conn = self._connection()
+        current = self.namespaces.get(tool)
+        if current is not None and current[0] == fingerprint:
+            if generation is None or generation == current[1]:
+                return
+
+        if generation is None:
+            generation = 0 if current is None else current[1] + 1
+            if current is not None:
+                logger.debug(
+                    "Config changed for tool: %s, invalidating its cache", tool
+                )
+
+        self.namespaces[tool] = (fingerprint, generation)
+        conn.execute(
+            """
+            INSERT INTO namespaces (tool, fingerprint, generation) VALUES (?, ?, ?)
+            ON CONFLICT(tool) DO UPDATE SET
+                fingerprint=excluded.fingerprint,
+                generation=excluded.generation
+        """,
+            (tool, fingerprint, generation),
+        )
+
+    def _similarity_rows(self) -> list[tuple[str, str, str]]:
+        cursor = self._connection().execute(
+            "SELECT key, scope, query FROM cache WHERE query IS NOT NULL"
+        )
+        return cursor.fetchall()
+
+    def _get(self, key: str) -> tuple[str, int, int] | None:
+        # Expiry is enforced here; rows are physically removed by the sweeper
+        cursor = self._connection().execute(
+            """
+            SELECT codec, data, fresh_until, expires_at FROM cache
+            WHERE key = ? AND expires_at > ?
+        """,
+            (key, int(time.time())),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        codec, data, fresh_until, expires_at = row
+        data_json = _decompress(codec, data)
+        if data_json is None:
+            return None
+
+        return data_json, fresh_until, expires_at
+
+    def _set(
+        self,
+        tool: str,
+        key: str,
+        created_at: int,
+        fresh_until: int,
+        expires_at: int,
+        data_json: str,
+        scope: str | None = None,
+        query: str | None = None,
+    ) -> list[tuple[str, str]]:
+        data = CODECS[DEFAULT_CODEC][0](data_json.encode())
+        conn = self._connection()
+
+        previous = conn.execute(
+            "SELECT size FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if previous:
+            self._db_bytes -= previous[0]
+
+        conn.execute(
+            """
+            INSERT INTO cache
+                (key, tool, created_at, fresh_until, expires_at, codec, size, data,
+                 scope, query)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                tool=excluded.tool,
+                created_at=excluded.created_at,
+                fresh_until=excluded.fresh_until,
+                expires_at=excluded.expires_at,
+                codec=excluded.codec,
+                size=excluded.size,
+                data=excluded.data,
+                scope=excluded.scope,
+                query=excluded.query
+        """,
+            (
+                key,
+                tool,
+                created_at,
+                fresh_until,
+                expires_at,
+                DEFAULT_CODEC,
+                len(data),
+                data,
+                scope,
+                query,
+            ),
+        )
+        self._db_bytes += len(data)
+
+        if self._db_bytes > self.max_bytes:
+            return self._evict()
+        return []
+
+    async def async_open(self):
+        """Open the database, removing any left by earlier versions."""
+        await self._run(self._open)
+
+    async def async_close(self):
+        """Commit, save any snapshot and close the database."""
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+    async def async_commit(self):
+        """Commit the writes made since the last commit."""
+        await self._run(self._commit)
+
+    async def async_snapshot(self):
+        """Save the in-memory database to disk if it has changed."""
+        await self._run(self._snapshot)
+
+    async def async_set_namespace(
+        self, tool: str, fingerprint: str, generation: int | None = None
+    ):
+        """Record a tool's config fingerprint in the database."""
+        # Generations are persisted, so a changed config orphans old rows for good
+        await self._run(self._set_namespace, tool, fingerprint, generation)
+
+    async def async_get(self, key: str) -> tuple[str, int, int] | None:
+        """Return the unexpired entry for key from the database."""
+        return await self._run(self._get, key)
+
+    async def async_set(
+        self,
+        tool: str,
+        key: str,
+        created_at: int,
+        fresh_until: int,
+        expires_at: int,
+        data_json: str,
+        scope: str | None = None,
+        query: str | None = None,
+    ) -> list[tuple[str, str]]:
+        """Store an entry, returning any evicted to stay under the size cap."""
+        return await self._run(
+            self._set,
+            tool,
+            key,
+            created_at,
+            fresh_until,
+            expires_at,
+            data_json,
+            scope,
+            query,
+        )
+
+    async def async_delete(self, keys: list[str]) -> list[tuple[str, str]]:
+        """Remove the given entries, returning the (key, tool) of those found."""
+        return await self._run(self._delete, keys)
+
+    async def async_keys(self) -> list[str]:
+        """Return every stored key, oldest first."""
+        return await self._run(self._keys)
+
+    async def async_entries(self) -> AsyncIterator[EntryRow]:
+        """Yield every unexpired entry, oldest first."""
+        # Paged by rowid so that a large cache is never loaded all at once
+        after_id = 0
+        while True:
+            last_id, rows = await self._run(self._entries_after, after_id)
+            if last_id == after_id:
+                return
+            after_id = last_id
+            for row in rows:
+                yield row
+
+    async def async_expire(self) -> list[str]:
+        """Remove expired rows, returning their keys."""
+        return await self._run(self._expire)
+
+    async def async_clear(self, tool: str | None) -> list[str]:
+        """Remove all rows, or only those of tool, returning their keys."""
+        return await self._run(self._clear, tool)
+
+    async def async_usage(self) -> dict[str, tuple[int, int]]:
+        """Return the stored (rows, bytes), keyed by tool."""
+        return await self._run(self._usage)
+
+    async def async_similarity_rows(self) -> list[tuple[str, str, str]]:
+        """Return (key, scope, query) for every row indexed by query."""
+        return await self._run(self._similarity_rows)
+
+
+class RedisError(Exception):
+    """An error reply from a Redis server."""
+
+
+# Raised when the server cannot be reached or the connection drops mid-reply
+REDIS_ERRORS = (OSError, EOFError, TimeoutError, RedisError)
+
+
+def _encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            value = arg.encode()
+        elif isinstance(arg, int):
+            value = str(arg).encode()
+        else:
+            value = arg
+        parts.append(b"$%d\r\n%s\r\n" % (len(value), value))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        msg = "Redis connection closed"
+        raise ConnectionError(msg)
+
+    kind, value = line[:1], line[1:-2]
+    if kind == b"+":
+        return value.decode()
+    if kind == b"-":
+        # Returned rather than raised so the rest of a pipeline is still read
+        return RedisError(value.decode())
+    if kind == b":":
+        return int(value)
+    if kind in (b"$", b"*"):
+        # A negative length is a null reply
+        length = int(value)
+        if length < 0:
+            return None
+        if kind == b"$":
+            return (await reader.readexactly(length + 2))[:-2]
+        return [await _read_reply(reader) for _ in range(length)]
+
+    msg = f"Unexpected reply from Redis: {line!r}"
+    raise RedisError(msg)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Entries kept on a Redis-compatible server, shareable between instances.
+
+    The server expires entries itself and its maxmemory policy bounds the size.
+    When it cannot be reached, lookups miss and writes are dropped until it is
+    tried again after RETRY_INTERVAL seconds.
+    """
+
+    name = BACKEND_REDIS
+    shared = True
+    PREFIX = f"{DOMAIN}:"
+    TIMEOUT = 5
+    # Seconds to skip an unreachable server for, rather than wait out TIMEOUT each call
+    RETRY_INTERVAL = 30
+    ENTRIES_BATCH_SIZE = 100
+
+    def __init__(self, url: str) -> None:
+        """Connect to the server at url when first used."""
+        super().__init__()
+        parts = urlsplit(url)
+        self._host = parts.hostname or "localhost"
+        self._port = parts.port or 6379
+        self._ssl = parts.scheme == "rediss"
+        self._username = unquote(parts.username) if parts.username else None
+        self._password = unquote(parts.password) if parts.password else None
+        self._db = int(parts.path.lstrip("/") or 0)
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+        self._available = True
+        self._retry_at = 0.0
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.PREFIX}entry:{key}"
+
+    def _tool_key(self, tool: str) -> str:
+        return f"{self.PREFIX}tool:{tool}"
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(
+            self._host, self._port, ssl=self._ssl or None
+        )
+
+        handshake = []
+        if self._password is not None:
+            handshake.append(
+                ("AUTH", self._username, self._password)
+                if self._username
+                else ("AUTH", self._password)
+            )
+        if self._db:
+            handshake.append(("SELECT", self._db))
+
+        for command in handshake:
+            self._writer.write(_encode_command(*command))
+            reply = await _read_reply(self._reader)
+            if isinstance(reply, RedisError):
+                raise reply
+
+    def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _execute(self, *commands: tuple) -> list[Any]:
+        """Send a pipeline of commands and return their replies in order."""
+        async with self._lock:
+            if not self._available and time.monotonic() < self._retry_at:
+                msg = f"Redis cache at {self._host} is unavailable"
+                raise ConnectionError(msg)
+
+            try:
+                async with asyncio.timeout(self.TIMEOUT):
+                    if self._writer is None:
+                        await self._connect()
+                    self._writer.write(
+                        b"".join(_encode_command(*command) for command in commands)
+                    )
+                    await self._writer.drain()
+                    replies = [await _read_reply(self._reader) for _ in commands]
+            except BaseException as e:
+                # A half-read reply would desynchronise the stream, so start over
+                self._disconnect()
+                if isinstance(e, REDIS_ERRORS):
+                    self._retry_at = time.monotonic() + self.RETRY_INTERVAL
+                    if self._available:
+                        self._available = False
+                        logger.warning(
+                            "Redis cache unavailable at %s: %s", self._host, e
+                        )
+                raise
+
+        if not self._available:
+            self._available = True
+            logger.info("Redis cache available again at %s", self._host)
+
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    async def _members(self, tool: str | None) -> dict[str, list[str]]:
+        # Every tool keeps a set of its keys, as SCAN would walk the whole server
+        if tool is None:
+            (tools,) = await self._execute(("SMEMBERS", f"{self.PREFIX}tools"))
+            tools = [name.decode() for name in tools]
+        else:
+            tools = [tool]
+        if not tools:
+            return {}
+
+        replies = await self._execute(
+            *[("SMEMBERS", self._tool_key(name)) for name in tools]
+        )
+        return {
+            name: [key.decode() for key in keys]
+            for name, keys in zip(tools, replies, strict=True)
+        }
+
+    async def async_close(self):
+        """Close the connection to the server."""
+        async with self._lock:
+            self._disconnect()
+
+    async def async_get(self, key: str) -> tuple[str, int, int] | None:
+        """Return the unexpired entry for key, or None if the server is unreachable."""
+        try:
+            ((codec, data, fresh_until, expires_at),) = await self._execute(
+                (
+                    "HMGET",
+                    self._entry_key(key),
+                    "codec",
+                    "data",
+                    "fresh_until",
+                    "expires_at",
+                )
+            )
+        except REDIS_ERRORS as e:
+            logger.debug("Redis cache lookup failed: %s", e)
+            return None
+
+        if data is None or int(expires_at) <= time.time():
+            return None
+
+        data_json = _decompress(codec.decode(), data)
+        if data_json is None:
+            return None
+
+        return data_json, int(fresh_until), int(expires_at)
+
+    async def async_set(
+        self,
+        tool: str,
+        key: str,
+        created_at: int,
+        fresh_until: int,
+        expires_at: int,
+        data_json: str,
+        scope: str | None = None,
+        query: str | None = None,
+    ) -> list[tuple[str, str]]:
+        """Store an entry for the server to expire, dropping it if unreachable."""
+        data = CODECS[DEFAULT_CODEC][0](data_json.encode())
+        fields = [
+            "tool",
+            tool,
+            "created_at",
+            created_at,
+            "fresh_until",
+            fresh_until,
+            "expires_at",
+            expires_at,
+            "codec",
+            DEFAULT_CODEC,
+            "size",
+            len(data),
+            "data",
+            data,
+        ]
+        if query is not None:
+            fields += ["scope", scope, "query", query]
+
+        entry_key = self._entry_key(key)
+        try:
+            await self._execute(
+                ("DEL", entry_key),
+                ("HSET", entry_key, *fields),
+                ("PEXPIREAT", entry_key, expires_at * 1000),
+                ("SADD", self._tool_key(tool), key),
+                ("SADD", f"{self.PREFIX}tools", tool),
+            )
+        except REDIS_ERRORS as e:
+            logger.debug("Redis cache write failed: %s", e)
+        return []
+
+    async def async_delete(self, keys: list[str]) -> list[tuple[str, str]]:
+        """Remove the given entries, returning the (key, tool) of those found."""
+        if not keys:
+            return []
+
+        deleted = []
+        try:
+            tools = await self._execute(
+                *[("HGET", self._entry_key(key), "tool") for key in keys]
+            )
+            found = [
+                (key, tool.decode())
+                for key, tool in zip(keys, tools, strict=True)
+                if tool is not None
+            ]
+            if found:
+                await self._execute(
+                    *[("DEL", self._entry_key(key)) for key, _ in found],
+                    *[("SREM", self._tool_key(tool), key) for key, tool in found],
+                )
+            deleted = found
+        except REDIS_ERRORS as e:
+            logger.debug("Redis cache delete failed: %s", e)
+        return deleted
+
+    async def async_keys(self) -> list[str]:
+        """Return the key of every entry in the tool sets."""
+        try:
+            members = await self._members(None)
+        except REDIS_ERRORS as e:
+            logger.debug("Redis cache key listing failed: %s", e)
+            return []
+        return [key for keys in members.values() for key in keys]
+
+    async def async_entries(self) -> AsyncIterator[EntryRow]:
+        """Yield every unexpired entry, fetching a batch of keys at a time."""
+        fields = (
+            "created_at",
+            "fresh_until",
+            "expires_at",
+            "codec",
+            "data",
+            "scope",
+            "query",
+        )
+        try:
+            for tool, keys in (await self._members(None)).items():
+                for start in range(0, len(keys), self.ENTRIES_BATCH_SIZE):
+                    batch = keys[start : start + self.ENTRIES_BATCH_SIZE]
+                    replies = await self._execute(
+                        *[("HMGET", self._entry_key(key), *fields) for key in batch]
+                    )
+                    now = time.time()
+                    for key, reply in zip(batch, replies, strict=True):
+                        created_at, fresh_until, expires_at, codec, data, *rest = reply
+                        if data is None or int(expires_at) <= now:
+                            continue
+                        data_json = _decompress(codec.decode(), data)
+                        if data_json is None:
+                            continue
+                        scope, query = (
+                            value.decode() if value is not None else None
+                            for value in rest
+                        )
+                        yield (
+                            tool,
+                            key,
+                            int(created_at),
+                            int(fresh_until),
+                            int(expires_at),
+                            data_json,
+                            scope,
+                            query,
+                        )
+        except REDIS_ERRORS as e:
+            logger.debug("Redis cache entry listing failed: %s", e)
+
+    async def async_expire(self) -> list[str]:
+        """Prune entries Redis has expired from the tool sets, returning their keys."""
+        expired = []
+        try:
+            for tool, keys in (await self._members(None)).items():
+                if not keys:
+                    continue
+                exists = await self._execute(
+                    *[("EXISTS", self._entry_key(key)) for key in keys]
+                )
+                gone = [
+                    key for key, found in zip(keys, exists, strict=True) if not found
+                ]
+                if gone:
+                    await self._execute(("SREM", self._tool_key(tool), *gone))
+                expired.extend(gone)
+        except REDIS_ERRORS as e:
+            logger.debug("Redis cache expiry failed: %s", e)
+        return expired
+
+    async def async_clear(self, tool: str | None) -> list[str]:
+        """Remove all entries, or only those of tool, returning their keys."""
+        deleted = []
+        try:
+            for name, keys in (await self._members(tool)).items():
+                commands = [("DEL", self._entry_key(key)) for key in keys]
+                replies = await self._execute(*commands, ("DEL", self._tool_key(name)))
+                deleted.extend(
+                    key for key, removed in zip(keys, replies, strict=False) if removed
+                )
+        except REDIS_ERRORS as e:
+            logger.debug("Redis cache clear failed: %s", e)
+        return deleted
+
+    async def async_usage(self) -> dict[str, tuple[int, int]]:
+        """Return the stored (entries, bytes), keyed by tool."""
+        usage = {}
+        try:
+            for tool, keys in (await self._members(None)).items():
+                if not keys:
+                    continue
+                sizes = await self._execute(
+                    *[("HGET", self._entry_key(key), "size") for key in keys]
+                )
+                sizes = [int(size) for size in sizes if size is not None]
+                if sizes:
+                    usage[tool] = (len(sizes), sum(sizes))
+        except REDIS_ERRORS as e:
+            logger.debug("Redis cache usage failed: %s", e)
+        return usage
+
+    async def async_similarity_rows(self) -> list[tuple[str, str, str]]:
+        """Return (key, scope, query) for every entry indexed by query."""
+        rows = []
+        try:
+            for keys in (await self._members(None)).values():
+                if not keys:
+                    continue
+                replies = await self._execute(
+                    *[("HMGET", self._entry_key(key), "scope", "query") for key in keys]
+                )
+                rows.extend(
+                    (key, scope.decode(), query.decode())
+                    for key, (scope, query) in zip(keys, replies, strict=True)
+                    if query is not None
+                )
+        except REDIS_ERRORS as e:
+            logger.debug("Redis cache similarity rows failed: %s", e)
+        return rows
@@ -1,43 +1,273 @@
+"""Cache for the responses of the tools."""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import gzip
 import hashlib
 import json
 import logging
-import os
-import sqlite3
 import time
-from typing import Any
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import IO, TYPE_CHECKING, Any
+
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+from .backends import (
+    BACKEND_MEMORY,
+    BACKEND_REDIS,
+    CacheBackend,
+    MemoryBackend,
+    RedisBackend,
+    SQLiteBackend,
+)
+from .const import (
+    CACHE_DB_NAME,
+    CONF_CACHE_BACKEND,
+    CONF_CACHE_EVICTION_POLICY,
+    CONF_CACHE_MAX_AGE,
+    CONF_CACHE_MAX_ENTRIES,
+    CONF_CACHE_MAX_SIZE,
+    CONF_CACHE_MEMORY_ONLY,
+    CONF_CACHE_REDIS_URL,
+    CONF_CACHE_REFRESH_BUDGET,
+    CONF_CACHE_SIMILARITY_THRESHOLD,
+    CONF_CACHE_STALE_MAX_AGE,
+    DOMAIN,
+    SERVICE_DEFAULTS,
+)
+from .eviction import POLICIES, EvictionPolicy
+from .similarity import SimilarityIndex
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Mapping
+
+    from homeassistant.core import CALLBACK_TYPE, HomeAssistant
 
 logger = logging.getLogger(__name__)
 
+# Empty results and retryable upstream errors are cached briefly, so an LLM
+# retrying the same call does not spend quota on an answer we already have
+EMPTY_RESULT_MAX_AGE = 5 * 60
+ERROR_MAX_AGE = 60
+ERROR_MAX_RETRY_AFTER = 60 * 60
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Snapshots are gzipped JSON lines: a header, then one entry per line
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FIELDS = (
+    "tool",
+    "key",
+    "created_at",
+    "fresh_until",
+    "expires_at",
+    "data",
+    "scope",
+    "query",
+)
+SNAPSHOT_BATCH_SIZE = 1000
+SNAPSHOT_READ_HINT = 1024 * 1024
+
+
+def error_max_age(status: int, headers: Mapping[str, str]) -> int:
+    """Return how many seconds to cache an upstream error for, 0 for never."""
+    if status not in RETRYABLE_STATUSES:
+        return 0
+
+    seconds = retry_after(headers)
+    if seconds is None:
+        return ERROR_MAX_AGE
+
+    return min(int(seconds), ERROR_MAX_RETRY_AFTER)
+
+
+def retry_after(headers: Mapping[str, str]) -> float | None:
+    """Return the seconds a Retry-After header asks to wait, None if unusable."""
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+
+    try:
+        seconds = float(int(value))
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+
+    return max(0.0, seconds)
+
+
+def cache_control_max_age(headers: Mapping[str, str]) -> int | None:
+    """Return how many seconds a response may be reused for, None if unstated."""
+    directives = {}
+    for directive in headers.get("Cache-Control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        directives[name.lower()] = value.strip('"')
+
+    # Either way the response has to be checked with upstream before reuse
+    if "no-cache" in directives or "no-store" in directives:
+        return 0
+
+    try:
+        return max(0, int(directives["max-age"]))
+    except (KeyError, ValueError):
+        return None
+
+
+def _open_snapshot(path: str, mode: str) -> IO[str]:
+    return gzip.open(path, mode, encoding="utf-8")
+
+
+@dataclass
+class CacheStats:
+    """Per-tool cache lookup counters."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    similar_hits: int = 0
+    # (query, cached query) of the most recent similarity match
+    last_similar_match: tuple[str, str] | None = None
+    refreshes: int = 0
+    # Stale entries confirmed unchanged by upstream
+    revalidations: int = 0
+
+
+@dataclass
+class HotEntry:
+    """A frequently read entry, and how to refresh it ahead of expiry."""
+
+    tool: str
+    params: dict | None
+    refresh: Callable[[], Awaitable[Any]]
+    fresh_until: int
+    # Reads since the entry was last stored
+    hits: int = 0
+
+
+class LRUCache:
+    """Bounded in-process cache with least-recently-used eviction."""
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        """Hold up to max_entries responses totalling max_bytes."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats: defaultdict[str, CacheStats] = defaultdict(CacheStats)
+        # key -> (tool, expires_at, size, data)
+        self._entries: OrderedDict[str, tuple[str, float, int, Any]] = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        """Return the number of entries held."""
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size in bytes of the entries held."""
+        return self._bytes
+
+    def get(self, tool: str, key: str) -> Any | None:
+        """Return an unexpired entry, counting the lookup in the tool's stats."""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                self._remove(key)
+            self.stats[tool].misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats[tool].hits += 1
+        return entry[3]
+
+    def set(self, tool: str, key: str, data: Any, size: int, expires_at: float) -> None:
+        """Store an entry, evicting the least recently used ones over the bounds."""
+        if key in self._entries:
+            self._remove(key)
+
+        if size > self.max_bytes:
+            # Never let a single oversized payload flush the whole tier
+            return
+
+        self._entries[key] = (tool, expires_at, size, data)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            evicted_key, (evicted_tool, _, _, _) = next(iter(self._entries.items()))
+            self._remove(evicted_key)
+            self.stats[evicted_tool].evictions += 1
+
+    def discard(self, key: str) -> None:
+        """Remove an entry if it is held."""
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self, tool: str | None = None) -> None:
+        """Remove every entry, or only those of a tool."""
+        for key, (entry_tool, _, _, _) in list(self._entries.items()):
+            if tool is None or entry_tool == tool:
+                self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
 
 class SQLiteCache:
+    """
+    Tool response cache, shared by every tool.
+
+    Responses are held in a memory tier in front of a storage backend, which is
+    SQLite unless another backend is selected in the cache options.
+    """
+
     _instance = None
-    DEFAULT_MAX_AGE = 7200  # 2 hour
+    SWEEP_INTERVAL = timedelta(minutes=15)
+    # Writes are grouped into a single transaction committed after this delay
+    COMMIT_DELAY = 5
+    SNAPSHOT_INTERVAL = timedelta(minutes=30)
+    # Hot entries expiring within the window are refreshed, within the hourly budget
+    REFRESH_AHEAD_INTERVAL = timedelta(minutes=1)
+    REFRESH_AHEAD_WINDOW = 5 * 60
+    REFRESH_AHEAD_MIN_HITS = 2
+    HOT_MAX_ENTRIES = 100
+    MEMORY_MAX_ENTRIES = 256
+    MEMORY_MAX_BYTES = 2 * 1024 * 1024
 
-    def __new__(cls):
+    def __new__(cls) -> SQLiteCache:
+        """Return the cache shared by every tool, creating it on first use."""
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance._init_db()
+            cls._instance._init_executor()
         return cls._instance
 
-    def _init_db(self):
-        base_dir = os.path.dirname(os.path.abspath(__file__))  # this file’s directory
-        db_path = os.path.join(base_dir, "cache.db")
-        os.makedirs(base_dir, exist_ok=True)  # ensure folder exists
-
-        if os.path.exists(db_path):
-            # Recreate cache file when addon is initialised
-            os.remove(db_path)
-
-        self._conn = sqlite3.connect(db_path)
-        self._conn.execute("""
-            CREATE TABLE IF NOT EXISTS cache (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                key TEXT NOT NULL UNIQUE,
-                created_at INTEGER NOT NULL,
-                data TEXT NOT NULL
-            )
-        """)
-        self._conn.commit()
+    def _init_executor(self) -> None:
+        # In-memory SQLite until async_setup points us at the configured backend
+        self._backend: CacheBackend = SQLiteBackend()
+        self._hass: HomeAssistant | None = None
+        # Used for responses stored without a max age of their own
+        self.default_max_age = SERVICE_DEFAULTS[CONF_CACHE_MAX_AGE] * 60
+        self.stale_max_age = SERVICE_DEFAULTS[CONF_CACHE_STALE_MAX_AGE] * 60
+        self.similarity_threshold = (
+            SERVICE_DEFAULTS[CONF_CACHE_SIMILARITY_THRESHOLD] / 100
+        )
+        self._similar = SimilarityIndex()
+        # Bounds the entry count when a maximum is configured
+        self._policy: EvictionPolicy | None = None
+        self._unsub_sweep: CALLBACK_TYPE | None = None
+        self._unsub_commit: CALLBACK_TYPE | None = None
+        self._unsub_snapshot: CALLBACK_TYPE | None = None
+        self._unsub_refresh_ahead: CALLBACK_TYPE | None = None
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.refresh_budget = SERVICE_DEFAULTS[CONF_CACHE_REFRESH_BUDGET]
+        self._hot: dict[str, HotEntry] = {}
+        self._refresh_times: deque[float] = deque()
+        self._stats: defaultdict[str, CacheStats] = defaultdict(CacheStats)
+        self._memory = LRUCache(self.MEMORY_MAX_ENTRIES, self.MEMORY_MAX_BYTES)
 
     def _make_key(self, tool: str, params: dict | None) -> str:
         params_str = (
@@ -45,49 +275,655 @@ class SQLiteCache:
             if params is None
             else json.dumps(params, sort_keys=True, separators=(",", ":"))
         )
-        combined = tool + params_str
-        return hashlib.md5(combined.encode()).hexdigest()
+        # Instances sharing a backend only share entries made with the same config,
+        # and bumping a tool's generation orphans all of its entries at once
+        fingerprint, generation = self._backend.namespaces.get(tool, ("", 0))
+        combined = f"{tool}:{fingerprint}:{generation}" + params_str
+        return hashlib.md5(combined.encode(), usedforsecurity=False).hexdigest()
+
+    def _make_scope(self, tool: str, params: dict, query_key: str) -> str:
+        # Queries are only comparable when every other param matches
+        return self._make_key(tool, {k: v for k, v in params.items() if k != query_key})
+
+    def _create_backend(self, hass: HomeAssistant, config: dict) -> CacheBackend:
+        backend = config.get(CONF_CACHE_BACKEND, SERVICE_DEFAULTS[CONF_CACHE_BACKEND])
+        max_bytes = (
+            config.get(CONF_CACHE_MAX_SIZE, SERVICE_DEFAULTS[CONF_CACHE_MAX_SIZE])
+            * 1024
+            * 1024
+        )
+
+        if backend == BACKEND_REDIS:
+            if config.get(CONF_CACHE_REDIS_URL):
+                return RedisBackend(config[CONF_CACHE_REDIS_URL])
+            logger.warning("No Redis URL configured, falling back to SQLite cache")
+        if backend == BACKEND_MEMORY:
+            return MemoryBackend(max_bytes)
+        return SQLiteBackend(
+            hass.config.path(".storage", CACHE_DB_NAME),
+            max_bytes,
+            memory_only=config.get(
+                CONF_CACHE_MEMORY_ONLY, SERVICE_DEFAULTS[CONF_CACHE_MEMORY_ONLY]
+            ),
+        )
+
+    async def async_setup(self, hass: HomeAssistant, config: dict):
+        """Open the configured backend, by default SQLite under .storage."""
+        self._hass = hass
+        self.default_max_age = (
+            config.get(CONF_CACHE_MAX_AGE, SERVICE_DEFAULTS[CONF_CACHE_MAX_AGE]) * 60
+        )
+        self.stale_max_age = (
+            config.get(
+                CONF_CACHE_STALE_MAX_AGE,
+                SERVICE_DEFAULTS[CONF_CACHE_STALE_MAX_AGE],
+            )
+            * 60
+        )
+        self.similarity_threshold = (
+            config.get(
+                CONF_CACHE_SIMILARITY_THRESHOLD,
+                SERVICE_DEFAULTS[CONF_CACHE_SIMILARITY_THRESHOLD],
+            )
+            / 100
+        )
+        self.refresh_budget = config.get(
+            CONF_CACHE_REFRESH_BUDGET, SERVICE_DEFAULTS[CONF_CACHE_REFRESH_BUDGET]
+        )
+
+        backend, self._backend = self._backend, self._create_backend(hass, config)
+        await backend.async_close()
+        await self._backend.async_open()
+        self._memory.clear()
+
+        self._similar.clear()
+        for key, scope, query in await self._backend.async_similarity_rows():
+            self._similar.add(key, scope, query)
+
+        max_entries = config.get(
+            CONF_CACHE_MAX_ENTRIES, SERVICE_DEFAULTS[CONF_CACHE_MAX_ENTRIES]
+        )
+        self._policy = None
+        if max_entries and not self._backend.shared:
+            policy = config.get(
+                CONF_CACHE_EVICTION_POLICY,
+                SERVICE_DEFAULTS[CONF_CACHE_EVICTION_POLICY],
+            )
+            self._policy = POLICIES[policy](max_entries)
+            victims = self._policy.restore(await self._backend.async_keys())
+            await self._async_evict(victims)
+        hass.async_create_background_task(
+            self.async_expire(), name=f"{DOMAIN} cache expiry"
+        )
+
+        if self._unsub_sweep is None:
+            self._unsub_sweep = async_track_time_interval(
+                hass,
+                self._async_sweep,
+                self.SWEEP_INTERVAL,
+                name=f"{DOMAIN} cache sweep",
+            )
+
+        memory_only = (
+            isinstance(self._backend, SQLiteBackend) and self._backend.memory_only
+        )
+        if memory_only and self._unsub_snapshot is None:
+            self._unsub_snapshot = async_track_time_interval(
+                hass,
+                self._async_snapshot,
+                self.SNAPSHOT_INTERVAL,
+                name=f"{DOMAIN} cache snapshot",
+            )
+
+        if self.refresh_budget > 0 and self._unsub_refresh_ahead is None:
+            self._unsub_refresh_ahead = async_track_time_interval(
+                hass,
+                self._async_refresh_ahead,
+                self.REFRESH_AHEAD_INTERVAL,
+                name=f"{DOMAIN} cache refresh ahead",
+            )
+
+    async def async_close(self):
+        """Stop background jobs, flush pending writes and close the database."""
+        for unsub in (
+            self._unsub_sweep,
+            self._unsub_commit,
+            self._unsub_snapshot,
+            self._unsub_refresh_ahead,
+        ):
+            if unsub is not None:
+                unsub()
+        self._unsub_sweep = self._unsub_commit = None
+        self._unsub_snapshot = self._unsub_refresh_ahead = None
+        self._hass = None
+        self._hot.clear()
+        self._memory.clear()
+        self._similar.clear()
+        self._policy = None
+        # Fall back to a throwaway in-memory database until set up again
+        backend, self._backend = self._backend, SQLiteBackend()
+        await backend.async_close()
+
+    async def _async_sweep(self, now: datetime) -> None:
+        await self.async_expire()
+
+    def _track_hit(
+        self,
+        key: str,
+        tool: str,
+        params: dict | None,
+        refresh: Callable[[], Awaitable[Any]],
+        fresh_until: int,
+    ) -> None:
+        entry = self._hot.get(key)
+        if entry is None:
+            if len(self._hot) >= self.HOT_MAX_ENTRIES:
+                coldest = min(self._hot, key=lambda k: self._hot[k].hits)
+                del self._hot[coldest]
+            entry = self._hot[key] = HotEntry(tool, params, refresh, fresh_until)
+
+        entry.refresh = refresh
+        entry.fresh_until = fresh_until
+        entry.hits += 1
+
+    async def _async_refresh_ahead(self, now: datetime) -> None:
+        if self._hass is None:
+            return
+
+        current = time.time()
+        while self._refresh_times and self._refresh_times[0] <= current - 3600:
+            self._refresh_times.popleft()
 
-    def _cleanup(self):
-        now = int(time.time())
-        cutoff = now - self.DEFAULT_MAX_AGE
-        deleted = self._conn.execute(
-            "DELETE FROM cache WHERE created_at < ?", (cutoff,)
-        ).rowcount
-        self._conn.commit()
+        # Entries that fully expired without being refreshed have gone cold
+        for key, entry in list(self._hot.items()):
+            if entry.fresh_until + self.stale_max_age <= current:
+                del self._hot[key]
+
+        candidates = sorted(
+            (
+                entry
+                for key, entry in self._hot.items()
+                if entry.hits >= self.REFRESH_AHEAD_MIN_HITS
+                and entry.fresh_until <= current + self.REFRESH_AHEAD_WINDOW
+                and key not in self._inflight
+            ),
+            key=lambda entry: entry.hits,
+            reverse=True,
+        )
+
+        budget = self.refresh_budget - len(self._refresh_times)
+        for entry in candidates[: max(budget, 0)]:
+            logger.debug(
+                "Refreshing hot entry ahead of expiry for tool: %s Params: %s",
+                entry.tool,
+                entry.params,
+            )
+            # Must be read again before its next expiry to earn another refresh
+            entry.hits = 0
+            self._refresh_times.append(current)
+            self._stats[entry.tool].refreshes += 1
+            self._hass.async_create_background_task(
+                self._async_refresh(entry.tool, entry.params, entry.refresh),
+                name=f"{DOMAIN} cache refresh ahead",
+            )
+
+    async def _async_snapshot(self, now: datetime) -> None:
+        await self._backend.async_snapshot()
+
+    async def _async_commit_later(self) -> None:
+        # Without hass there is no timer to flush on, so commit straight away
+        if self._hass is None:
+            await self._backend.async_commit()
+        elif self._unsub_commit is None:
+            self._unsub_commit = async_call_later(
+                self._hass, self.COMMIT_DELAY, self._async_commit
+            )
+
+    async def _async_commit(self, now: datetime) -> None:
+        self._unsub_commit = None
+        await self._backend.async_commit()
+
+    async def async_set_fingerprint(self, tool: str, config: dict):
+        """
+        Partition a tool's entries by the config that affects its results.
+
+        When the fingerprint of config changes, the tool moves to a new
+        generation so its existing entries are no longer served.
+        """
+        fingerprint = hashlib.md5(
+            json.dumps(config, sort_keys=True, separators=(",", ":")).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+
+        current = self._backend.namespaces.get(tool)
+        if current is not None and current[0] == fingerprint:
+            return
+
+        await self._backend.async_set_namespace(tool, fingerprint)
+        await self._async_commit_later()
+
+    async def async_clear(self, tool: str | None = None) -> int:
+        """Delete all entries, or only those of tool, returning the number removed."""
+        deleted = await self._backend.async_clear(tool)
+        for key in deleted:
+            self._forget(key)
+        self._memory.clear(tool)
+        logger.debug(
+            "Cleared %s cache entries for tool: %s", len(deleted), tool or "all"
+        )
+        return len(deleted)
+
+    async def async_expire(self) -> int:
+        """Delete expired entries, returning the number removed."""
+        deleted = await self._backend.async_expire()
+        for key in deleted:
+            self._forget(key)
         if deleted:
-            logger.debug(f"Cache cleanup ran, deleted {deleted} expired entries")
+            logger.debug("Cache expiry removed %s entries", len(deleted))
+            await self._async_commit_later()
+        return len(deleted)
+
+    def _forget(self, key: str) -> None:
+        # Drop a key that is no longer stored from the in-memory indexes
+        self._similar.discard(key)
+        if self._policy is not None:
+            self._policy.remove(key)
+
+    async def _async_evict(self, keys: list[str]) -> None:
+        if not keys:
+            return
+
+        for key, tool in await self._backend.async_delete(keys):
+            self._forget(key)
+            self._memory.discard(key)
+            self._stats[tool].evictions += 1
+        logger.debug("Cache entry limit reached, evicted %s entries", len(keys))
+
+    @property
+    def memory_stats(self) -> dict[str, CacheStats]:
+        """Return the in-memory tier counters, keyed by tool."""
+        return dict(self._memory.stats)
 
-    def get(self, tool: str, params: dict | None) -> Any | None:
-        self._cleanup()
+    @property
+    def stats(self) -> dict[str, CacheStats]:
+        """Return counters across both tiers, keyed by tool."""
+        return dict(self._stats)
+
+    async def async_usage(self) -> dict[str, tuple[int, int]]:
+        """Return the stored (rows, bytes) in the backend, keyed by tool."""
+        return await self._backend.async_usage()
+
+    async def async_get(
+        self,
+        tool: str,
+        params: dict | None,
+        refresh: Callable[[], Awaitable[Any]] | None = None,
+        query_key: str | None = None,
+    ) -> Any | None:
+        """
+        Look up a cached response without blocking the event loop.
+
+        When a refresh callable is given, a stale entry still inside the stale
+        window is returned immediately while refresh runs in the background.
+        When query_key names the free-text param, an exact miss falls back to
+        the fresh entry with the most similar query above the threshold.
+        """
         key = self._make_key(tool, params)
-        cursor = self._conn.execute("SELECT data FROM cache WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        if row:
-            logger.debug(f"Cache hit for tool: {tool} Params: {params}")
-            try:
-                return json.loads(row[0])
-            except json.JSONDecodeError:
+        if self._policy is not None:
+            self._policy.access(key)
+
+        entry = self._memory.get(tool, key)
+        if entry is not None:
+            logger.debug("Memory cache hit for tool: %s Params: %s", tool, params)
+        else:
+            entry = await self._async_load(tool, key)
+
+        if entry is None and query_key is not None:
+            return await self._async_get_similar(tool, params, query_key)
+
+        if entry is None:
+            logger.debug("Cache miss for tool: %s Params: %s", tool, params)
+            self._stats[tool].misses += 1
+            return None
+
+        data, fresh_until = entry
+        if fresh_until <= time.time():
+            if refresh is None or self._hass is None:
                 logger.debug(
-                    f"Failed to decode cached data for tool: {tool} Params: {params}"
+                    "Cache entry is stale for tool: %s Params: %s", tool, params
                 )
+                self._stats[tool].misses += 1
                 return None
+
+            logger.debug("Serving stale entry for tool: %s Params: %s", tool, params)
+            if key not in self._inflight:
+                self._hass.async_create_background_task(
+                    self._async_refresh(tool, params, refresh),
+                    name=f"{DOMAIN} cache refresh",
+                )
+
+        self._stats[tool].hits += 1
+        if refresh is not None:
+            self._track_hit(key, tool, params, refresh, fresh_until)
+
+        # Callers decorate responses in place, so never hand out the stored object
+        return copy.copy(data)
+
+    async def async_get_entry(
+        self, tool: str, params: dict | None, *, count: bool = True
+    ) -> tuple[Any, bool] | None:
+        """
+        Look up a cached response and whether it is still fresh.
+
+        Stale entries are returned too, so that the caller can revalidate them
+        with upstream rather than fetch them again. Lookups for parts of a
+        response should pass count=False, so that the hit and miss counts stay
+        one per tool call.
+        """
+        key = self._make_key(tool, params)
+        if self._policy is not None:
+            self._policy.access(key)
+
+        stats = self._stats[tool] if count else CacheStats()
+        entry = self._memory.get(tool, key)
+        if entry is None:
+            entry = await self._async_load(tool, key)
+        if entry is None:
+            logger.debug("Cache miss for tool: %s Params: %s", tool, params)
+            stats.misses += 1
+            return None
+
+        data, fresh_until = entry
+        fresh = fresh_until > time.time()
+        if fresh:
+            stats.hits += 1
         else:
-            logger.debug(f"Cache miss for tool: {tool} Params: {params}")
+            logger.debug("Cache entry is stale for tool: %s Params: %s", tool, params)
+            stats.misses += 1
+        return copy.copy(data), fresh
+
+    async def _async_load(self, tool: str, key: str) -> tuple[Any, int] | None:
+        # Read an entry from the backend and promote it into the memory tier
+        row = await self._backend.async_get(key)
+        if not row:
+            return None
+
+        data_json, fresh_until, expires_at = row
+        try:
+            entry = (json.loads(data_json), fresh_until)
+        except json.JSONDecodeError:
+            logger.debug("Failed to decode cached data for tool: %s", tool)
+            return None
+
+        logger.debug("Cache hit for tool: %s", tool)
+        self._memory.set(tool, key, entry, len(data_json), expires_at)
+        return entry
+
+    async def _async_get_similar(
+        self, tool: str, params: dict, query_key: str
+    ) -> Any | None:
+        stats = self._stats[tool]
+        query = params.get(query_key)
+        match = None
+        if self.similarity_threshold > 0 and isinstance(query, str):
+            match = self._similar.search(
+                self._make_scope(tool, params, query_key),
+                query,
+                self.similarity_threshold,
+            )
+
+        entry = None
+        if match is not None:
+            matched_key, matched_query, score = match
+            entry = self._memory.get(tool, matched_key)
+            if entry is None:
+                entry = await self._async_load(tool, matched_key)
+            if entry is None:
+                # Expired or evicted since it was indexed
+                self._similar.discard(matched_key)
+
+        # Similar entries stand in for a miss, so only fresh ones are used
+        if entry is None or entry[1] <= time.time():
+            logger.debug("Cache miss for tool: %s Params: %s", tool, params)
+            stats.misses += 1
             return None
 
-    def set(self, tool: str, params: dict | None, data: dict):
+        if self._policy is not None:
+            self._policy.access(matched_key)
+        logger.info(
+            "Similar cache hit for tool: %s Query: %r matched %r (%.2f)",
+            tool,
+            query,
+            matched_query,
+            score,
+        )
+        stats.hits += 1
+        stats.similar_hits += 1
+        stats.last_similar_match = (query, matched_query)
+        return copy.copy(entry[0])
+
+    async def _async_refresh(
+        self,
+        tool: str,
+        params: dict | None,
+        refresh: Callable[[], Awaitable[Any]],
+    ) -> None:
+        try:
+            await self.async_coalesce(tool, params, refresh)
+        except Exception as e:
+            logger.debug("Background refresh failed for tool: %s Error: %s", tool, e)
+
+    async def async_set(
+        self,
+        tool: str,
+        params: dict | None,
+        data: dict,
+        max_age: int | None = None,
+        query_key: str | None = None,
+        *,
+        allow_stale: bool = True,
+        keep_for: int = 0,
+    ):
+        """
+        Store a response for max_age seconds without blocking the event loop.
+
+        When query_key names the free-text param, the query is indexed for
+        similarity lookups. Negative entries should pass allow_stale=False so
+        they are never served past max_age. Entries carrying upstream validators
+        can be kept keep_for seconds past max_age for async_get_entry to return.
+        """
+        if max_age is None:
+            max_age = self.default_max_age
+        if max_age + keep_for <= 0:
+            return
+
         key = self._make_key(tool, params)
         created_at = int(time.time())
+        fresh_until = created_at + max_age
+        expires_at = fresh_until + max(
+            self.stale_max_age if allow_stale else 0, keep_for
+        )
         data_json = json.dumps(data)
-        self._conn.execute(
-            """
-            INSERT INTO cache (key, created_at, data)
-            VALUES (?, ?, ?)
-            ON CONFLICT(key) DO UPDATE SET
-                created_at=excluded.created_at,
-                data=excluded.data
-        """,
-            (key, created_at, data_json),
-        )
-        self._conn.commit()
+
+        scope = query = None
+        if query_key is not None and isinstance(params.get(query_key), str):
+            scope = self._make_scope(tool, params, query_key)
+            query = params[query_key]
+
+        stored = await self._async_store(
+            tool, key, created_at, fresh_until, expires_at, data_json, scope, query
+        )
+        if not stored:
+            logger.debug("Cache entry not kept for tool: %s Params: %s", tool, params)
+            return
+
+        self._memory.set(
+            tool, key, (copy.copy(data), fresh_until), len(data_json), expires_at
+        )
+        if key in self._hot:
+            self._hot[key].fresh_until = fresh_until
+        await self._async_commit_later()
+
+    async def _async_store(
+        self,
+        tool: str,
+        key: str,
+        created_at: int,
+        fresh_until: int,
+        expires_at: int,
+        data_json: str,
+        scope: str | None = None,
+        query: str | None = None,
+    ) -> bool:
+        # Write an entry to the backend, returning whether it is still stored
+        victims = self._policy.add(key) if self._policy is not None else []
+        if key in victims:
+            victims.remove(key)
+            await self._async_evict(victims)
+            return False
+
+        evicted = await self._backend.async_set(
+            tool,
+            key,
+            created_at,
+            fresh_until,
+            expires_at,
+            data_json,
+            scope,
+            query,
+        )
+        if query is not None:
+            self._similar.add(key, scope, query)
+        for evicted_key, evicted_tool in evicted:
+            self._forget(evicted_key)
+            self._memory.discard(evicted_key)
+            self._stats[evicted_tool].evictions += 1
+        await self._async_evict(victims)
+        # The byte cap can evict the entry just written if it expires soonest
+        return all(evicted_key != key for evicted_key, _ in evicted)
+
+    async def async_revalidate(
+        self,
+        tool: str,
+        params: dict | None,
+        data: dict,
+        max_age: int,
+        keep_for: int = 0,
+    ):
+        """Store a stale response again after upstream confirmed it is unchanged."""
+        logger.debug("Cache entry revalidated for tool: %s Params: %s", tool, params)
+        self._stats[tool].revalidations += 1
+        await self.async_set(tool, params, data, max_age, keep_for=keep_for)
+
+    async def async_export(self, path: str) -> int:
+        """Write every unexpired entry to a snapshot file, returning the count."""
+        loop = asyncio.get_running_loop()
+        header = {
+            "version": SNAPSHOT_VERSION,
+            "exported_at": int(time.time()),
+            "namespaces": self._backend.namespaces,
+        }
+
+        exported = 0
+        file = await loop.run_in_executor(None, _open_snapshot, path, "wt")
+        try:
+            lines = [json.dumps(header) + "\n"]
+            async for row in self._backend.async_entries():
+                entry = dict(zip(SNAPSHOT_FIELDS, row, strict=True))
+                lines.append(json.dumps(entry) + "\n")
+                exported += 1
+                if len(lines) >= SNAPSHOT_BATCH_SIZE:
+                    await loop.run_in_executor(None, file.writelines, lines)
+                    lines = []
+            await loop.run_in_executor(None, file.writelines, lines)
+        finally:
+            await loop.run_in_executor(None, file.close)
+
+        logger.info("Exported %s cache entries to %s", exported, path)
+        return exported
+
+    async def async_import(self, path: str) -> tuple[int, int]:
+        """
+        Load the unexpired entries of a snapshot file.
+
+        Entries are only restored for tools whose config matches the snapshot's,
+        replacing their current entries. Returns the (imported, skipped) counts.
+        """
+        loop = asyncio.get_running_loop()
+        file = await loop.run_in_executor(None, _open_snapshot, path, "rt")
+        try:
+            header = json.loads(await loop.run_in_executor(None, file.readline))
+            if header.get("version") != SNAPSHOT_VERSION:
+                msg = f"Unsupported cache snapshot version: {header.get('version')}"
+                raise ValueError(msg)
+            namespaces = header["namespaces"]
+            tools = await self._async_restore_namespaces(namespaces)
+
+            imported = skipped = 0
+            while lines := await loop.run_in_executor(
+                None, file.readlines, SNAPSHOT_READ_HINT
+            ):
+                now = time.time()
+                for line in lines:
+                    entry = json.loads(line)
+                    tool = entry["tool"]
+                    if tool not in namespaces and tool not in self._backend.namespaces:
+                        # Neither side partitions this tool's entries by config
+                        tools.add(tool)
+                    if tool not in tools or entry["expires_at"] <= now:
+                        skipped += 1
+                        continue
+                    row = [entry[field] for field in SNAPSHOT_FIELDS]
+                    if await self._async_store(*row):
+                        imported += 1
+                    else:
+                        skipped += 1
+        finally:
+            await loop.run_in_executor(None, file.close)
+
+        await self._async_commit_later()
+        logger.info(
+            "Imported %s cache entries from %s, skipped %s", imported, path, skipped
+        )
+        return imported, skipped
+
+    async def _async_restore_namespaces(self, namespaces: dict) -> set[str]:
+        # Keys embed each tool's generation, so adopt the snapshot's where the
+        # config matches; a shared backend must keep the generation it has
+        tools = set()
+        for tool, (fingerprint, generation) in namespaces.items():
+            current = self._backend.namespaces.get(tool)
+            if current == (fingerprint, generation):
+                tools.add(tool)
+            elif (current is None or current[0] == fingerprint) and (
+                not self._backend.shared
+            ):
+                await self.async_clear(tool)
+                await self._backend.async_set_namespace(tool, fingerprint, generation)
+                tools.add(tool)
+            else:
+                logger.debug("Skipping snapshot entries for changed tool: %s", tool)
+        return tools
+
+    async def async_coalesce(
+        self,
+        tool: str,
+        params: dict | None,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Run fetch once for concurrent identical requests and share its result."""
+        key = self._make_key(tool, params)
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = asyncio.create_task(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.debug(
+                "Joining in-flight request for tool: %s Params: %s", tool, params
+            )
+
+        # Shielded so one caller giving up does not cancel the request for the rest
+        result = await asyncio.shield(task)
+        return copy.copy(result)
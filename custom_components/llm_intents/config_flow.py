@@ -5,6 +5,7 @@ from __future__ import annotations
 import logging
 from collections.abc import Callable
 from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
 
 import voluptuous as vol
 from homeassistant import config_entries
@@ -13,31 +14,61 @@ from homeassistant.core import callback
 
 _LOGGER = logging.getLogger(__name__)
 
+from .backends import BACKEND_REDIS, BACKENDS
 from .const import (
     ADDON_NAME,
     CONF_BRAVE_API_KEY,
+    CONF_BRAVE_CACHE_MAX_AGE,
     CONF_BRAVE_COUNTRY_CODE,
     CONF_BRAVE_ENABLED,
+    CONF_BRAVE_FILLER_WORDS,
     CONF_BRAVE_LATITUDE,
     CONF_BRAVE_LONGITUDE,
+    CONF_BRAVE_MAX_RETRIES,
+    CONF_BRAVE_NORMALISE_QUERY,
     CONF_BRAVE_NUM_RESULTS,
     CONF_BRAVE_POST_CODE,
+    CONF_BRAVE_RETRY_DEADLINE,
     CONF_BRAVE_TIMEZONE,
+    CONF_CACHE_BACKEND,
+    CONF_CACHE_EVICTION_POLICY,
+    CONF_CACHE_MAX_AGE,
+    CONF_CACHE_MAX_ENTRIES,
+    CONF_CACHE_MAX_SIZE,
+    CONF_CACHE_MEMORY_ONLY,
+    CONF_CACHE_REDIS_URL,
+    CONF_CACHE_REFRESH_BUDGET,
+    CONF_CACHE_SIMILARITY_THRESHOLD,
+    CONF_CACHE_STALE_MAX_AGE,
     CONF_DAILY_WEATHER_ENTITY,
     CONF_GOOGLE_PLACES_API_KEY,
+    CONF_GOOGLE_PLACES_CACHE_MAX_AGE,
     CONF_GOOGLE_PLACES_ENABLED,
+    CONF_GOOGLE_PLACES_FILLER_WORDS,
     CONF_GOOGLE_PLACES_LATITUDE,
     CONF_GOOGLE_PLACES_LONGITUDE,
+    CONF_GOOGLE_PLACES_MAX_RETRIES,
+    CONF_GOOGLE_PLACES_NORMALISE_QUERY,
     CONF_GOOGLE_PLACES_NUM_RESULTS,
     CONF_GOOGLE_PLACES_RADIUS,
     CONF_GOOGLE_PLACES_RANKING,
+    CONF_GOOGLE_PLACES_RETRY_DEADLINE,
     CONF_HOURLY_WEATHER_ENTITY,
     CONF_WEATHER_ENABLED,
+    CONF_WIKIPEDIA_CACHE_MAX_AGE,
     CONF_WIKIPEDIA_ENABLED,
+    CONF_WIKIPEDIA_FILLER_WORDS,
+    CONF_WIKIPEDIA_MAX_RETRIES,
+    CONF_WIKIPEDIA_NORMALISE_QUERY,
     CONF_WIKIPEDIA_NUM_RESULTS,
+    CONF_WIKIPEDIA_RETRIEVAL_MODE,
+    CONF_WIKIPEDIA_RETRY_DEADLINE,
+    CONF_WIKIPEDIA_SUMMARY_CONCURRENCY,
+    CONF_WIKIPEDIA_SUMMARY_TIMEOUT,
     DOMAIN,
     SERVICE_DEFAULTS,
 )
+from .eviction import POLICIES
 
 if TYPE_CHECKING:  # pragma: no cover
     from homeassistant.config_entries import ConfigEntry, OptionsFlow
@@ -52,6 +83,7 @@ STEP_WEATHER = "weather"
 STEP_INIT = "init"
 STEP_CONFIGURE_SEARCH = "configure"
 STEP_CONFIGURE_WEATHER = "configure_weather"
+STEP_CONFIGURE_CACHE = "configure_cache"
 
 
 def get_step_user_data_schema(hass) -> vol.Schema:
@@ -92,6 +124,26 @@ def get_brave_schema(hass) -> vol.Schema:
             vol.Optional(
                 CONF_BRAVE_POST_CODE, default=SERVICE_DEFAULTS.get(CONF_BRAVE_POST_CODE)
             ): str,
+            vol.Optional(
+                CONF_BRAVE_CACHE_MAX_AGE,
+                default=SERVICE_DEFAULTS.get(CONF_BRAVE_CACHE_MAX_AGE),
+            ): vol.All(int, vol.Range(min=0, max=10080)),
+            vol.Optional(
+                CONF_BRAVE_NORMALISE_QUERY,
+                default=SERVICE_DEFAULTS.get(CONF_BRAVE_NORMALISE_QUERY),
+            ): bool,
+            vol.Optional(
+                CONF_BRAVE_FILLER_WORDS,
+                default=SERVICE_DEFAULTS.get(CONF_BRAVE_FILLER_WORDS),
+            ): str,
+            vol.Optional(
+                CONF_BRAVE_MAX_RETRIES,
+                default=SERVICE_DEFAULTS.get(CONF_BRAVE_MAX_RETRIES),
+            ): vol.All(int, vol.Range(min=0, max=5)),
+            vol.Optional(
+                CONF_BRAVE_RETRY_DEADLINE,
+                default=SERVICE_DEFAULTS.get(CONF_BRAVE_RETRY_DEADLINE),
+            ): vol.All(int, vol.Range(min=1, max=30)),
         }
     )
 
@@ -124,6 +176,26 @@ def get_google_places_schema(hass) -> vol.Schema:
                 CONF_GOOGLE_PLACES_RANKING,
                 default=SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_RANKING),
             ): vol.In(["None", "Distance", "Relevance"]),
+            vol.Optional(
+                CONF_GOOGLE_PLACES_CACHE_MAX_AGE,
+                default=SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_CACHE_MAX_AGE),
+            ): vol.All(int, vol.Range(min=0, max=10080)),
+            vol.Optional(
+                CONF_GOOGLE_PLACES_NORMALISE_QUERY,
+                default=SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_NORMALISE_QUERY),
+            ): bool,
+            vol.Optional(
+                CONF_GOOGLE_PLACES_FILLER_WORDS,
+                default=SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_FILLER_WORDS),
+            ): str,
+            vol.Optional(
+                CONF_GOOGLE_PLACES_MAX_RETRIES,
+                default=SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_MAX_RETRIES),
+            ): vol.All(int, vol.Range(min=0, max=5)),
+            vol.Optional(
+                CONF_GOOGLE_PLACES_RETRY_DEADLINE,
+                default=SERVICE_DEFAULTS.get(CONF_GOOGLE_PLACES_RETRY_DEADLINE),
+            ): vol.All(int, vol.Range(min=1, max=30)),
         }
     )
 
@@ -136,6 +208,38 @@ def get_wikipedia_schema(hass) -> vol.Schema:
                 CONF_WIKIPEDIA_NUM_RESULTS,
                 default=SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_NUM_RESULTS),
             ): vol.All(int, vol.Range(min=1, max=20)),
+            vol.Optional(
+                CONF_WIKIPEDIA_CACHE_MAX_AGE,
+                default=SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_CACHE_MAX_AGE),
+            ): vol.All(int, vol.Range(min=0, max=10080)),
+            vol.Optional(
+                CONF_WIKIPEDIA_NORMALISE_QUERY,
+                default=SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_NORMALISE_QUERY),
+            ): bool,
+            vol.Optional(
+                CONF_WIKIPEDIA_FILLER_WORDS,
+                default=SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_FILLER_WORDS),
+            ): str,
+            vol.Optional(
+                CONF_WIKIPEDIA_RETRIEVAL_MODE,
+                default=SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_RETRIEVAL_MODE),
+            ): vol.In(["extracts", "summaries"]),
+            vol.Optional(
+                CONF_WIKIPEDIA_SUMMARY_CONCURRENCY,
+                default=SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_SUMMARY_CONCURRENCY),
+            ): vol.All(int, vol.Range(min=1, max=20)),
+            vol.Optional(
+                CONF_WIKIPEDIA_SUMMARY_TIMEOUT,
+                default=SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_SUMMARY_TIMEOUT),
+            ): vol.All(int, vol.Range(min=1, max=30)),
+            vol.Optional(
+                CONF_WIKIPEDIA_MAX_RETRIES,
+                default=SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_MAX_RETRIES),
+            ): vol.All(int, vol.Range(min=0, max=5)),
+            vol.Optional(
+                CONF_WIKIPEDIA_RETRY_DEADLINE,
+                default=SERVICE_DEFAULTS.get(CONF_WIKIPEDIA_RETRY_DEADLINE),
+            ): vol.All(int, vol.Range(min=1, max=30)),
         }
     )
 
@@ -163,6 +267,54 @@ def get_weather_schema(hass) -> vol.Schema:
     )
 
 
+def get_cache_schema(hass) -> vol.Schema:
+    """Return the static schema for cache configuration."""
+    return vol.Schema(
+        {
+            vol.Optional(
+                CONF_CACHE_MAX_AGE,
+                default=SERVICE_DEFAULTS.get(CONF_CACHE_MAX_AGE),
+            ): vol.All(int, vol.Range(min=0, max=10080)),
+            vol.Optional(
+                CONF_CACHE_STALE_MAX_AGE,
+                default=SERVICE_DEFAULTS.get(CONF_CACHE_STALE_MAX_AGE),
+            ): vol.All(int, vol.Range(min=0, max=10080)),
+            vol.Optional(
+                CONF_CACHE_BACKEND,
+                default=SERVICE_DEFAULTS.get(CONF_CACHE_BACKEND),
+            ): vol.In(BACKENDS),
+            vol.Optional(
+                CONF_CACHE_REDIS_URL,
+                default=SERVICE_DEFAULTS.get(CONF_CACHE_REDIS_URL),
+            ): str,
+            vol.Optional(
+                CONF_CACHE_MAX_SIZE,
+                default=SERVICE_DEFAULTS.get(CONF_CACHE_MAX_SIZE),
+            ): vol.All(int, vol.Range(min=1, max=1024)),
+            vol.Optional(
+                CONF_CACHE_MAX_ENTRIES,
+                default=SERVICE_DEFAULTS.get(CONF_CACHE_MAX_ENTRIES),
+            ): vol.All(int, vol.Range(min=0, max=100000)),
+            vol.Optional(
+                CONF_CACHE_EVICTION_POLICY,
+                default=SERVICE_DEFAULTS.get(CONF_CACHE_EVICTION_POLICY),
+            ): vol.In(list(POLICIES)),
+            vol.Optional(
+                CONF_CACHE_MEMORY_ONLY,
+                default=SERVICE_DEFAULTS.get(CONF_CACHE_MEMORY_ONLY),
+            ): bool,
+            vol.Optional(
+                CONF_CACHE_SIMILARITY_THRESHOLD,
+                default=SERVICE_DEFAULTS.get(CONF_CACHE_SIMILARITY_THRESHOLD),
+            ): vol.All(int, vol.Range(min=0, max=100)),
+            vol.Optional(
+                CONF_CACHE_REFRESH_BUDGET,
+                default=SERVICE_DEFAULTS.get(CONF_CACHE_REFRESH_BUDGET),
+            ): vol.All(int, vol.Range(min=0, max=1000)),
+        }
+    )
+
+
 SEARCH_STEP_ORDER = {
     STEP_USER: [None, get_step_user_data_schema],
     STEP_BRAVE: [CONF_BRAVE_ENABLED, get_brave_schema],
@@ -328,7 +480,11 @@ class LlmIntentsOptionsFlow(config_entries.OptionsFlowWithReload):
         if user_input is None:
             return self.async_show_menu(
                 step_id=STEP_INIT,
-                menu_options=[STEP_CONFIGURE_SEARCH, "configure_weather"],
+                menu_options=[
+                    STEP_CONFIGURE_SEARCH,
+                    "configure_weather",
+                    STEP_CONFIGURE_CACHE,
+                ],
                 description_placeholders={
                     "current_services": self._get_current_services_description()
                 },
@@ -381,7 +537,7 @@ class LlmIntentsOptionsFlow(config_entries.OptionsFlowWithReload):
             )
 
         # No services selected, just update with current selections
-        return self.async_create_entry(data=self.config_data)
+        return self.async_create_entry(data={**opts, **self.config_data})
 
     async def async_step_configure_weather(
         self, user_input: dict[str, Any] | None = None
@@ -424,7 +580,37 @@ class LlmIntentsOptionsFlow(config_entries.OptionsFlowWithReload):
             )
 
         # No services selected, just update with current selections
-        return self.async_create_entry(data=self.config_data)
+        return self.async_create_entry(data={**opts, **self.config_data})
+
+    async def async_step_configure_cache(
+        self, user_input: dict[str, Any] | None = None
+    ) -> config_entries.FlowResult:
+        """Handle the cache configuration menu option."""
+        opts = self.config_entry.options or {}
+        defaults = {**self.config_entry.data, **opts}
+
+        errors = {}
+        if (
+            user_input is not None
+            and user_input.get(CONF_CACHE_BACKEND) == BACKEND_REDIS
+        ):
+            url = user_input.get(CONF_CACHE_REDIS_URL, "")
+            if urlsplit(url).scheme not in ("redis", "rediss"):
+                errors[CONF_CACHE_REDIS_URL] = "invalid_redis_url"
+
+        if user_input is None or errors:
+            schema = get_cache_schema(self.hass)
+            schema = self.add_suggested_values_to_schema(
+                schema, user_input if errors else defaults
+            )
+            return self.async_show_form(
+                step_id=STEP_CONFIGURE_CACHE,
+                data_schema=schema,
+                errors=errors,
+            )
+
+        # Cache settings sit alongside the service options rather than replacing them
+        return self.async_create_entry(data={**opts, **user_input})
 
     def _get_current_services_description(self) -> str:
         """Get a description of currently configured services."""
@@ -467,7 +653,10 @@ class LlmIntentsOptionsFlow(config_entries.OptionsFlowWithReload):
         # Manual reload to match OptionsFlowWithReload behavior as we cant seem to import that successfully
         await self.hass.config_entries.async_reload(self.config_entry.entry_id)
 
-        return self.async_create_entry(data=self.config_data)
+        # Service settings sit alongside the cache options rather than replacing them
+        return self.async_create_entry(
+            data={**(self.config_entry.options or {}), **self.config_data}
+        )
 
     async def async_step_brave(
         self, user_input: dict[str, Any] | None = None
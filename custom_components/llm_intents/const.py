@@ -14,6 +14,17 @@ WEATHER_API_NAME = "Weather Forecast"
 # SQLite Cache
 
 CONF_CACHE_MAX_AGE = "cache_max_age"
+CONF_CACHE_STALE_MAX_AGE = "cache_stale_max_age"
+CONF_CACHE_MAX_SIZE = "cache_max_size"
+CONF_CACHE_MEMORY_ONLY = "cache_memory_only"
+CONF_CACHE_SIMILARITY_THRESHOLD = "cache_similarity_threshold"
+CONF_CACHE_REFRESH_BUDGET = "cache_refresh_budget"
+CONF_CACHE_BACKEND = "cache_backend"
+CONF_CACHE_REDIS_URL = "cache_redis_url"
+CONF_CACHE_MAX_ENTRIES = "cache_max_entries"
+CONF_CACHE_EVICTION_POLICY = "cache_eviction_policy"
+CACHE_DB_NAME = f"{DOMAIN}_cache.db"
+CACHE_SNAPSHOT_NAME = f"{DOMAIN}_cache_snapshot.jsonl.gz"
 
 SEARCH_SERVICES_PROMPT = """
 You may utilise the Search Services tools to lookup up-to-date information from the internet.
@@ -35,6 +46,11 @@ CONF_BRAVE_LATITUDE = "brave_latitude"
 CONF_BRAVE_LONGITUDE = "brave_longitude"
 CONF_BRAVE_TIMEZONE = "brave_timezone"
 CONF_BRAVE_POST_CODE = "brave_post_code"
+CONF_BRAVE_CACHE_MAX_AGE = "brave_cache_max_age"
+CONF_BRAVE_NORMALISE_QUERY = "brave_normalise_query"
+CONF_BRAVE_FILLER_WORDS = "brave_filler_words"
+CONF_BRAVE_MAX_RETRIES = "brave_max_retries"
+CONF_BRAVE_RETRY_DEADLINE = "brave_retry_deadline"
 
 # Google Places-specific constants
 
@@ -45,11 +61,24 @@ CONF_GOOGLE_PLACES_LATITUDE = "google_places_latitude"
 CONF_GOOGLE_PLACES_LONGITUDE = "google_places_longitude"
 CONF_GOOGLE_PLACES_RADIUS = "google_places_radius"
 CONF_GOOGLE_PLACES_RANKING = "google_places_rank_preference"
+CONF_GOOGLE_PLACES_CACHE_MAX_AGE = "google_places_cache_max_age"
+CONF_GOOGLE_PLACES_NORMALISE_QUERY = "google_places_normalise_query"
+CONF_GOOGLE_PLACES_FILLER_WORDS = "google_places_filler_words"
+CONF_GOOGLE_PLACES_MAX_RETRIES = "google_places_max_retries"
+CONF_GOOGLE_PLACES_RETRY_DEADLINE = "google_places_retry_deadline"
 
 # Wikipedia-specific constants
 
 CONF_WIKIPEDIA_ENABLED = "wikipedia_enabled"
 CONF_WIKIPEDIA_NUM_RESULTS = "wikipedia_num_results"
+CONF_WIKIPEDIA_CACHE_MAX_AGE = "wikipedia_cache_max_age"
+CONF_WIKIPEDIA_NORMALISE_QUERY = "wikipedia_normalise_query"
+CONF_WIKIPEDIA_FILLER_WORDS = "wikipedia_filler_words"
+CONF_WIKIPEDIA_SUMMARY_CONCURRENCY = "wikipedia_summary_concurrency"
+CONF_WIKIPEDIA_SUMMARY_TIMEOUT = "wikipedia_summary_timeout"
+CONF_WIKIPEDIA_RETRIEVAL_MODE = "wikipedia_retrieval_mode"
+CONF_WIKIPEDIA_MAX_RETRIES = "wikipedia_max_retries"
+CONF_WIKIPEDIA_RETRY_DEADLINE = "wikipedia_retry_deadline"
 
 # Weather constants
 
@@ -59,7 +88,23 @@ CONF_HOURLY_WEATHER_ENTITY = "weather_hourly_entity"
 
 # Service defaults
 
+# Cache max ages are expressed in minutes, 0 disables caching for that tool
+
+# Trimmed from the end of normalised queries. Articles and prepositions are left
+# alone, as in "vitamin a" or "what is on" they change what is being asked
+DEFAULT_FILLER_WORDS = "please, thanks"
+
 SERVICE_DEFAULTS = {
+    CONF_CACHE_MAX_AGE: 120,
+    CONF_CACHE_STALE_MAX_AGE: 0,
+    CONF_CACHE_MAX_SIZE: 20,
+    CONF_CACHE_MEMORY_ONLY: False,
+    CONF_CACHE_SIMILARITY_THRESHOLD: 0,  # percent, 0 disables similar matching
+    CONF_CACHE_REFRESH_BUDGET: 0,  # refreshes per hour, 0 disables refresh-ahead
+    CONF_CACHE_BACKEND: "sqlite",
+    CONF_CACHE_REDIS_URL: "",
+    CONF_CACHE_MAX_ENTRIES: 0,  # 0 leaves the entry count unbounded
+    CONF_CACHE_EVICTION_POLICY: "tinylfu",
     CONF_BRAVE_API_KEY: "",
     CONF_BRAVE_NUM_RESULTS: 2,
     CONF_BRAVE_LATITUDE: "",
@@ -67,13 +112,31 @@ SERVICE_DEFAULTS = {
     CONF_BRAVE_TIMEZONE: "",
     CONF_BRAVE_COUNTRY_CODE: "",
     CONF_BRAVE_POST_CODE: "",
+    CONF_BRAVE_CACHE_MAX_AGE: 120,
+    CONF_BRAVE_NORMALISE_QUERY: True,
+    CONF_BRAVE_FILLER_WORDS: DEFAULT_FILLER_WORDS,
+    CONF_BRAVE_MAX_RETRIES: 2,
+    CONF_BRAVE_RETRY_DEADLINE: 10,  # seconds
     CONF_GOOGLE_PLACES_API_KEY: "",
     CONF_GOOGLE_PLACES_NUM_RESULTS: 2,
     CONF_GOOGLE_PLACES_LATITUDE: "",
     CONF_GOOGLE_PLACES_LONGITUDE: "",
     CONF_GOOGLE_PLACES_RADIUS: 5,
     CONF_GOOGLE_PLACES_RANKING: "Distance",
+    CONF_GOOGLE_PLACES_CACHE_MAX_AGE: 15,
+    CONF_GOOGLE_PLACES_NORMALISE_QUERY: True,
+    CONF_GOOGLE_PLACES_FILLER_WORDS: DEFAULT_FILLER_WORDS,
+    CONF_GOOGLE_PLACES_MAX_RETRIES: 2,
+    CONF_GOOGLE_PLACES_RETRY_DEADLINE: 10,  # seconds
     CONF_WIKIPEDIA_NUM_RESULTS: 1,
+    CONF_WIKIPEDIA_CACHE_MAX_AGE: 1440,
+    CONF_WIKIPEDIA_NORMALISE_QUERY: True,
+    CONF_WIKIPEDIA_FILLER_WORDS: DEFAULT_FILLER_WORDS,
+    CONF_WIKIPEDIA_SUMMARY_CONCURRENCY: 3,
+    CONF_WIKIPEDIA_SUMMARY_TIMEOUT: 5,  # seconds
+    CONF_WIKIPEDIA_RETRIEVAL_MODE: "extracts",
+    CONF_WIKIPEDIA_MAX_RETRIES: 2,
+    CONF_WIKIPEDIA_RETRY_DEADLINE: 8,  # seconds
     CONF_DAILY_WEATHER_ENTITY: None,
     CONF_HOURLY_WEATHER_ENTITY: None,
 }
@@ -0,0 +1,288 @@
+"""Policies deciding which entries to keep once the cache holds its maximum."""
+
+from __future__ import annotations
+
+import hashlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class EvictionPolicy(ABC):
+    """
+    Tracks resident keys and their use in memory.
+
+    Recording a hit never touches the storage backend; only the keys returned
+    by add need deleting from it.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """Keep at most capacity keys resident."""
+        self.capacity = capacity
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Return the number of resident keys."""
+
+    @abstractmethod
+    def __contains__(self, key: str) -> bool:
+        """Return whether key is resident."""
+
+    @abstractmethod
+    def access(self, key: str) -> None:
+        """Record a lookup of key, whether or not it is resident."""
+
+    @abstractmethod
+    def add(self, key: str) -> list[str]:
+        """Make key resident, returning the keys to evict, possibly including key."""
+
+    @abstractmethod
+    def remove(self, key: str) -> None:
+        """Forget a key that was removed from the cache by other means."""
+
+    def restore(self, keys: list[str]) -> list[str]:
+        """
+        Make the keys stored by a previous run resident, oldest first.
+
+        Returns the oldest keys beyond capacity, for eviction.
+        """
+        victims = []
+        for key in keys:
+            victims.extend(self.add(key))
+        return victims
+
+
+class LRUPolicy(EvictionPolicy):
+    """Evict the least recently used entry."""
+
+    def __init__(self, capacity: int) -> None:
+        """Start with no keys resident."""
+        super().__init__(capacity)
+        self._keys: OrderedDict[str, None] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of resident keys."""
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether key is resident."""
+        return key in self._keys
+
+    def access(self, key: str) -> None:
+        """Mark a resident key as the most recently used."""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+
+    def add(self, key: str) -> list[str]:
+        """Make key the most recently used, evicting the least recently used keys."""
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+
+        victims = []
+        while len(self._keys) > self.capacity:
+            victims.append(self._keys.popitem(last=False)[0])
+        return victims
+
+    def remove(self, key: str) -> None:
+        """Forget a key that was removed from the cache by other means."""
+        self._keys.pop(key, None)
+
+
+class LFUPolicy(EvictionPolicy):
+    """Evict the least frequently used entry, the least recent of any ties."""
+
+    def __init__(self, capacity: int) -> None:
+        """Start with no keys resident."""
+        super().__init__(capacity)
+        # key -> (uses while resident, tick of last use)
+        self._uses: dict[str, tuple[int, int]] = {}
+        self._tick = 0
+
+    def __len__(self) -> int:
+        """Return the number of resident keys."""
+        return len(self._uses)
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether key is resident."""
+        return key in self._uses
+
+    def access(self, key: str) -> None:
+        """Count a use of a resident key."""
+        self._tick += 1
+        if key in self._uses:
+            self._uses[key] = (self._uses[key][0] + 1, self._tick)
+
+    def add(self, key: str) -> list[str]:
+        """Make key resident, evicting the least frequently used key when full."""
+        self._tick += 1
+        if key in self._uses:
+            self._uses[key] = (self._uses[key][0], self._tick)
+            return []
+
+        victims = []
+        if len(self._uses) >= self.capacity:
+            victim = min(self._uses, key=self._uses.__getitem__)
+            del self._uses[victim]
+            victims.append(victim)
+
+        self._uses[key] = (1, self._tick)
+        return victims
+
+    def remove(self, key: str) -> None:
+        """Forget a key that was removed from the cache by other means."""
+        self._uses.pop(key, None)
+
+
+class CountMinSketch:
+    """
+    Approximate access counts for any number of keys in fixed memory.
+
+    Counters saturate at 15 and are all halved once enough accesses have been
+    recorded, so popularity that is no longer current fades away.
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, capacity: int) -> None:
+        """Size the sketch for about capacity distinct keys."""
+        width = 1 << max(capacity - 1, 1).bit_length()
+        self._mask = width - 1
+        self._rows = [bytearray(width) for _ in range(self.DEPTH)]
+        self._sample_size = 10 * max(capacity, 1)
+        self._additions = 0
+
+    def _indexes(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.DEPTH).digest()
+        return [
+            int.from_bytes(digest[i * 4 : i * 4 + 4], "little") & self._mask
+            for i in range(self.DEPTH)
+        ]
+
+    def frequency(self, key: str) -> int:
+        """Return the estimated number of recent accesses of key."""
+        return min(
+            row[i] for row, i in zip(self._rows, self._indexes(key), strict=True)
+        )
+
+    def increment(self, key: str) -> None:
+        """Count an access of key, halving every counter once enough are recorded."""
+        added = False
+        for row, i in zip(self._rows, self._indexes(key), strict=True):
+            if row[i] < self.MAX_COUNT:
+                row[i] += 1
+                added = True
+
+        if added:
+            self._additions += 1
+            if self._additions >= self._sample_size:
+                self._age()
+
+    def _age(self) -> None:
+        for row in self._rows:
+            row[:] = bytes(count >> 1 for count in row)
+        self._additions //= 2
+
+
+class TinyLFUPolicy(EvictionPolicy):
+    """
+    W-TinyLFU: a small LRU window in front of a segmented LRU main area.
+
+    New entries land in the window. When one leaves it, it only displaces the
+    main area's next victim if the sketch has seen it asked for more often,
+    so a burst of one-off queries cannot flush the popular ones.
+    """
+
+    WINDOW_RATIO = 0.01
+    PROTECTED_RATIO = 0.8
+
+    def __init__(self, capacity: int) -> None:
+        """Split capacity between the window and the main area."""
+        super().__init__(capacity)
+        self._window_capacity = max(1, int(capacity * self.WINDOW_RATIO))
+        self._main_capacity = max(capacity - self._window_capacity, 0)
+        self._protected_capacity = int(self._main_capacity * self.PROTECTED_RATIO)
+        self._window: OrderedDict[str, None] = OrderedDict()
+        # Main area entries start on probation and are protected once reused
+        self._probation: OrderedDict[str, None] = OrderedDict()
+        self._protected: OrderedDict[str, None] = OrderedDict()
+        self._sketch = CountMinSketch(capacity)
+
+    def __len__(self) -> int:
+        """Return the number of resident keys."""
+        return len(self._window) + len(self._probation) + len(self._protected)
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether key is resident."""
+        return key in self._window or key in self._probation or key in self._protected
+
+    def access(self, key: str) -> None:
+        """Count an access of key, promoting it if resident."""
+        self._sketch.increment(key)
+        self._touch(key)
+
+    def _touch(self, key: str) -> None:
+        if key in self._window:
+            self._window.move_to_end(key)
+        elif key in self._protected:
+            self._protected.move_to_end(key)
+        elif key in self._probation:
+            del self._probation[key]
+            self._protected[key] = None
+            if len(self._protected) > self._protected_capacity:
+                demoted, _ = self._protected.popitem(last=False)
+                self._probation[demoted] = None
+
+    def add(self, key: str) -> list[str]:
+        """Add key to the window, returning whichever keys lose admission."""
+        if key in self:
+            # Refreshing a resident entry is not a fresh request for it
+            self._touch(key)
+            return []
+
+        self._window[key] = None
+        victims = []
+        while len(self._window) > self._window_capacity:
+            candidate, _ = self._window.popitem(last=False)
+            victims.extend(self._admit(candidate))
+        return victims
+
+    def _admit(self, candidate: str) -> list[str]:
+        if len(self._probation) + len(self._protected) < self._main_capacity:
+            self._probation[candidate] = None
+            return []
+
+        segment = self._probation or self._protected
+        if not segment:
+            return [candidate]
+
+        victim = next(iter(segment))
+        if self._sketch.frequency(candidate) <= self._sketch.frequency(victim):
+            return [candidate]
+
+        del segment[victim]
+        self._probation[candidate] = None
+        return [victim]
+
+    def remove(self, key: str) -> None:
+        """Forget a key that was removed from the cache by other means."""
+        self._window.pop(key, None)
+        self._probation.pop(key, None)
+        self._protected.pop(key, None)
+
+    def restore(self, keys: list[str]) -> list[str]:
+        """Make the stored keys resident without consulting the empty sketch."""
+        # The sketch starts empty, so admission would turn away every key that
+        # leaves the window, keeping the oldest entries rather than the newest
+        excess = max(len(keys) - self.capacity, 0)
+        victims, keys = list(keys[:excess]), keys[excess:]
+        split = max(len(keys) - self._window_capacity, 0)
+        self._probation.update(dict.fromkeys(keys[:split]))
+        self._window.update(dict.fromkeys(keys[split:]))
+        return victims
+
+
+POLICIES: dict[str, type[EvictionPolicy]] = {
+    "lru": LRUPolicy,
+    "lfu": LFUPolicy,
+    "tinylfu": TinyLFUPolicy,
+}
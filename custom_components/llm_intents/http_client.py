@@ -0,0 +1,294 @@
+"""HTTP client shared by the tools that call upstream APIs."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+from homeassistant.util.ssl import get_default_context
+
+from .cache import RETRYABLE_STATUSES, retry_after
+from .const import DOMAIN
+from .metrics import get_metrics
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from homeassistant.core import Event, HomeAssistant
+
+logger = logging.getLogger(__name__)
+
+DATA_SESSION = "http_session"
+
+# Idle connections are kept open between the calls of a conversation, and
+# upstream hostnames are resolved once every few minutes rather than per request
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 5 * 60
+LIMIT_PER_HOST = 10
+
+# Only requests that can safely be sent twice are retried unless marked otherwise
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Spreads out the retries of clients that failed at the same moment
+_jitter = random.SystemRandom()
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often, and how long for, to retry failed requests to a provider."""
+
+    retries: int = 2
+    # Seconds allowed for a tool call's requests, including every retry and wait
+    deadline: float = 10
+    base_delay: float = 0.25
+    max_delay: float = 2
+
+    def backoff(self, attempt: int) -> float:
+        """Return a jittered wait before the given retry, counting from 1."""
+        return _jitter.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+
+@dataclass(frozen=True)
+class Provider:
+    """An upstream API, and how long to wait for it."""
+
+    # The tool module name, which keys its metrics
+    tool: str
+    label: str
+    timeout: aiohttp.ClientTimeout
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+
+
+@dataclass
+class ProviderResponse:
+    """A fully read response from a provider."""
+
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        """Decode the body as JSON."""
+        return json.loads(self.body)
+
+    def text(self) -> str:
+        """Decode the body as text, replacing invalid bytes."""
+        return self.body.decode(errors="replace")
+
+
+class ProviderError(Exception):
+    """A provider could not be reached or did not respond in time."""
+
+
+def async_get_session(hass: HomeAssistant) -> aiohttp.ClientSession:
+    """Return the session shared by every provider, creating it on first use."""
+    session = hass.data.setdefault(DOMAIN, {}).get(DATA_SESSION)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            ssl=get_default_context(),
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            limit_per_host=LIMIT_PER_HOST,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector, headers={"User-Agent": SERVER_SOFTWARE}
+        )
+        hass.data[DOMAIN][DATA_SESSION] = session
+
+        # Entries are not unloaded when Home Assistant stops, so close it then too
+        async def _async_close(event: Event) -> None:
+            await async_close_session(hass)
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close)
+    return session
+
+
+async def async_close_session(hass: HomeAssistant):
+    """Close the shared session and its pooled connections."""
+    session = hass.data.get(DOMAIN, {}).pop(DATA_SESSION, None)
+    if session is not None:
+        await session.close()
+
+
+class ProviderClient:
+    """
+    Makes requests to a single provider through the shared session.
+
+    Every request is timed into the provider's tool metrics. Timeouts,
+    connection failures and retryable statuses are retried with backoff within
+    the retry policy's deadline, which starts when the client is created and is
+    shared by all its requests, so a client is made for each tool call. Once
+    retries are exhausted, timeouts and connection failures are raised as
+    ProviderError, while HTTP error statuses are returned for the tool to handle.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        provider: Provider,
+        retries: int | None = None,
+        deadline: float | None = None,
+    ) -> None:
+        """Make a client whose retry policy overrides the provider's where given."""
+        self._hass = hass
+        self.provider = provider
+        self.retry = RetryPolicy(
+            retries=provider.retry.retries if retries is None else retries,
+            deadline=provider.retry.deadline if deadline is None else deadline,
+            base_delay=provider.retry.base_delay,
+            max_delay=provider.retry.max_delay,
+        )
+        self._give_up_at = time.monotonic() + self.retry.deadline
+
+    def renewed(self) -> ProviderClient:
+        """Return a client for the same provider whose deadline starts now."""
+        return ProviderClient(
+            self._hass, self.provider, self.retry.retries, self.retry.deadline
+        )
+
+    async def get(self, url: str, **kwargs: Any) -> ProviderResponse:
+        """Send a GET request."""
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> ProviderResponse:
+        """Send a POST request, which is only retried if marked idempotent."""
+        return await self.request("POST", url, **kwargs)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        request_timeout: aiohttp.ClientTimeout | None = None,
+        idempotent: bool | None = None,
+        **kwargs: Any,
+    ) -> ProviderResponse:
+        """
+        Send a request, retrying it if allowed, and read the whole response body.
+
+        A request_timeout passed here also caps the deadline, so it bounds the
+        retries.
+        """
+        give_up_at = self._give_up_at
+        if time.monotonic() >= give_up_at:
+            msg = (
+                f"{self.provider.label} requests took longer than "
+                f"{self.retry.deadline:.3g}s"
+            )
+            raise ProviderError(msg)
+        if request_timeout is not None and request_timeout.total:
+            give_up_at = min(give_up_at, time.monotonic() + request_timeout.total)
+        timeout = request_timeout or self.provider.timeout
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        retries = self.retry.retries if idempotent else 0
+
+        attempt = 0
+        while True:
+            error = None
+            try:
+                response = await self._async_send(
+                    method,
+                    url,
+                    _within(timeout, give_up_at - time.monotonic()),
+                    **kwargs,
+                )
+            except ProviderError as e:
+                response, error = None, e
+
+            delay = self._retry_delay(attempt, retries, response)
+            if delay is None or time.monotonic() + delay >= give_up_at:
+                if error is not None:
+                    raise error
+                return response
+
+            attempt += 1
+            get_metrics(self.provider.tool).request_retries += 1
+            reason = error or f"HTTP {response.status}"
+            logger.debug(
+                "Retrying %s request in %.2fs after %s",
+                self.provider.label,
+                delay,
+                reason,
+            )
+            await asyncio.sleep(delay)
+
+    def _retry_delay(
+        self, attempt: int, retries: int, response: ProviderResponse | None
+    ) -> float | None:
+        """Return how long to wait before retrying, or None not to retry."""
+        if attempt >= retries:
+            return None
+        if response is None:
+            return self.retry.backoff(attempt + 1)
+        if response.status not in RETRYABLE_STATUSES:
+            return None
+
+        # A Retry-After is waited out in full, unless longer than we ever wait
+        delay = retry_after(response.headers)
+        if delay is None:
+            return self.retry.backoff(attempt + 1)
+        if delay > self.retry.max_delay:
+            return None
+        return delay
+
+    async def _async_send(
+        self,
+        method: str,
+        url: str,
+        client_timeout: aiohttp.ClientTimeout,
+        **kwargs: Any,
+    ) -> ProviderResponse:
+        session = async_get_session(self._hass)
+        metrics = get_metrics(self.provider.tool)
+        start = time.perf_counter()
+        error = True
+        try:
+            async with session.request(
+                method, url, timeout=client_timeout, **kwargs
+            ) as resp:
+                response = ProviderResponse(
+                    resp.status, resp.headers.copy(), await resp.read()
+                )
+            error = response.status >= 400
+        except TimeoutError as e:
+            msg = (
+                f"{self.provider.label} did not respond within "
+                f"{client_timeout.total:.3g}s"
+            )
+            raise ProviderError(msg) from e
+        except aiohttp.ClientError as e:
+            msg = f"Could not reach {self.provider.label}: {e}"
+            raise ProviderError(msg) from e
+        else:
+            return response
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            metrics.requests += 1
+            metrics.request_errors += error
+            metrics.request_latency.append(elapsed)
+            logger.debug(
+                "%s %s request took %.0fms", method, self.provider.label, elapsed
+            )
+
+
+def _within(timeout: aiohttp.ClientTimeout, remaining: float) -> aiohttp.ClientTimeout:
+    # Shorten a request's total timeout to the time left before the deadline
+    if timeout.total is not None and timeout.total <= remaining:
+        return timeout
+    return aiohttp.ClientTimeout(
+        total=remaining,
+        connect=timeout.connect,
+        sock_read=timeout.sock_read,
+        sock_connect=timeout.sock_connect,
+    )
@@ -0,0 +1,133 @@
+"""Per-tool performance counters, surfaced as diagnostic sensors."""
+
+from __future__ import annotations
+
+import functools
+import json
+import math
+import time
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+# Latency percentiles are computed over a sliding window of recent calls
+LATENCY_SAMPLES = 256
+
+# Queries as asked remembered per tool, to tell which hits normalisation earned
+SEEN_QUERIES = 1024
+
+
+def _latency_window() -> deque[float]:
+    return deque(maxlen=LATENCY_SAMPLES)
+
+
+def percentile(samples, pct: float) -> float | None:
+    """Return the nearest-rank percentile of samples, or None when empty."""
+    if not samples:
+        return None
+
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+@dataclass
+class ToolMetrics:
+    """Counters and latency samples (milliseconds) for a single tool."""
+
+    calls: int = 0
+    errors: int = 0
+    upstream_calls: int = 0
+    upstream_errors: int = 0
+    # Cache hits only reached because the query was normalised
+    normalised_hits: int = 0
+    call_latency: deque[float] = field(default_factory=_latency_window)
+    upstream_latency: deque[float] = field(default_factory=_latency_window)
+    # Individual HTTP requests, several of which may make up one upstream call
+    requests: int = 0
+    request_errors: int = 0
+    request_retries: int = 0
+    request_latency: deque[float] = field(default_factory=_latency_window)
+    seen_queries: OrderedDict[str, None] = field(default_factory=OrderedDict)
+
+
+# Keyed by the tool module name, matching the cache's tool key
+_metrics: defaultdict[str, ToolMetrics] = defaultdict(ToolMetrics)
+
+
+def get_metrics(tool: str) -> ToolMetrics:
+    """Return the metrics for a tool, creating them on first use."""
+    return _metrics[tool]
+
+
+def reset_metrics():
+    """Discard all collected metrics."""
+    _metrics.clear()
+
+
+def record_lookup(tool: str, raw_params: dict, *, normalised: bool, hit: bool):
+    """
+    Record a cache lookup made with a normalised query.
+
+    A hit only counts towards normalised_hits when the query was changed by
+    normalisation and the same query as asked has not been looked up recently,
+    so it would have missed without normalisation.
+    """
+    metrics = _metrics[tool]
+    key = json.dumps(raw_params, sort_keys=True, default=str)
+    if hit and normalised and key not in metrics.seen_queries:
+        metrics.normalised_hits += 1
+
+    metrics.seen_queries[key] = None
+    metrics.seen_queries.move_to_end(key)
+    if len(metrics.seen_queries) > SEEN_QUERIES:
+        metrics.seen_queries.popitem(last=False)
+
+
+def _is_error(response: Any) -> bool:
+    return isinstance(response, dict) and "error" in response
+
+
+def _timed(
+    record: Callable[..., None],
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    def decorator(
+        func: Callable[..., Awaitable[Any]],
+    ) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            metrics = _metrics[func.__module__]
+            start = time.perf_counter()
+            error = True
+            try:
+                response = await func(*args, **kwargs)
+                error = _is_error(response)
+                return response
+            finally:
+                record(metrics, (time.perf_counter() - start) * 1000, error=error)
+
+        return wrapper
+
+    return decorator
+
+
+def _record_call(metrics: ToolMetrics, elapsed: float, *, error: bool) -> None:
+    metrics.calls += 1
+    metrics.errors += error
+    metrics.call_latency.append(elapsed)
+
+
+def _record_upstream(metrics: ToolMetrics, elapsed: float, *, error: bool) -> None:
+    metrics.upstream_calls += 1
+    metrics.upstream_errors += error
+    metrics.upstream_latency.append(elapsed)
+
+
+# Wraps a tool's async_call; error responses and exceptions count as errors
+track_tool_call = _timed(_record_call)
+
+# Wraps the coroutine that fetches from the upstream API on a cache miss
+track_upstream_call = _timed(_record_upstream)
@@ -0,0 +1,57 @@
+"""Canonicalise search queries so trivially different phrasings share a cache entry."""
+
+from __future__ import annotations
+
+import unicodedata
+from dataclasses import dataclass
+
+from .const import DEFAULT_FILLER_WORDS
+
+# Sentence punctuation only, so queries such as "C#" or "C++" keep their meaning
+TRAILING_PUNCTUATION = ".,!?;:…。、"
+
+
+def filler_words(text: str) -> frozenset[str]:
+    """Parse a comma-separated list of filler words from a tool's options."""
+    return frozenset(word.strip().casefold() for word in text.split(",")) - {""}
+
+
+TRAILING_STOPWORDS = filler_words(DEFAULT_FILLER_WORDS)
+
+
+@dataclass(frozen=True)
+class QueryRules:
+    """How a tool's queries are canonicalised into cache keys."""
+
+    casefold: bool = True
+    strip_punctuation: bool = True
+    stopwords: frozenset[str] = TRAILING_STOPWORDS
+
+
+def normalise_query(query: str, rules: QueryRules) -> str:
+    """Return the canonical form of a query under the given rules."""
+    text = unicodedata.normalize("NFKC", query)
+    if rules.casefold:
+        text = text.casefold()
+
+    words = text.split()
+    while words:
+        if rules.strip_punctuation:
+            words[-1] = words[-1].rstrip(TRAILING_PUNCTUATION)
+            if not words[-1]:
+                words.pop()
+                continue
+
+        # Never trim a query down to nothing, nor drop a letter such as "vitamin a"
+        if (
+            len(words) > 1
+            and len(words[-1]) > 1
+            and words[-1].casefold() in rules.stopwords
+        ):
+            words.pop()
+            continue
+
+        break
+
+    # A query made entirely of punctuation is left as the user wrote it
+    return " ".join(words) or " ".join(text.split())
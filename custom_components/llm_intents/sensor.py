@@ -0,0 +1,262 @@
+"""Diagnostic sensors exposing cache and tool performance."""
+
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfTime,
+)
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.update_coordinator import (
+    CoordinatorEntity,
+    DataUpdateCoordinator,
+)
+
+from .BraveSearch import SearchWebTool
+from .cache import CacheStats, SQLiteCache
+from .const import (
+    ADDON_NAME,
+    CONF_BRAVE_ENABLED,
+    CONF_GOOGLE_PLACES_ENABLED,
+    CONF_WIKIPEDIA_ENABLED,
+    DOMAIN,
+)
+from .GooglePlaces import FindPlacesTool
+from .metrics import get_metrics, percentile
+from .Wikipedia import SearchWikipediaTool
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+    from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+_LOGGER = logging.getLogger(__name__)
+
+UPDATE_INTERVAL = timedelta(minutes=1)
+
+# (enabled key, tool class, device name) for every tool backed by the cache
+SENSOR_TOOLS = [
+    (CONF_BRAVE_ENABLED, SearchWebTool, "Brave Web Search"),
+    (CONF_GOOGLE_PLACES_ENABLED, FindPlacesTool, "Google Places"),
+    (CONF_WIKIPEDIA_ENABLED, SearchWikipediaTool, "Wikipedia"),
+]
+
+_LATENCY = {
+    "device_class": SensorDeviceClass.DURATION,
+    "native_unit_of_measurement": UnitOfTime.MILLISECONDS,
+    "state_class": SensorStateClass.MEASUREMENT,
+    "suggested_display_precision": 0,
+}
+
+SENSOR_DESCRIPTIONS = (
+    SensorEntityDescription(
+        key="hit_ratio",
+        translation_key="hit_ratio",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+    ),
+    SensorEntityDescription(
+        key="normalisation_uplift",
+        translation_key="normalisation_uplift",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+    ),
+    SensorEntityDescription(
+        key="similar_hits",
+        translation_key="similar_hits",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+    ),
+    SensorEntityDescription(
+        key="misses",
+        translation_key="misses",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+    ),
+    SensorEntityDescription(
+        key="upstream_calls",
+        translation_key="upstream_calls",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+    ),
+    SensorEntityDescription(
+        key="errors",
+        translation_key="errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+    ),
+    SensorEntityDescription(
+        key="call_latency_p50", translation_key="call_latency_p50", **_LATENCY
+    ),
+    SensorEntityDescription(
+        key="call_latency_p95", translation_key="call_latency_p95", **_LATENCY
+    ),
+    SensorEntityDescription(
+        key="upstream_latency_p50", translation_key="upstream_latency_p50", **_LATENCY
+    ),
+    SensorEntityDescription(
+        key="upstream_latency_p95", translation_key="upstream_latency_p95", **_LATENCY
+    ),
+    SensorEntityDescription(
+        key="request_errors",
+        translation_key="request_errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+    ),
+    SensorEntityDescription(
+        key="request_retries",
+        translation_key="request_retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+    ),
+    SensorEntityDescription(
+        key="request_latency_p50", translation_key="request_latency_p50", **_LATENCY
+    ),
+    SensorEntityDescription(
+        key="request_latency_p95", translation_key="request_latency_p95", **_LATENCY
+    ),
+    SensorEntityDescription(
+        key="cache_rows",
+        translation_key="cache_rows",
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    SensorEntityDescription(
+        key="cache_size",
+        translation_key="cache_size",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+)
+
+
+class ToolMetricsCoordinator(DataUpdateCoordinator[dict[str, dict]]):
+    """Periodically snapshot cache counters and tool metrics."""
+
+    def __init__(
+        self, hass: HomeAssistant, entry: ConfigEntry, tools: list[str]
+    ) -> None:
+        """Snapshot the given tools' counters every update interval."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=entry,
+            name=f"{ADDON_NAME} metrics",
+            update_interval=UPDATE_INTERVAL,
+        )
+        self.tools = tools
+
+    async def _async_update_data(self) -> dict[str, dict]:
+        cache = SQLiteCache()
+        stats = cache.stats
+        usage = await cache.async_usage()
+
+        data = {}
+        for tool in self.tools:
+            cache_stats = stats.get(tool, CacheStats())
+            metrics = get_metrics(tool)
+            lookups = cache_stats.hits + cache_stats.misses
+            rows, size = usage.get(tool, (0, 0))
+
+            data[tool] = {
+                "hit_ratio": cache_stats.hits / lookups * 100 if lookups else None,
+                "normalisation_uplift": (
+                    metrics.normalised_hits / lookups * 100 if lookups else None
+                ),
+                "similar_hits": cache_stats.similar_hits,
+                "misses": cache_stats.misses,
+                "upstream_calls": metrics.upstream_calls,
+                "errors": metrics.errors,
+                "call_latency_p50": percentile(metrics.call_latency, 50),
+                "call_latency_p95": percentile(metrics.call_latency, 95),
+                "upstream_latency_p50": percentile(metrics.upstream_latency, 50),
+                "upstream_latency_p95": percentile(metrics.upstream_latency, 95),
+                "request_errors": metrics.request_errors,
+                "request_retries": metrics.request_retries,
+                "request_latency_p50": percentile(metrics.request_latency, 50),
+                "request_latency_p95": percentile(metrics.request_latency, 95),
+                "cache_rows": rows,
+                "cache_size": size,
+                "attributes": {},
+            }
+            if cache_stats.last_similar_match is not None:
+                query, matched_query = cache_stats.last_similar_match
+                data[tool]["attributes"]["similar_hits"] = {
+                    "last_query": query,
+                    "last_matched_query": matched_query,
+                }
+
+        return data
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up diagnostic sensors for each enabled tool."""
+    config_data = {**entry.data, **entry.options}
+    tools = [
+        (tool_class, device_name)
+        for key, tool_class, device_name in SENSOR_TOOLS
+        if config_data.get(key)
+    ]
+    if not tools:
+        return
+
+    coordinator = ToolMetricsCoordinator(
+        hass, entry, [tool_class.__module__ for tool_class, _ in tools]
+    )
+    await coordinator.async_config_entry_first_refresh()
+
+    async_add_entities(
+        ToolMetricSensor(coordinator, entry, tool_class, device_name, description)
+        for tool_class, device_name in tools
+        for description in SENSOR_DESCRIPTIONS
+    )
+
+
+class ToolMetricSensor(CoordinatorEntity[ToolMetricsCoordinator], SensorEntity):
+    """A single performance metric for one tool."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(
+        self,
+        coordinator: ToolMetricsCoordinator,
+        entry: ConfigEntry,
+        tool_class: type,
+        device_name: str,
+        description: SensorEntityDescription,
+    ) -> None:
+        """Describe one metric of a tool, grouped under the tool's device."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._tool = tool_class.__module__
+        self._attr_unique_id = f"{entry.entry_id}_{tool_class.name}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"{entry.entry_id}_{tool_class.name}")},
+            name=device_name,
+            manufacturer=ADDON_NAME,
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    @property
+    def native_value(self) -> float | int | None:
+        """Return the metric from the latest snapshot."""
+        return self.coordinator.data[self._tool][self.entity_description.key]
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Return the details behind the metric, if it has any."""
+        attributes = self.coordinator.data[self._tool]["attributes"]
+        return attributes.get(self.entity_description.key)
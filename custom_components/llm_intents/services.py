@@ -0,0 +1,226 @@
+"""Services for managing the tool cache."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import voluptuous as vol
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import llm
+
+from .cache import CacheStats, SQLiteCache
+from .const import CACHE_SNAPSHOT_NAME, DOMAIN
+from .llm_functions import SEARCH_CONF_ENABLED_MAP
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_CLEAR_CACHE = "clear_cache"
+SERVICE_CACHE_STATS = "cache_stats"
+SERVICE_WARM_CACHE = "warm_cache"
+SERVICE_EXPORT_CACHE = "export_cache"
+SERVICE_IMPORT_CACHE = "import_cache"
+
+ATTR_TOOL = "tool"
+ATTR_TOOLS = "tools"
+ATTR_QUERIES = "queries"
+ATTR_PATH = "path"
+
+# Maximum number of warm-up queries sent upstream at once
+WARM_CONCURRENCY = 3
+
+# tool name -> (enabled key, tool class) for every tool backed by the cache
+CACHED_TOOLS = {
+    tool_class.name: (key, tool_class) for key, tool_class in SEARCH_CONF_ENABLED_MAP
+}
+
+CLEAR_CACHE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_TOOL): vol.In(list(CACHED_TOOLS)),
+    }
+)
+
+WARM_CACHE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_QUERIES): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_TOOLS): vol.All(cv.ensure_list, [vol.In(list(CACHED_TOOLS))]),
+    }
+)
+
+SNAPSHOT_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_PATH): cv.string,
+    }
+)
+
+
+def _get_config(hass: HomeAssistant) -> dict:
+    if "config" not in hass.data.get(DOMAIN, {}):
+        msg = f"{DOMAIN} has not been set up"
+        raise ServiceValidationError(msg)
+
+    entry = next(iter(hass.config_entries.async_entries(DOMAIN)))
+    return {**hass.data[DOMAIN]["config"], **entry.options}
+
+
+async def async_clear_cache(call: ServiceCall) -> None:
+    """Remove cached responses, optionally for a single tool."""
+    tool_name = call.data.get(ATTR_TOOL)
+    tool = CACHED_TOOLS[tool_name][1].__module__ if tool_name else None
+
+    deleted = await SQLiteCache().async_clear(tool)
+    _LOGGER.info(
+        "Cleared %s cached responses for %s", deleted, tool_name or "all tools"
+    )
+
+
+async def async_cache_stats(call: ServiceCall) -> ServiceResponse:
+    """Return cache counters and on-disk usage for each tool."""
+    cache = SQLiteCache()
+    stats = cache.stats
+    usage = await cache.async_usage()
+
+    tools = {}
+    for tool_name, (_, tool_class) in CACHED_TOOLS.items():
+        tool_stats = stats.get(tool_class.__module__, CacheStats())
+        rows, size = usage.get(tool_class.__module__, (0, 0))
+        lookups = tool_stats.hits + tool_stats.misses
+        tools[tool_name] = {
+            "hits": tool_stats.hits,
+            "misses": tool_stats.misses,
+            "hit_ratio": round(tool_stats.hits / lookups, 3) if lookups else None,
+            "similar_hits": tool_stats.similar_hits,
+            "evictions": tool_stats.evictions,
+            "refreshes": tool_stats.refreshes,
+            "revalidations": tool_stats.revalidations,
+            "entries": rows,
+            "size_bytes": size,
+        }
+
+    return {
+        "tools": tools,
+        "entries": sum(tool["entries"] for tool in tools.values()),
+        "size_bytes": sum(tool["size_bytes"] for tool in tools.values()),
+    }
+
+
+async def async_warm_cache(call: ServiceCall) -> ServiceResponse:
+    """Run queries through the enabled tools so that their results are cached."""
+    hass = call.hass
+    config_data = _get_config(hass)
+
+    # Default to every enabled tool, but reject explicitly requested disabled ones
+    tool_names = call.data.get(ATTR_TOOLS)
+    tools = []
+    for tool_name, (key, tool_class) in CACHED_TOOLS.items():
+        if tool_names and tool_name not in tool_names:
+            continue
+        if config_data.get(key):
+            tools.append(tool_class())
+        elif tool_names:
+            msg = f"Tool {tool_name} is not enabled"
+            raise ServiceValidationError(msg)
+
+    llm_context = llm.LLMContext(
+        platform=DOMAIN,
+        context=call.context,
+        language=None,
+        assistant=None,
+        device_id=None,
+    )
+    semaphore = asyncio.Semaphore(WARM_CONCURRENCY)
+
+    async def warm(tool: llm.Tool, query: str) -> dict | None:
+        async with semaphore:
+            response = await tool.async_call(
+                hass,
+                llm.ToolInput(tool_name=tool.name, tool_args={"query": query}),
+                llm_context,
+            )
+
+        if isinstance(response, dict) and "error" in response:
+            return {"tool": tool.name, "query": query, "error": response["error"]}
+        return None
+
+    results = await asyncio.gather(
+        *[warm(tool, query) for tool in tools for query in call.data[ATTR_QUERIES]]
+    )
+    failed = [result for result in results if result is not None]
+
+    return {"warmed": len(results) - len(failed), "failed": failed}
+
+
+def _snapshot_path(call: ServiceCall) -> str:
+    # Only the default location or an allowlisted directory may be written to
+    path = call.data.get(ATTR_PATH)
+    if path is None:
+        return call.hass.config.path(".storage", CACHE_SNAPSHOT_NAME)
+    if not call.hass.config.is_allowed_path(path):
+        msg = f"Path {path} is not in allowlist_external_dirs"
+        raise ServiceValidationError(msg)
+    return path
+
+
+async def async_export_cache(call: ServiceCall) -> ServiceResponse:
+    """Write the unexpired cache entries to a snapshot file."""
+    path = _snapshot_path(call)
+    try:
+        exported = await SQLiteCache().async_export(path)
+    except OSError as e:
+        msg = f"Failed to export cache to {path}: {e}"
+        raise HomeAssistantError(msg) from e
+
+    return {"path": path, "exported": exported}
+
+
+async def async_import_cache(call: ServiceCall) -> ServiceResponse:
+    """Load the unexpired entries of a snapshot file into the cache."""
+    path = _snapshot_path(call)
+    try:
+        imported, skipped = await SQLiteCache().async_import(path)
+    except (OSError, KeyError, ValueError) as e:
+        msg = f"Failed to import cache from {path}: {e}"
+        raise HomeAssistantError(msg) from e
+
+    return {"path": path, "imported": imported, "skipped": skipped}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the cache management services."""
+    hass.services.async_register(
+        DOMAIN, SERVICE_CLEAR_CACHE, async_clear_cache, schema=CLEAR_CACHE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CACHE_STATS,
+        async_cache_stats,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_WARM_CACHE,
+        async_warm_cache,
+        schema=WARM_CACHE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_CACHE,
+        async_export_cache,
+        schema=SNAPSHOT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_IMPORT_CACHE,
+        async_import_cache,
+        schema=SNAPSHOT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -0,0 +1,92 @@
+"""Trigram index for matching paraphrased queries against cached ones."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+
+
+def query_grams(query: str) -> frozenset[str]:
+    """Return the character trigrams of each word, ignoring word order."""
+    grams = set()
+    for word in query.casefold().split():
+        padded = f" {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class SimilarityIndex:
+    """
+    Inverted index from trigrams to cache keys.
+
+    Entries are partitioned so that only queries made with otherwise identical
+    parameters (result count, location and so on) can match each other.
+    """
+
+    def __init__(self) -> None:
+        """Start with no queries indexed."""
+        # key -> (partition, query, grams)
+        self._entries: dict[str, tuple[str, str, frozenset[str]]] = {}
+        self._postings: defaultdict[str, defaultdict[str, set[str]]] = defaultdict(
+            lambda: defaultdict(set)
+        )
+
+    def __len__(self) -> int:
+        """Return the number of indexed queries."""
+        return len(self._entries)
+
+    def add(self, key: str, partition: str, query: str) -> None:
+        """Index query under key, within its partition."""
+        self.discard(key)
+
+        grams = query_grams(query)
+        if not grams:
+            return
+
+        self._entries[key] = (partition, query, grams)
+        postings = self._postings[partition]
+        for gram in grams:
+            postings[gram].add(key)
+
+    def discard(self, key: str) -> None:
+        """Remove key from the index if it is indexed."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        partition, _, grams = entry
+        postings = self._postings[partition]
+        for gram in grams:
+            postings[gram].discard(key)
+            if not postings[gram]:
+                del postings[gram]
+        if not postings:
+            del self._postings[partition]
+
+    def clear(self) -> None:
+        """Remove every indexed query."""
+        self._entries.clear()
+        self._postings.clear()
+
+    def search(
+        self, partition: str, query: str, threshold: float
+    ) -> tuple[str, str, float] | None:
+        """Return the (key, query, score) most similar to query, if any qualify."""
+        grams = query_grams(query)
+        postings = self._postings.get(partition)
+        if not grams or not postings:
+            return None
+
+        overlaps: defaultdict[str, int] = defaultdict(int)
+        for gram in grams:
+            for key in postings.get(gram, ()):
+                overlaps[key] += 1
+
+        best = None
+        for key, overlap in overlaps.items():
+            _, cached_query, cached_grams = self._entries[key]
+            # Jaccard similarity of the two trigram sets
+            score = overlap / (len(grams) + len(cached_grams) - overlap)
+            if score >= threshold and (best is None or score > best[2]):
+                best = (key, cached_query, score)
+
+        return best
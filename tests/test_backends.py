@@ -0,0 +1,316 @@
+"""Test the cache storage backends."""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from custom_components.llm_intents.backends import (
+    MemoryBackend,
+    RedisBackend,
+    SQLiteBackend,
+)
+from custom_components.llm_intents.cache import SQLiteCache
+from custom_components.llm_intents.const import (
+    CONF_CACHE_BACKEND,
+    CONF_CACHE_REDIS_URL,
+)
+
+REDIS_PASSWORD = "secret"
+
+
+class FakeRedis:
+    """A local server speaking just enough RESP for the Redis backend."""
+
+    def __init__(self, password: str | None = None) -> None:
+        """Require password to be sent with AUTH before other commands."""
+        self.password = password
+        self.data: dict[bytes, dict | set] = {}
+        self.expires: dict[bytes, float] = {}
+        self.commands: list[list[bytes]] = []
+        self.connections = 0
+        # Seconds to wait before each reply, to simulate an unresponsive server
+        self.delay = 0.0
+        self._server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        """Return the URL to connect to the server with."""
+        port = self._server.sockets[0].getsockname()[1]
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{port}/1"
+
+    async def start(self) -> None:
+        """Listen on a free local port."""
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _live(self, key: bytes) -> dict | set | None:
+        if key in self.expires and self.expires[key] <= time.time():
+            self.data.pop(key, None)
+            del self.expires[key]
+        return self.data.get(key)
+
+    async def _handle(self, reader, writer) -> None:
+        authed = self.password is None
+        self.connections += 1
+        try:
+            while line := await reader.readline():
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                self.commands.append(args)
+
+                name = args[0].upper()
+                if name == b"AUTH":
+                    authed = args[-1].decode() == self.password
+                    reply = b"+OK" if authed else b"-WRONGPASS invalid password"
+                elif not authed:
+                    reply = b"-NOAUTH Authentication required"
+                else:
+                    reply = self._command(name, args[1:])
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                writer.write(reply + b"\r\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _command(self, name: bytes, args: list[bytes]) -> bytes:
+        reply = b":1"
+        if name == b"SELECT":
+            reply = b"+OK"
+        elif name == b"DEL":
+            removed = self._live(args[0]) is not None
+            self.data.pop(args[0], None)
+            self.expires.pop(args[0], None)
+            reply = b":%d" % removed
+        elif name == b"EXISTS":
+            reply = b":%d" % (self._live(args[0]) is not None)
+        elif name == b"HSET":
+            entry = self.data.setdefault(args[0], {})
+            entry.update(zip(args[1::2], args[2::2], strict=True))
+        elif name in (b"HGET", b"HMGET"):
+            entry = self._live(args[0]) or {}
+            encoded = [_bulk(entry.get(field)) for field in args[1:]]
+            if name == b"HGET":
+                reply = encoded[0]
+            else:
+                reply = b"\r\n".join([b"*%d" % len(encoded), *encoded])
+        elif name == b"PEXPIREAT":
+            self.expires[args[0]] = int(args[1]) / 1000
+        elif name == b"SADD":
+            self.data.setdefault(args[0], set()).update(args[1:])
+        elif name == b"SREM":
+            self.data.get(args[0], set()).difference_update(args[1:])
+        elif name == b"SMEMBERS":
+            members = sorted(self._live(args[0]) or ())
+            reply = b"\r\n".join(
+                [b"*%d" % len(members), *[_bulk(member) for member in members]]
+            )
+        else:
+            reply = b"-ERR unknown command"
+        return reply
+
+
+def _bulk(value: bytes | None) -> bytes:
+    return b"$-1" if value is None else b"$%d\r\n%s" % (len(value), value)
+
+
+@pytest.fixture
+async def redis_server(socket_enabled):
+    """Run a fake Redis server for the duration of a test."""
+    server = FakeRedis(password=REDIS_PASSWORD)
+    await server.start()
+    yield server
+    await server.stop()
+
+
+class TestRedisBackend:
+    """Test the Redis protocol backend against a local fake server."""
+
+    async def test_set_and_get(self, redis_server):
+        """Test that an entry round-trips and the connection is authenticated."""
+        backend = RedisBackend(redis_server.url)
+        now = int(time.time())
+        await backend.async_set("tool", "k1", now, now + 60, now + 120, '{"r": 1}')
+
+        assert await backend.async_get("k1") == ('{"r": 1}', now + 60, now + 120)
+        assert await backend.async_get("missing") is None
+        assert redis_server.commands[0] == [b"AUTH", b"secret"]
+        assert redis_server.commands[1] == [b"SELECT", b"1"]
+        await backend.async_close()
+
+    async def test_expired_entry_misses_and_is_pruned(self, redis_server):
+        """Test that expired entries miss and are dropped from the tool index."""
+        backend = RedisBackend(redis_server.url)
+        now = int(time.time())
+        await backend.async_set("tool", "old", now - 20, now - 10, now - 5, "{}")
+        await backend.async_set("tool", "new", now, now + 60, now + 60, "{}")
+
+        assert await backend.async_get("old") is None
+        assert await backend.async_expire() == ["old"]
+        assert (await backend.async_usage())["tool"][0] == 1
+        await backend.async_close()
+
+    async def test_clear_usage_and_similarity_rows(self, redis_server):
+        """Test per-tool clearing, usage and the similarity rows."""
+        backend = RedisBackend(redis_server.url)
+        now = int(time.time())
+        await backend.async_set(
+            "tool", "k1", now, now + 60, now + 60, "{}", "scope", "paris weather"
+        )
+        await backend.async_set("other_tool", "k2", now, now + 60, now + 60, "{}")
+
+        assert await backend.async_similarity_rows() == [
+            ("k1", "scope", "paris weather")
+        ]
+        assert set(await backend.async_usage()) == {"tool", "other_tool"}
+
+        assert await backend.async_clear("tool") == ["k1"]
+        assert await backend.async_get("k1") is None
+        assert await backend.async_get("k2") is not None
+        assert await backend.async_clear(None) == ["k2"]
+        await backend.async_close()
+
+    async def test_entries(self, redis_server):
+        """Test that unexpired entries are listed with their metadata."""
+        backend = RedisBackend(redis_server.url)
+        now = int(time.time())
+        await backend.async_set(
+            "tool", "k1", now, now + 60, now + 120, "{}", "scope", "paris weather"
+        )
+        await backend.async_set("tool", "old", now - 20, now - 10, now - 5, "{}")
+
+        assert [row async for row in backend.async_entries()] == [
+            ("tool", "k1", now, now + 60, now + 120, "{}", "scope", "paris weather")
+        ]
+        await backend.async_close()
+
+    async def test_unreachable_server_degrades_to_misses(self, redis_server):
+        """Test that a server outage turns lookups into misses, not errors."""
+        backend = RedisBackend(redis_server.url)
+        await redis_server.stop()
+        now = int(time.time())
+
+        await backend.async_set("tool", "k1", now, now + 60, now + 60, "{}")
+        assert await backend.async_get("k1") is None
+        assert await backend.async_usage() == {}
+
+    async def test_unresponsive_server_is_skipped_until_retry(self, redis_server):
+        """Test that a server that timed out is not waited on again until retry."""
+        backend = RedisBackend(redis_server.url)
+        redis_server.delay = 1
+        now = int(time.time())
+
+        with (
+            patch.object(RedisBackend, "TIMEOUT", 0.05),
+            patch.object(RedisBackend, "RETRY_INTERVAL", 0.2),
+        ):
+            assert await backend.async_get("k1") is None
+            assert redis_server.connections == 1
+
+            start = time.monotonic()
+            await backend.async_set("tool", "k1", now, now + 60, now + 60, "{}")
+            assert await backend.async_get("k1") is None
+            assert time.monotonic() - start < 0.05
+            assert redis_server.connections == 1
+
+            redis_server.delay = 0
+            await asyncio.sleep(0.2)
+            await backend.async_set("tool", "k1", now, now + 60, now + 60, "{}")
+            assert await backend.async_get("k1") is not None
+        await backend.async_close()
+
+    async def test_instances_share_entries(self, redis_server, tmp_path):
+        """Test that two caches on one server share entries for the same config."""
+        hass = MagicMock()
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        hass.async_create_background_task = lambda coro, **_: coro.close()
+        config = {CONF_CACHE_BACKEND: "redis", CONF_CACHE_REDIS_URL: redis_server.url}
+
+        SQLiteCache._instance = None
+        house = SQLiteCache()
+        with patch("custom_components.llm_intents.cache.async_track_time_interval"):
+            await house.async_setup(hass, config)
+        await house.async_set_fingerprint("tool", {"X-Loc-Lat": "1"})
+        await house.async_set("tool", {"q": "test"}, {"results": ["a"]})
+
+        SQLiteCache._instance = None
+        office = SQLiteCache()
+        with patch("custom_components.llm_intents.cache.async_track_time_interval"):
+            await office.async_setup(hass, config)
+
+        await office.async_set_fingerprint("tool", {"X-Loc-Lat": "1"})
+        assert await office.async_get("tool", {"q": "test"}) == {"results": ["a"]}
+
+        await office.async_set_fingerprint("tool", {"X-Loc-Lat": "2"})
+        assert await office.async_get("tool", {"q": "test"}) is None
+
+        await house.async_close()
+        await office.async_close()
+        SQLiteCache._instance = None
+
+
+class TestMemoryBackend:
+    """Test the process-local backend."""
+
+    async def test_evicts_entries_closest_to_expiry(self):
+        """Test that the size cap evicts the entries expiring soonest."""
+        backend = MemoryBackend(max_bytes=10)
+        now = int(time.time())
+        await backend.async_set("tool", "short", now, now + 10, now + 10, "aaaa")
+        await backend.async_set("tool", "long", now, now + 99, now + 99, "bbbb")
+
+        assert await backend.async_set(
+            "tool", "newest", now, now + 50, now + 50, "cccc"
+        ) == [("short", "tool")]
+        assert await backend.async_get("short") is None
+        assert await backend.async_usage() == {"tool": (2, 8)}
+
+    async def test_delete_returns_found_entries(self):
+        """Test that deleting reports the tool of each entry actually removed."""
+        backend = MemoryBackend(max_bytes=100)
+        now = int(time.time())
+        await backend.async_set("tool", "a", now, now + 60, now + 60, "{}")
+        await backend.async_set("other_tool", "b", now, now + 60, now + 60, "{}")
+
+        assert await backend.async_delete(["a", "missing"]) == [("a", "tool")]
+        assert await backend.async_keys() == ["b"]
+
+
+class TestBackendSelection:
+    """Test that the configured backend is used."""
+
+    @pytest.fixture
+    def hass(self, tmp_path):
+        """Mock hass with a temporary config directory."""
+        hass = MagicMock()
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        hass.async_create_background_task = lambda coro, **_: coro.close()
+        return hass
+
+    @pytest.mark.parametrize(
+        ("config", "backend_class"),
+        [
+            ({}, SQLiteBackend),
+            ({CONF_CACHE_BACKEND: "memory"}, MemoryBackend),
+            ({CONF_CACHE_BACKEND: "redis", CONF_CACHE_REDIS_URL: ""}, SQLiteBackend),
+        ],
+    )
+    async def test_backend_from_config(self, hass, config, backend_class):
+        """Test the backend option, falling back to SQLite without a Redis URL."""
+        SQLiteCache._instance = None
+        cache = SQLiteCache()
+        with patch("custom_components.llm_intents.cache.async_track_time_interval"):
+            await cache.async_setup(hass, config)
+
+        assert isinstance(cache._backend, backend_class)
+        await cache.async_close()
+        SQLiteCache._instance = None
@@ -0,0 +1,1044 @@
+"""Test the SQLite tool cache."""
+
+# The cache is tested through its internals as well as its API, to control the
+# backend, memory tier and timers underneath it
+# ruff: noqa: SLF001
+
+import asyncio
+import gzip
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from email.utils import formatdate
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from custom_components.llm_intents.backends import (
+    CODECS,
+    DEFAULT_CODEC,
+    SQLiteBackend,
+)
+from custom_components.llm_intents.cache import (
+    ERROR_MAX_AGE,
+    ERROR_MAX_RETRY_AFTER,
+    LRUCache,
+    SQLiteCache,
+    cache_control_max_age,
+    error_max_age,
+)
+from custom_components.llm_intents.const import (
+    CACHE_DB_NAME,
+    CONF_CACHE_EVICTION_POLICY,
+    CONF_CACHE_MAX_AGE,
+    CONF_CACHE_MAX_ENTRIES,
+    CONF_CACHE_SIMILARITY_THRESHOLD,
+)
+from custom_components.llm_intents.eviction import LRUPolicy
+
+
+class TestSQLiteCache:
+    """Test the async SQLite cache API."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create a fresh cache instance backed by a temporary database."""
+        SQLiteCache._instance = None
+        cache = SQLiteCache()
+        cache._backend = SQLiteBackend(str(tmp_path / "cache.db"))
+        yield cache
+        cache._backend._executor.shutdown(wait=True)
+        SQLiteCache._instance = None
+
+    async def test_set_and_get(self, cache):
+        """Test that a stored response is returned for the same params."""
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+
+        assert await cache.async_get("tool", {"q": "test"}) == {"results": ["a"]}
+
+    async def test_get_miss(self, cache):
+        """Test that unknown params miss the cache."""
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+
+        assert await cache.async_get("tool", {"q": "other"}) is None
+        assert await cache.async_get("other_tool", {"q": "test"}) is None
+
+    async def test_io_runs_on_cache_thread(self, cache):
+        """Test that SQLite is only touched from the dedicated cache thread."""
+        threads = set()
+        original_connection = cache._backend._connection
+
+        def tracking_connection() -> sqlite3.Connection:
+            threads.add(threading.current_thread().name)
+            return original_connection()
+
+        cache._backend._connection = tracking_connection
+
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+        await cache.async_get("tool", {"q": "test"})
+
+        assert threads
+        assert all(name.startswith("llm_intents_cache") for name in threads)
+        assert threading.current_thread().name not in threads
+
+    async def test_slow_disk_does_not_block_loop(self, cache):
+        """Test that the event loop keeps running while the disk is slow."""
+        original_get = cache._backend._get
+
+        def slow_get(key) -> tuple[str, int, int] | None:
+            time.sleep(0.3)
+            return original_get(key)
+
+        cache._backend._get = slow_get
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        lookup = asyncio.create_task(cache.async_get("tool", {"q": "test"}))
+        await ticker()
+
+        assert ticks == 10
+        assert not lookup.done()
+        assert await lookup is None
+
+    async def test_memory_tier_serves_repeat_lookups(self, cache):
+        """Test that repeat lookups are answered without touching SQLite."""
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+
+        def fail_get(key) -> None:
+            msg = "SQLite should not be queried"
+            raise AssertionError(msg)
+
+        cache._backend._get = fail_get
+
+        assert await cache.async_get("tool", {"q": "test"}) == {"results": ["a"]}
+        assert cache.memory_stats["tool"].hits == 1
+
+    async def test_memory_tier_is_filled_from_disk(self, cache):
+        """Test that a disk hit is promoted into the memory tier."""
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+        cache._memory = LRUCache(cache.MEMORY_MAX_ENTRIES, cache.MEMORY_MAX_BYTES)
+
+        assert await cache.async_get("tool", {"q": "test"}) == {"results": ["a"]}
+        assert cache.memory_stats["tool"].misses == 1
+        assert await cache.async_get("tool", {"q": "test"}) == {"results": ["a"]}
+        assert cache.memory_stats["tool"].hits == 1
+
+    async def test_cached_response_is_not_shared(self, cache):
+        """Test that callers mutating a response do not alter the cache."""
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+
+        response = await cache.async_get("tool", {"q": "test"})
+        response["instruction"] = "added by caller"
+
+        assert await cache.async_get("tool", {"q": "test"}) == {"results": ["a"]}
+
+    async def test_entries_survive_restart(self, cache, tmp_path):
+        """Test that the database is reused rather than recreated."""
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+        await cache.async_close()
+
+        SQLiteCache._instance = None
+        restarted = SQLiteCache()
+        restarted._backend = SQLiteBackend(str(tmp_path / "cache.db"))
+
+        assert await restarted.async_get("tool", {"q": "test"}) == {"results": ["a"]}
+        restarted._backend._executor.shutdown(wait=True)
+
+    async def test_outdated_schema_is_rebuilt(self, cache, tmp_path):
+        """Test that a database from an older schema version is rebuilt."""
+        conn = sqlite3.connect(tmp_path / "cache.db")
+        conn.execute("CREATE TABLE cache (key TEXT, legacy TEXT)")
+        conn.commit()
+        conn.close()
+
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+        version = await cache._backend._run(
+            lambda: cache._backend._connection()
+            .execute("PRAGMA user_version")
+            .fetchone()[0]
+        )
+
+        assert version == SQLiteBackend.SCHEMA_VERSION
+
+    async def test_expire_removes_old_entries(self, cache):
+        """Test that the expiry pass deletes entries past their max age."""
+        await cache.async_set("tool", {"q": "old"}, {"results": ["a"]})
+        await cache.async_set("tool", {"q": "new"}, {"results": ["b"]})
+
+        def age_entry() -> None:
+            conn = cache._backend._connection()
+            conn.execute(
+                "UPDATE cache SET expires_at = ? WHERE key = ?",
+                (
+                    int(time.time()) - 1,
+                    cache._make_key("tool", {"q": "old"}),
+                ),
+            )
+            conn.commit()
+
+        await cache._backend._run(age_entry)
+
+        assert await cache.async_expire() == 1
+
+    async def test_entries_expire_after_max_age(self, cache):
+        """Test that each entry honours its own max age."""
+        await cache.async_set("tool", {"q": "short"}, {"results": ["a"]}, 1)
+        await cache.async_set("tool", {"q": "long"}, {"results": ["b"]}, 3600)
+        cache._memory = LRUCache(cache.MEMORY_MAX_ENTRIES, cache.MEMORY_MAX_BYTES)
+
+        with patch(
+            "custom_components.llm_intents.cache.time.time",
+            return_value=time.time() + 2,
+        ):
+            assert await cache.async_get("tool", {"q": "short"}) is None
+            assert await cache.async_get("tool", {"q": "long"}) == {"results": ["b"]}
+
+    async def test_zero_max_age_disables_caching(self, cache):
+        """Test that a max age of zero skips storing the response."""
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]}, 0)
+
+        assert await cache.async_get("tool", {"q": "test"}) is None
+
+    async def test_lookups_do_not_write(self, cache):
+        """Test that reads never trigger an expiry delete."""
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+        cache._memory = LRUCache(cache.MEMORY_MAX_ENTRIES, cache.MEMORY_MAX_BYTES)
+
+        with patch.object(cache._backend, "_expire", side_effect=AssertionError):
+            assert await cache.async_get("tool", {"q": "test"}) == {"results": ["a"]}
+            assert await cache.async_get("tool", {"q": "other"}) is None
+
+    async def test_expiry_column_is_indexed(self, cache):
+        """Test that the sweeper can use an index on expires_at."""
+        plan = await cache._backend._run(
+            lambda: cache._backend._connection()
+            .execute("EXPLAIN QUERY PLAN DELETE FROM cache WHERE expires_at <= 0")
+            .fetchall()
+        )
+
+        assert "idx_cache_expires_at" in str(plan)
+
+    async def test_async_setup_uses_storage_dir(self, cache, tmp_path):
+        """Test that setup opens the database under .storage and expires it."""
+        hass = MagicMock()
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        background = []
+        hass.async_create_background_task = lambda coro, **_: background.append(
+            asyncio.create_task(coro)
+        )
+
+        with patch(
+            "custom_components.llm_intents.cache.async_track_time_interval"
+        ) as mock_track:
+            await cache.async_setup(hass, {})
+        await asyncio.gather(*background)
+
+        assert len(background) == 1
+        assert cache._backend._db_path == str(tmp_path / ".storage" / CACHE_DB_NAME)
+        assert (tmp_path / ".storage" / CACHE_DB_NAME).exists()
+        mock_track.assert_called_once()
+        assert mock_track.call_args.args[2] == cache.SWEEP_INTERVAL
+
+    async def test_sweeper_is_cancelled_on_close(self, cache, tmp_path):
+        """Test that closing the cache stops the periodic sweeper."""
+        hass = MagicMock()
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        hass.async_create_background_task = lambda coro, **_: coro.close()
+        unsub = MagicMock()
+
+        with patch(
+            "custom_components.llm_intents.cache.async_track_time_interval",
+            return_value=unsub,
+        ):
+            await cache.async_setup(hass, {})
+            await cache.async_close()
+
+        unsub.assert_called_once()
+
+    async def test_database_uses_wal_journal(self, cache):
+        """Test that file databases use WAL with relaxed syncing."""
+        journal_mode, synchronous = await cache._backend._run(
+            lambda: (
+                cache._backend._connection()
+                .execute("PRAGMA journal_mode")
+                .fetchone()[0],
+                cache._backend._connection()
+                .execute("PRAGMA synchronous")
+                .fetchone()[0],
+            )
+        )
+
+        assert journal_mode == "wal"
+        assert synchronous == 1  # NORMAL
+
+    async def test_writes_are_grouped_into_one_commit(self, cache, tmp_path):
+        """Test that writes are committed together when the timer fires."""
+        cache._hass = MagicMock()
+
+        with patch(
+            "custom_components.llm_intents.cache.async_call_later"
+        ) as mock_later:
+            await cache.async_set("tool", {"q": "a"}, {"results": ["a"]})
+            await cache.async_set("tool", {"q": "b"}, {"results": ["b"]})
+
+        def committed_rows() -> int:
+            conn = sqlite3.connect(tmp_path / "cache.db")
+            try:
+                return conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            finally:
+                conn.close()
+
+        mock_later.assert_called_once()
+        assert committed_rows() == 0
+
+        await mock_later.call_args.args[2](None)
+
+        assert committed_rows() == 2
+
+    async def test_pending_writes_survive_clean_shutdown(self, cache, tmp_path):
+        """Test that closing the cache flushes writes still awaiting commit."""
+        cache._hass = MagicMock()
+        unsub = MagicMock()
+
+        with patch(
+            "custom_components.llm_intents.cache.async_call_later",
+            return_value=unsub,
+        ):
+            await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+        await cache.async_close()
+
+        unsub.assert_called_once()
+
+        SQLiteCache._instance = None
+        restarted = SQLiteCache()
+        restarted._backend = SQLiteBackend(str(tmp_path / "cache.db"))
+
+        assert await restarted.async_get("tool", {"q": "test"}) == {"results": ["a"]}
+        restarted._backend._executor.shutdown(wait=True)
+
+    async def test_memory_only_snapshots_on_clean_shutdown(self, cache, tmp_path):
+        """Test that memory-only mode writes to disk only when snapshotting."""
+        cache._backend.memory_only = True
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+
+        assert not (tmp_path / "cache.db").exists()
+
+        await cache.async_close()
+
+        SQLiteCache._instance = None
+        restarted = SQLiteCache()
+        restarted._backend = SQLiteBackend(str(tmp_path / "cache.db"), memory_only=True)
+
+        assert await restarted.async_get("tool", {"q": "test"}) == {"results": ["a"]}
+        restarted._backend._executor.shutdown(wait=True)
+
+    async def test_memory_only_skips_unchanged_snapshots(self, cache, tmp_path):
+        """Test that a snapshot is only written when the cache has changed."""
+        cache._backend.memory_only = True
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+        await cache._backend._run(cache._backend._snapshot)
+        modified = (tmp_path / "cache.db").stat().st_mtime_ns
+
+        await cache.async_get("tool", {"q": "test"})
+        await cache._backend._run(cache._backend._snapshot)
+
+        assert (tmp_path / "cache.db").stat().st_mtime_ns == modified
+
+    async def test_concurrent_identical_requests_are_coalesced(self, cache):
+        """Test that identical concurrent fetches share one upstream request."""
+        calls = 0
+
+        async def fetch() -> dict:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"results": ["a"]}
+
+        results = await asyncio.gather(
+            *[cache.async_coalesce("tool", {"q": "test"}, fetch) for _ in range(5)]
+        )
+
+        assert calls == 1
+        assert results == [{"results": ["a"]}] * 5
+        assert results[0] is not results[1]
+        assert not cache._inflight
+
+    async def test_different_requests_are_not_coalesced(self, cache):
+        """Test that requests with different params each fetch."""
+        calls = 0
+
+        async def fetch() -> dict:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"results": [calls]}
+
+        await asyncio.gather(
+            cache.async_coalesce("tool", {"q": "one"}, fetch),
+            cache.async_coalesce("tool", {"q": "two"}, fetch),
+        )
+
+        assert calls == 2
+
+    async def test_coalesced_error_reaches_every_caller(self, cache):
+        """Test that an upstream failure is raised to all waiting callers."""
+
+        async def fetch() -> dict:
+            await asyncio.sleep(0.01)
+            msg = "upstream failed"
+            raise ValueError(msg)
+
+        results = await asyncio.gather(
+            *[cache.async_coalesce("tool", {"q": "test"}, fetch) for _ in range(3)],
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert not cache._inflight
+
+    async def test_cancelled_caller_does_not_cancel_shared_request(self, cache):
+        """Test that one caller giving up leaves the others their result."""
+
+        async def fetch() -> dict:
+            await asyncio.sleep(0.05)
+            return {"results": ["a"]}
+
+        first = asyncio.create_task(cache.async_coalesce("tool", {"q": "test"}, fetch))
+        second = asyncio.create_task(cache.async_coalesce("tool", {"q": "test"}, fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == {"results": ["a"]}
+
+    async def test_stale_entry_is_served_while_refreshing(self, cache):
+        """Test that a stale entry is returned and refreshed in the background."""
+        background = []
+        cache._hass = MagicMock()
+        cache._hass.async_create_background_task = lambda coro, **_: background.append(
+            asyncio.create_task(coro)
+        )
+        cache.stale_max_age = 600
+        await cache.async_set("tool", {"q": "test"}, {"results": ["old"]}, 1)
+
+        async def refresh() -> dict:
+            await cache.async_set("tool", {"q": "test"}, {"results": ["new"]}, 60)
+            return {"results": ["new"]}
+
+        with patch(
+            "custom_components.llm_intents.cache.time.time",
+            return_value=time.time() + 2,
+        ):
+            stale = await cache.async_get("tool", {"q": "test"}, refresh=refresh)
+            await asyncio.gather(*background)
+            fresh = await cache.async_get("tool", {"q": "test"}, refresh=refresh)
+
+        assert stale == {"results": ["old"]}
+        assert fresh == {"results": ["new"]}
+        assert len(background) == 1
+
+    async def test_stale_entry_without_refresh_misses(self, cache):
+        """Test that stale entries are only served when they can be refreshed."""
+        cache._hass = MagicMock()
+        cache.stale_max_age = 600
+        await cache.async_set("tool", {"q": "test"}, {"results": ["old"]}, 1)
+
+        with patch(
+            "custom_components.llm_intents.cache.time.time",
+            return_value=time.time() + 2,
+        ):
+            assert await cache.async_get("tool", {"q": "test"}) is None
+
+    async def test_entry_past_stale_window_misses(self, cache):
+        """Test that entries beyond the stale window are not served."""
+        cache._hass = MagicMock()
+        cache.stale_max_age = 10
+        await cache.async_set("tool", {"q": "test"}, {"results": ["old"]}, 1)
+        cache._memory = LRUCache(cache.MEMORY_MAX_ENTRIES, cache.MEMORY_MAX_BYTES)
+
+        async def refresh() -> dict:
+            return {"results": ["new"]}
+
+        with patch(
+            "custom_components.llm_intents.cache.time.time",
+            return_value=time.time() + 20,
+        ):
+            assert await cache.async_get("tool", {"q": "test"}, refresh=refresh) is None
+        cache._hass.async_create_background_task.assert_not_called()
+
+    async def test_negative_entry_is_never_served_stale(self, cache):
+        """Test that entries stored without a stale window miss once expired."""
+        cache._hass = MagicMock()
+        cache.stale_max_age = 600
+        await cache.async_set(
+            "tool", {"q": "test"}, {"error": "Search error: 429"}, 1, allow_stale=False
+        )
+
+        assert await cache.async_get("tool", {"q": "test"}) == {
+            "error": "Search error: 429"
+        }
+
+        with patch(
+            "custom_components.llm_intents.cache.time.time",
+            return_value=time.time() + 2,
+        ):
+            assert (
+                await cache.async_get("tool", {"q": "test"}, refresh=AsyncMock())
+                is None
+            )
+        cache._hass.async_create_background_task.assert_not_called()
+
+    async def test_entry_kept_past_max_age_for_revalidation(self, cache):
+        """Test that an entry kept for revalidation is returned once stale."""
+        data = {"extract": "summary", "etag": '"abc"'}
+        await cache.async_set("tool", {"summary": "Test"}, data, 1, keep_for=60)
+
+        assert await cache.async_get_entry("tool", {"summary": "Test"}) == (data, True)
+
+        with patch(
+            "custom_components.llm_intents.cache.time.time",
+            return_value=time.time() + 2,
+        ):
+            assert await cache.async_get_entry("tool", {"summary": "Test"}) == (
+                data,
+                False,
+            )
+            assert await cache.async_get("tool", {"summary": "Test"}) is None
+            await cache.async_revalidate("tool", {"summary": "Test"}, data, 60)
+            assert await cache.async_get_entry("tool", {"summary": "Test"}) == (
+                data,
+                True,
+            )
+
+        assert cache.stats["tool"].revalidations == 1
+
+    async def test_entry_without_max_age_kept_for_revalidation(self, cache):
+        """Test that a response which must always be revalidated is still kept."""
+        await cache.async_set("tool", {"summary": "Test"}, {"extract": "x"}, 0)
+        assert await cache.async_get_entry("tool", {"summary": "Test"}) is None
+
+        await cache.async_set(
+            "tool", {"summary": "Test"}, {"extract": "x"}, 0, keep_for=60
+        )
+        assert await cache.async_get_entry("tool", {"summary": "Test"}) == (
+            {"extract": "x"},
+            False,
+        )
+
+    async def test_payload_is_stored_compressed(self, cache):
+        """Test that payloads are stored as compressed blobs with their codec."""
+        data = {"results": ["lorem ipsum dolor sit amet " * 100]}
+        await cache.async_set("tool", {"q": "test"}, data)
+
+        codec, size, blob = await cache._backend._run(
+            lambda: cache._backend._connection()
+            .execute("SELECT codec, size, data FROM cache")
+            .fetchone()
+        )
+
+        assert codec == DEFAULT_CODEC
+        assert isinstance(blob, bytes)
+        assert size == len(blob) < len(str(data))
+        assert CODECS[codec][1](blob).decode() == json.dumps(data)
+
+    async def test_unknown_codec_is_a_miss(self, cache):
+        """Test that rows written with an unavailable codec are skipped."""
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+        await cache._backend._run(
+            lambda: cache._backend._connection().execute(
+                "UPDATE cache SET codec = 'brotli'"
+            )
+        )
+        cache._memory = LRUCache(cache.MEMORY_MAX_ENTRIES, cache.MEMORY_MAX_BYTES)
+
+        assert await cache.async_get("tool", {"q": "test"}) is None
+
+    async def test_size_cap_evicts_entries_closest_to_expiry(self, cache):
+        """Test that the byte cap evicts the least valuable entries from both tiers."""
+        await cache.async_set("tool", {"q": "first"}, {"results": ["a"]}, 60)
+        entry_size = cache._backend._db_bytes
+        cache._backend.max_bytes = entry_size * 3
+
+        await cache.async_set("tool", {"q": "long"}, {"results": ["b"]}, 3600)
+        await cache.async_set("tool", {"q": "short"}, {"results": ["c"]}, 30)
+        await cache.async_set("tool", {"q": "newest"}, {"results": ["d"]}, 600)
+
+        assert cache._backend._db_bytes <= cache._backend.max_bytes
+        assert await cache.async_get("tool", {"q": "short"}) is None
+        assert await cache.async_get("tool", {"q": "first"}) is None
+        assert await cache.async_get("tool", {"q": "long"}) == {"results": ["b"]}
+        assert await cache.async_get("tool", {"q": "newest"}) == {"results": ["d"]}
+
+    async def test_size_cap_eviction_of_new_entry_is_not_served(self, cache):
+        """Test that a new entry the byte cap evicts at once is not served."""
+        await cache.async_set("tool", {"q": "long"}, {"results": ["a"]}, 3600)
+        cache._backend.max_bytes = cache._backend._db_bytes * 1.5
+
+        await cache.async_set("tool", {"q": "short"}, {"results": ["b"]}, 30)
+
+        assert await cache.async_get("tool", {"q": "short"}) is None
+        assert await cache.async_get("tool", {"q": "long"}) == {"results": ["a"]}
+
+    async def test_stats_count_hits_and_misses_across_tiers(self, cache):
+        """Test that lookups are counted per tool whichever tier answers."""
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+
+        await cache.async_get("tool", {"q": "test"})
+        cache._memory = LRUCache(cache.MEMORY_MAX_ENTRIES, cache.MEMORY_MAX_BYTES)
+        await cache.async_get("tool", {"q": "test"})
+        await cache.async_get("tool", {"q": "other"})
+        await cache.async_get("other_tool", {"q": "test"})
+
+        assert cache.stats["tool"].hits == 2
+        assert cache.stats["tool"].misses == 1
+        assert cache.stats["other_tool"].misses == 1
+
+    async def test_size_cap_evictions_counted_per_tool(self, cache):
+        """Test that disk evictions are attributed to the evicted tool."""
+        await cache.async_set("tool", {"q": "first"}, {"results": ["a"]}, 60)
+        cache._backend.max_bytes = cache._backend._db_bytes * 2
+
+        await cache.async_set("other_tool", {"q": "second"}, {"results": ["b"]})
+        await cache.async_set("other_tool", {"q": "third"}, {"results": ["c"]})
+
+        assert cache.stats["tool"].evictions == 1
+
+    async def test_entry_limit_evicts_by_policy(self, cache):
+        """Test that the entry limit removes the policy's victim everywhere."""
+        cache._policy = LRUPolicy(2)
+        await cache.async_set("tool", {"q": "a"}, {"results": ["a"]})
+        await cache.async_set("tool", {"q": "b"}, {"results": ["b"]})
+        await cache.async_get("tool", {"q": "a"})
+
+        await cache.async_set("tool", {"q": "c"}, {"results": ["c"]})
+
+        assert await cache.async_get("tool", {"q": "b"}) is None
+        assert await cache.async_get("tool", {"q": "a"}) == {"results": ["a"]}
+        assert (await cache.async_usage())["tool"][0] == 2
+        assert cache.stats["tool"].evictions == 1
+
+    async def test_entry_limit_applied_to_existing_entries(self, cache, tmp_path):
+        """Test that setup trims stored entries down to a new, lower limit."""
+        hass = MagicMock()
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        hass.async_create_background_task = lambda coro, **_: coro.close()
+        with patch("custom_components.llm_intents.cache.async_track_time_interval"):
+            await cache.async_setup(hass, {})
+            for q in "abc":
+                await cache.async_set("tool", {"q": q}, {"results": [q]})
+
+            await cache.async_setup(
+                hass, {CONF_CACHE_MAX_ENTRIES: 2, CONF_CACHE_EVICTION_POLICY: "lru"}
+            )
+
+        assert await cache.async_get("tool", {"q": "a"}) is None
+        assert await cache.async_get("tool", {"q": "c"}) == {"results": ["c"]}
+
+    async def test_default_max_age_read_from_config(self, cache, tmp_path):
+        """Test that setup applies the configured default max age."""
+        hass = MagicMock()
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        hass.async_create_background_task = lambda coro, **_: coro.close()
+        with patch("custom_components.llm_intents.cache.async_track_time_interval"):
+            await cache.async_setup(hass, {CONF_CACHE_MAX_AGE: 0})
+
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+
+        assert cache.default_max_age == 0
+        assert await cache.async_get("tool", {"q": "test"}) is None
+
+    async def test_newest_entries_kept_on_restart(self, cache, tmp_path):
+        """Test that TinyLFU keeps the newest stored entries on setup."""
+        hass = MagicMock()
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        hass.async_create_background_task = lambda coro, **_: coro.close()
+        with patch("custom_components.llm_intents.cache.async_track_time_interval"):
+            await cache.async_setup(hass, {})
+            for q in "abcde":
+                await cache.async_set("tool", {"q": q}, {"results": [q]})
+
+            await cache.async_setup(
+                hass, {CONF_CACHE_MAX_ENTRIES: 3, CONF_CACHE_EVICTION_POLICY: "tinylfu"}
+            )
+
+        for q in "ab":
+            assert await cache.async_get("tool", {"q": q}) is None
+        for q in "cde":
+            assert await cache.async_get("tool", {"q": q}) == {"results": [q]}
+
+    async def test_usage_reports_rows_and_bytes_per_tool(self, cache):
+        """Test that on-disk usage is grouped by tool."""
+        await cache.async_set("tool", {"q": "a"}, {"results": ["a"]})
+        await cache.async_set("tool", {"q": "b"}, {"results": ["b"]})
+        await cache.async_set("other_tool", {"q": "a"}, {"results": ["a"]})
+
+        usage = await cache.async_usage()
+
+        assert usage["tool"][0] == 2
+        assert usage["other_tool"][0] == 1
+        assert usage["tool"][1] + usage["other_tool"][1] == cache._backend._db_bytes
+
+    async def test_similar_query_served_on_exact_miss(self, cache):
+        """Test that a paraphrased query reuses a similar cached result."""
+        cache.similarity_threshold = 0.6
+        params = {"q": "australian prime minister", "count": 2}
+        await cache.async_set("tool", params, {"results": ["a"]}, query_key="q")
+
+        response = await cache.async_get(
+            "tool",
+            {"q": "current australian prime minister", "count": 2},
+            query_key="q",
+        )
+
+        assert response == {"results": ["a"]}
+        assert cache.stats["tool"].similar_hits == 1
+        assert cache.stats["tool"].last_similar_match == (
+            "current australian prime minister",
+            "australian prime minister",
+        )
+
+    async def test_similar_query_requires_matching_params(self, cache):
+        """Test that similar queries with different other params do not match."""
+        cache.similarity_threshold = 0.6
+        params = {"q": "australian prime minister", "count": 2}
+        await cache.async_set("tool", params, {"results": ["a"]}, query_key="q")
+
+        response = await cache.async_get(
+            "tool", {"q": "australian prime minister", "count": 5}, query_key="q"
+        )
+
+        assert response is None
+        assert cache.stats["tool"].misses == 1
+
+    async def test_similar_lookup_disabled_by_default(self, cache):
+        """Test that only exact matches are used unless a threshold is set."""
+        await cache.async_set(
+            "tool", {"q": "weather in paris"}, {"r": 1}, query_key="q"
+        )
+
+        assert (
+            await cache.async_get("tool", {"q": "paris weather"}, query_key="q") is None
+        )
+
+    async def test_similar_index_rebuilt_and_pruned(self, cache, tmp_path):
+        """Test that setup indexes stored queries and expiry removes them."""
+        await cache._backend.async_close()
+        cache._backend = SQLiteBackend(str(tmp_path / ".storage" / CACHE_DB_NAME))
+        await cache.async_set(
+            "tool", {"q": "weather in paris"}, {"r": 1}, query_key="q"
+        )
+        cache._similar.clear()
+
+        hass = MagicMock()
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        hass.async_create_background_task = lambda coro, **_: coro.close()
+        with patch("custom_components.llm_intents.cache.async_track_time_interval"):
+            await cache.async_setup(hass, {CONF_CACHE_SIMILARITY_THRESHOLD: 60})
+
+        assert len(cache._similar) == 1
+        assert await cache.async_get("tool", {"q": "paris weather"}, query_key="q") == {
+            "r": 1
+        }
+
+        with patch(
+            "custom_components.llm_intents.cache.time.time",
+            return_value=time.time() + 86400,
+        ):
+            await cache.async_expire()
+
+        assert len(cache._similar) == 0
+
+    async def test_fingerprint_change_invalidates_only_that_tool(self, cache):
+        """Test that changing a tool's config stops serving its old entries."""
+        await cache.async_set_fingerprint("tool", {"X-Loc-Lat": "1"})
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+        await cache.async_set("other_tool", {"q": "test"}, {"results": ["b"]})
+
+        await cache.async_set_fingerprint("tool", {"X-Loc-Lat": "1"})
+        assert await cache.async_get("tool", {"q": "test"}) == {"results": ["a"]}
+
+        await cache.async_set_fingerprint("tool", {"X-Loc-Lat": "2"})
+        assert await cache.async_get("tool", {"q": "test"}) is None
+        assert await cache.async_get("other_tool", {"q": "test"}) == {"results": ["b"]}
+
+    async def test_fingerprint_generation_survives_restart(self, cache, tmp_path):
+        """Test that a bumped generation is restored when the cache reopens."""
+        await cache.async_set_fingerprint("tool", {"X-Loc-Lat": "1"})
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]})
+        await cache.async_set_fingerprint("tool", {"X-Loc-Lat": "2"})
+        await cache.async_close()
+
+        SQLiteCache._instance = None
+        restarted = SQLiteCache()
+        restarted._backend = SQLiteBackend(str(tmp_path / "cache.db"))
+        await restarted._backend._run(restarted._backend._connection)
+
+        assert restarted._backend.namespaces["tool"][1] == 1
+        assert await restarted.async_get("tool", {"q": "test"}) is None
+        restarted._backend._executor.shutdown(wait=True)
+
+    async def test_clear_single_tool(self, cache):
+        """Test that clearing one tool leaves other tools' entries intact."""
+        cache.similarity_threshold = 0.5
+        await cache.async_set("tool", {"q": "a"}, {"results": ["a"]}, query_key="q")
+        await cache.async_set("other_tool", {"q": "a"}, {"results": ["b"]})
+
+        assert await cache.async_clear("tool") == 1
+
+        assert await cache.async_get("tool", {"q": "a"}, query_key="q") is None
+        assert await cache.async_get("other_tool", {"q": "a"}) == {"results": ["b"]}
+        assert len(cache._similar) == 0
+
+    async def test_clear_all_tools(self, cache):
+        """Test that clearing without a tool empties both tiers."""
+        await cache.async_set("tool", {"q": "a"}, {"results": ["a"]})
+        await cache.async_set("other_tool", {"q": "a"}, {"results": ["b"]})
+
+        assert await cache.async_clear() == 2
+
+        assert len(cache._memory) == 0
+        assert cache._backend._db_bytes == 0
+        assert await cache.async_get("other_tool", {"q": "a"}) is None
+
+    @pytest.fixture
+    def refresh_hass(self, cache):
+        """Attach a mock hass that runs background tasks on the test loop."""
+        hass = MagicMock()
+        tasks = []
+        hass.async_create_background_task = lambda coro, **_: tasks.append(
+            asyncio.create_task(coro)
+        )
+        cache._hass = hass
+        with patch("custom_components.llm_intents.cache.async_call_later"):
+            yield tasks
+
+    async def test_hot_entries_refreshed_ahead_of_expiry(self, cache, refresh_hass):
+        """Test that the most read entries near expiry are refreshed first."""
+        cache.refresh_budget = 1
+        fetched = []
+
+        def make_fetch(q) -> Callable[[], Awaitable[dict]]:
+            async def fetch() -> dict:
+                fetched.append(q)
+                await cache.async_set("tool", {"q": q}, {"results": [q]}, 3600)
+                return {"results": [q]}
+
+            return fetch
+
+        for q, reads in (("warm", 2), ("hot", 3), ("cold", 1)):
+            await cache.async_set("tool", {"q": q}, {"results": [q]}, 60)
+            for _ in range(reads):
+                await cache.async_get("tool", {"q": q}, refresh=make_fetch(q))
+
+        await cache._async_refresh_ahead(None)
+        await asyncio.gather(*refresh_hass)
+
+        assert fetched == ["hot"]
+        assert cache.stats["tool"].refreshes == 1
+        assert cache._hot[cache._make_key("tool", {"q": "hot"})].hits == 0
+        assert cache._hot[cache._make_key("tool", {"q": "hot"})].fresh_until > (
+            time.time() + 3000
+        )
+
+        # The hourly budget is spent, so the next hottest entry waits
+        await cache._async_refresh_ahead(None)
+        assert fetched == ["hot"]
+
+    async def test_entries_far_from_expiry_not_refreshed(self, cache, refresh_hass):
+        """Test that refresh-ahead leaves entries with plenty of life alone."""
+        cache.refresh_budget = 10
+        fetch = AsyncMock()
+
+        await cache.async_set("tool", {"q": "test"}, {"results": ["a"]}, 3600)
+        for _ in range(5):
+            await cache.async_get("tool", {"q": "test"}, refresh=fetch)
+
+        await cache._async_refresh_ahead(None)
+
+        assert not refresh_hass
+        fetch.assert_not_called()
+
+
+class TestSnapshot:
+    """Test exporting the cache and importing it on another host."""
+
+    @pytest.fixture
+    def make_cache(self, tmp_path):
+        """Create fresh cache instances, each backed by its own database."""
+        backends = []
+
+        def make_cache(name) -> SQLiteCache:
+            SQLiteCache._instance = None
+            cache = SQLiteCache()
+            cache._backend = SQLiteBackend(str(tmp_path / f"{name}.db"))
+            backends.append(cache._backend)
+            return cache
+
+        yield make_cache
+        for backend in backends:
+            backend._executor.shutdown(wait=True)
+        SQLiteCache._instance = None
+
+    async def test_round_trip_skips_expired(self, make_cache, tmp_path):
+        """Test that unexpired entries and their TTLs survive a move."""
+        path = str(tmp_path / "snapshot.jsonl.gz")
+        old = make_cache("old")
+        await old.async_set("tool", {"q": "a"}, {"r": 1}, 60, query_key="q")
+        await old.async_set("tool", {"q": "b"}, {"r": 2}, 1)
+        fresh_until = (await old._backend.async_get(old._make_key("tool", {"q": "a"})))[
+            1
+        ]
+
+        with patch(
+            "custom_components.llm_intents.cache.time.time",
+            return_value=time.time() + 2,
+        ):
+            assert await old.async_export(path) == 1
+
+        new = make_cache("new")
+        new.similarity_threshold = 0.5
+        assert await new.async_import(path) == (1, 0)
+
+        key = new._make_key("tool", {"q": "a"})
+        assert (await new._backend.async_get(key))[1] == fresh_until
+        assert await new.async_get("tool", {"q": "a"}) == {"r": 1}
+        assert await new.async_get("tool", {"q": "A"}, query_key="q") == {"r": 1}
+
+    async def test_import_adopts_generation_for_same_config(self, make_cache, tmp_path):
+        """Test that entries follow a matching config, but not a changed one."""
+        path = str(tmp_path / "snapshot.jsonl.gz")
+        old = make_cache("old")
+        await old.async_set_fingerprint("tool", {"X-Loc-Lat": "1"})
+        await old.async_set_fingerprint("tool", {"X-Loc-Lat": "2"})
+        await old.async_set("tool", {"q": "a"}, {"r": 1})
+        await old.async_set_fingerprint("other_tool", {"X-Loc-Lat": "1"})
+        await old.async_set("other_tool", {"q": "a"}, {"r": 2})
+        await old.async_export(path)
+
+        new = make_cache("new")
+        await new.async_set_fingerprint("tool", {"X-Loc-Lat": "2"})
+        await new.async_set_fingerprint("other_tool", {"X-Loc-Lat": "3"})
+        assert await new.async_import(path) == (1, 1)
+
+        assert await new.async_get("tool", {"q": "a"}) == {"r": 1}
+        assert await new.async_get("other_tool", {"q": "a"}) is None
+        await new.async_set_fingerprint("tool", {"X-Loc-Lat": "2"})
+        assert await new.async_get("tool", {"q": "a"}) == {"r": 1}
+
+    async def test_unsupported_version_is_rejected(self, make_cache, tmp_path):
+        """Test that a snapshot from an incompatible release is not loaded."""
+        path = tmp_path / "snapshot.jsonl.gz"
+        with gzip.open(path, "wt") as file:
+            file.write(json.dumps({"version": 99, "namespaces": {}}) + "\n")
+
+        with pytest.raises(ValueError, match="version"):
+            await make_cache("new").async_import(str(path))
+
+
+class TestLRUCache:
+    """Test the bounded in-memory cache tier."""
+
+    def test_evicts_least_recently_used_entry(self):
+        """Test that the entry-count limit evicts the oldest unused entry."""
+        lru = LRUCache(max_entries=2, max_bytes=1000)
+        expires_at = time.time() + 60
+        lru.set("tool", "a", 1, 1, expires_at)
+        lru.set("tool", "b", 2, 1, expires_at)
+        lru.get("tool", "a")
+        lru.set("other", "c", 3, 1, expires_at)
+
+        assert lru.get("tool", "b") is None
+        assert lru.get("tool", "a") == 1
+        assert lru.get("other", "c") == 3
+        assert lru.stats["tool"].evictions == 1
+        assert lru.stats["other"].evictions == 0
+
+    def test_evicts_to_byte_limit(self):
+        """Test that the byte limit is enforced."""
+        lru = LRUCache(max_entries=10, max_bytes=100)
+        expires_at = time.time() + 60
+        lru.set("tool", "a", 1, 60, expires_at)
+        lru.set("tool", "b", 2, 60, expires_at)
+
+        assert len(lru) == 1
+        assert lru.size_bytes == 60
+        assert lru.get("tool", "b") == 2
+
+    def test_oversized_entry_is_not_stored(self):
+        """Test that a payload larger than the tier is skipped."""
+        lru = LRUCache(max_entries=10, max_bytes=100)
+        lru.set("tool", "a", 1, 10, time.time() + 60)
+        lru.set("tool", "b", 2, 500, time.time() + 60)
+
+        assert lru.get("tool", "a") == 1
+        assert lru.get("tool", "b") is None
+
+    def test_expired_entry_misses(self):
+        """Test that expired entries are dropped on lookup."""
+        lru = LRUCache(max_entries=10, max_bytes=100)
+        lru.set("tool", "a", 1, 10, time.time() - 1)
+
+        assert lru.get("tool", "a") is None
+        assert lru.stats["tool"].misses == 1
+        assert len(lru) == 0
+
+
+class TestErrorMaxAge:
+    """Test how long upstream errors are cached for."""
+
+    def test_non_retryable_status_is_not_cached(self):
+        """Test that client errors such as a bad API key are not cached."""
+        assert error_max_age(401, {}) == 0
+        assert error_max_age(404, {"Retry-After": "30"}) == 0
+
+    def test_retryable_status_uses_default(self):
+        """Test that rate limits and server errors get the default TTL."""
+        assert error_max_age(429, {}) == ERROR_MAX_AGE
+        assert error_max_age(503, {}) == ERROR_MAX_AGE
+
+    def test_retry_after_seconds(self):
+        """Test that a Retry-After delay in seconds is honoured."""
+        assert error_max_age(429, {"Retry-After": "120"}) == 120
+        assert error_max_age(429, {"Retry-After": "0"}) == 0
+
+    def test_retry_after_date(self):
+        """Test that a Retry-After HTTP date is honoured."""
+        retry_at = formatdate(time.time() + 90, usegmt=True)
+
+        assert 85 <= error_max_age(503, {"Retry-After": retry_at}) <= 90
+
+    def test_retry_after_is_capped(self):
+        """Test that very long or past Retry-After values are clamped."""
+        assert error_max_age(429, {"Retry-After": "86400"}) == ERROR_MAX_RETRY_AFTER
+        past = formatdate(time.time() - 60, usegmt=True)
+        assert error_max_age(429, {"Retry-After": past}) == 0
+
+    def test_invalid_retry_after_uses_default(self):
+        """Test that an unparseable Retry-After falls back to the default TTL."""
+        assert error_max_age(429, {"Retry-After": "soon"}) == ERROR_MAX_AGE
+
+
+class TestCacheControlMaxAge:
+    """Test how long upstream says a response stays fresh."""
+
+    def test_max_age(self):
+        """Test that max-age is read among other directives."""
+        headers = {"Cache-Control": "s-maxage=1209600, max-age=300"}
+        assert cache_control_max_age(headers) == 300
+
+    def test_unstated(self):
+        """Test that a missing or unparseable max-age is reported as unknown."""
+        assert cache_control_max_age({}) is None
+        assert cache_control_max_age({"Cache-Control": "public"}) is None
+        assert cache_control_max_age({"Cache-Control": "max-age=soon"}) is None
+
+    def test_must_revalidate_before_reuse(self):
+        """Test that no-cache and no-store responses are never fresh."""
+        assert cache_control_max_age({"Cache-Control": "no-cache, max-age=60"}) == 0
+        assert cache_control_max_age({"Cache-Control": "no-store"}) == 0
@@ -19,21 +19,46 @@ from custom_components.llm_intents.config_flow import (
     LlmIntentsConfigFlow,
     LlmIntentsOptionsFlow,
     get_brave_schema,
+    get_cache_schema,
     get_google_places_schema,
     get_step_user_data_schema,
     get_wikipedia_schema,
 )
 from custom_components.llm_intents.const import (
     CONF_BRAVE_API_KEY,
+    CONF_BRAVE_CACHE_MAX_AGE,
     CONF_BRAVE_COUNTRY_CODE,
+    CONF_BRAVE_FILLER_WORDS,
     CONF_BRAVE_LATITUDE,
     CONF_BRAVE_LONGITUDE,
+    CONF_BRAVE_MAX_RETRIES,
+    CONF_BRAVE_NORMALISE_QUERY,
     CONF_BRAVE_NUM_RESULTS,
     CONF_BRAVE_POST_CODE,
+    CONF_BRAVE_RETRY_DEADLINE,
     CONF_BRAVE_TIMEZONE,
+    CONF_CACHE_BACKEND,
+    CONF_CACHE_EVICTION_POLICY,
+    CONF_CACHE_MAX_AGE,
+    CONF_CACHE_MAX_ENTRIES,
+    CONF_CACHE_MAX_SIZE,
+    CONF_CACHE_MEMORY_ONLY,
+    CONF_CACHE_REDIS_URL,
+    CONF_CACHE_REFRESH_BUDGET,
+    CONF_CACHE_SIMILARITY_THRESHOLD,
+    CONF_CACHE_STALE_MAX_AGE,
     CONF_GOOGLE_PLACES_API_KEY,
     CONF_GOOGLE_PLACES_NUM_RESULTS,
+    CONF_WIKIPEDIA_CACHE_MAX_AGE,
+    CONF_WIKIPEDIA_FILLER_WORDS,
+    CONF_WIKIPEDIA_MAX_RETRIES,
+    CONF_WIKIPEDIA_NORMALISE_QUERY,
     CONF_WIKIPEDIA_NUM_RESULTS,
+    CONF_WIKIPEDIA_RETRIEVAL_MODE,
+    CONF_WIKIPEDIA_RETRY_DEADLINE,
+    CONF_WIKIPEDIA_SUMMARY_CONCURRENCY,
+    CONF_WIKIPEDIA_SUMMARY_TIMEOUT,
+    DEFAULT_FILLER_WORDS,
     DOMAIN,
 )
 
@@ -82,6 +107,11 @@ class TestSchemaFunctions:
             CONF_BRAVE_LONGITUDE: "",
             CONF_BRAVE_TIMEZONE: "",
             CONF_BRAVE_POST_CODE: "",
+            CONF_BRAVE_CACHE_MAX_AGE: 120,
+            CONF_BRAVE_NORMALISE_QUERY: True,
+            CONF_BRAVE_FILLER_WORDS: DEFAULT_FILLER_WORDS,
+            CONF_BRAVE_MAX_RETRIES: 2,
+            CONF_BRAVE_RETRY_DEADLINE: 10,
         }
         assert validated == expected_data
 
@@ -139,7 +169,17 @@ class TestSchemaFunctions:
 
         # Test validation
 
-        test_data = {CONF_WIKIPEDIA_NUM_RESULTS: 1}
+        test_data = {
+            CONF_WIKIPEDIA_NUM_RESULTS: 1,
+            CONF_WIKIPEDIA_CACHE_MAX_AGE: 60,
+            CONF_WIKIPEDIA_NORMALISE_QUERY: False,
+            CONF_WIKIPEDIA_FILLER_WORDS: "please, thanks",
+            CONF_WIKIPEDIA_RETRIEVAL_MODE: "summaries",
+            CONF_WIKIPEDIA_SUMMARY_CONCURRENCY: 2,
+            CONF_WIKIPEDIA_SUMMARY_TIMEOUT: 3,
+            CONF_WIKIPEDIA_MAX_RETRIES: 0,
+            CONF_WIKIPEDIA_RETRY_DEADLINE: 5,
+        }
         validated = schema(test_data)
         assert validated == test_data
 
@@ -152,6 +192,66 @@ class TestSchemaFunctions:
         with pytest.raises(vol.Invalid):
             schema({CONF_WIKIPEDIA_NUM_RESULTS: 0})  # Should be >= 1
 
+        with pytest.raises(vol.Invalid):
+            schema(
+                {
+                    CONF_WIKIPEDIA_NUM_RESULTS: 1,
+                    CONF_WIKIPEDIA_CACHE_MAX_AGE: -1,  # Should be >= 0
+                }
+            )
+
+        with pytest.raises(vol.Invalid):
+            schema(
+                {
+                    CONF_WIKIPEDIA_NUM_RESULTS: 1,
+                    CONF_WIKIPEDIA_SUMMARY_CONCURRENCY: 0,  # Should be >= 1
+                }
+            )
+
+        with pytest.raises(vol.Invalid):
+            schema(
+                {
+                    CONF_WIKIPEDIA_NUM_RESULTS: 1,
+                    CONF_WIKIPEDIA_RETRIEVAL_MODE: "html",
+                }
+            )
+
+        with pytest.raises(vol.Invalid):
+            schema(
+                {
+                    CONF_WIKIPEDIA_NUM_RESULTS: 1,
+                    CONF_WIKIPEDIA_MAX_RETRIES: 6,  # Should be <= 5
+                }
+            )
+
+    def test_get_cache_schema(self):
+        """Test the cache schema generation."""
+        schema = get_cache_schema(None)
+        assert isinstance(schema, vol.Schema)
+
+        assert schema({}) == {
+            CONF_CACHE_BACKEND: "sqlite",
+            CONF_CACHE_REDIS_URL: "",
+            CONF_CACHE_MAX_AGE: 120,
+            CONF_CACHE_STALE_MAX_AGE: 0,
+            CONF_CACHE_MAX_SIZE: 20,
+            CONF_CACHE_MAX_ENTRIES: 0,
+            CONF_CACHE_EVICTION_POLICY: "tinylfu",
+            CONF_CACHE_MEMORY_ONLY: False,
+            CONF_CACHE_SIMILARITY_THRESHOLD: 0,
+            CONF_CACHE_REFRESH_BUDGET: 0,
+        }
+        assert schema({CONF_CACHE_STALE_MAX_AGE: 30})[CONF_CACHE_STALE_MAX_AGE] == 30
+
+        with pytest.raises(vol.Invalid):
+            schema({CONF_CACHE_STALE_MAX_AGE: -1})
+
+        with pytest.raises(vol.Invalid):
+            schema({CONF_CACHE_MAX_SIZE: 0})
+
+        with pytest.raises(vol.Invalid):
+            schema({CONF_CACHE_BACKEND: "postgres"})
+
 
 class TestLlmIntentsConfigFlow:
     """Test the LLM Intents config flow."""
@@ -702,6 +802,29 @@ class TestOptionsFlowServiceConfiguration:
         assert result["type"] == FlowResultType.CREATE_ENTRY
         assert result["title"] == ""
 
+    async def test_cache_options_survive_service_step(self, config_entry):
+        """Test that saving a service step keeps the saved cache options."""
+        cache_input = {CONF_CACHE_BACKEND: "sqlite", CONF_CACHE_MAX_ENTRIES: 500}
+        result = await LlmIntentsOptionsFlow(config_entry).async_step_configure_cache(
+            cache_input
+        )
+        assert result["type"] == FlowResultType.CREATE_ENTRY
+        config_entry.options = result["data"]
+
+        options_flow = LlmIntentsOptionsFlow(config_entry)
+        options_flow.hass = Mock()
+        options_flow.hass.config_entries.async_reload = AsyncMock()
+        await options_flow.async_step_configure({"use_brave": True})
+        result = await options_flow.async_step_brave({CONF_BRAVE_NUM_RESULTS: 5})
+
+        assert result["type"] == FlowResultType.CREATE_ENTRY
+        assert result["data"][CONF_BRAVE_NUM_RESULTS] == 5
+        assert result["data"][CONF_CACHE_MAX_ENTRIES] == 500
+
+        # Saving with no services selected keeps them too
+        result = await LlmIntentsOptionsFlow(config_entry).async_step_configure({})
+        assert result["data"][CONF_CACHE_MAX_ENTRIES] == 500
+
 
 class TestConfigFlowErrorHandling:
     """Test error handling in config flow."""
@@ -1103,7 +1226,15 @@ class TestSchemaValidationEdgeCases:
             CONF_BRAVE_POST_CODE: "SW1A 1AA",
         }
         validated = schema(test_data)
-        assert validated == test_data
+        # Schema adds optional fields with default values
+        assert validated == {
+            **test_data,
+            CONF_BRAVE_CACHE_MAX_AGE: 120,
+            CONF_BRAVE_NORMALISE_QUERY: True,
+            CONF_BRAVE_FILLER_WORDS: DEFAULT_FILLER_WORDS,
+            CONF_BRAVE_MAX_RETRIES: 2,
+            CONF_BRAVE_RETRY_DEADLINE: 10,
+        }
 
     def test_get_brave_schema_with_defaults_used(self):
         """Test that Brave schema uses provided defaults correctly."""
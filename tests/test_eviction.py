@@ -0,0 +1,159 @@
+"""Test the cache eviction policies."""
+
+from pathlib import Path
+
+import pytest
+
+from custom_components.llm_intents.eviction import (
+    POLICIES,
+    CountMinSketch,
+    LFUPolicy,
+    LRUPolicy,
+    TinyLFUPolicy,
+)
+
+# A synthetic trace of 4000 assistant-style queries, generated from templates
+# with random.Random(20261017): 55% are drawn from 80 popular queries with
+# Zipf-like weights (1 / rank ** 0.9), the rest are one-off questions, and every
+# 600 queries a burst of 60 one-offs stands in for unrelated browsing
+TRACE = Path(__file__).parent / "fixtures" / "query_trace.txt"
+
+
+def replay(policy, trace: list[str]) -> float:
+    """Return the hit ratio of a policy over a query trace."""
+    hits = 0
+    for query in trace:
+        policy.access(query)
+        if query in policy:
+            hits += 1
+        else:
+            policy.add(query)
+    return hits / len(trace)
+
+
+class TestPolicies:
+    """Test each policy's choice of victim."""
+
+    def test_lru_evicts_least_recently_used(self):
+        """Test that the entry unused for longest is evicted."""
+        policy = LRUPolicy(2)
+        policy.add("a")
+        policy.add("b")
+        policy.access("a")
+
+        assert policy.add("c") == ["b"]
+        assert "a" in policy
+
+    def test_lfu_evicts_least_frequently_used(self):
+        """Test that the least used entry is evicted, oldest first on ties."""
+        policy = LFUPolicy(2)
+        policy.add("a")
+        policy.add("b")
+        policy.access("a")
+        policy.access("a")
+
+        assert policy.add("c") == ["b"]
+        assert policy.add("d") == ["c"]
+
+    def test_tinylfu_rejects_one_off_candidates(self):
+        """Test that a burst of one-off keys does not displace popular ones."""
+        policy = TinyLFUPolicy(10)
+        for key in "abcdefghij":
+            for _ in range(3):
+                policy.access(key)
+            policy.add(key)
+
+        for i in range(50):
+            policy.access(f"once-{i}")
+            policy.add(f"once-{i}")
+
+        assert len(policy) == 10
+        assert sum(key in policy for key in "abcdefghij") == 9
+
+    def test_tinylfu_admits_frequent_newcomer(self):
+        """Test that a key seen often enough displaces a main area entry."""
+        policy = TinyLFUPolicy(3)
+        for key in "abc":
+            policy.access(key)
+            policy.add(key)
+
+        for _ in range(5):
+            policy.access("d")
+        victims = policy.add("d")
+        policy.access("e")
+        victims += policy.add("e")
+
+        assert "d" in policy
+        assert len(policy) == 3
+        assert len(victims) == 2
+
+    def test_refreshing_resident_entry_evicts_nothing(self):
+        """Test that storing a resident key again is not a new admission."""
+        for policy_class in POLICIES.values():
+            policy = policy_class(2)
+            policy.add("a")
+            policy.add("b")
+
+            assert policy.add("a") == []
+            assert len(policy) == 2
+
+    def test_removed_key_is_forgotten(self):
+        """Test that keys expired elsewhere no longer count towards capacity."""
+        for policy_class in POLICIES.values():
+            policy = policy_class(2)
+            policy.add("a")
+            policy.add("b")
+            policy.remove("a")
+
+            assert "a" not in policy
+            assert len(policy) == 1
+
+    def test_restore_keeps_newest(self):
+        """Test that keys restored beyond capacity are evicted oldest first."""
+        keys = [f"k{i}" for i in range(25)]
+        for policy_class in POLICIES.values():
+            policy = policy_class(10)
+
+            assert policy.restore(keys) == keys[:15]
+            assert all(key in policy for key in keys[15:])
+            assert len(policy) == 10
+
+
+class TestCountMinSketch:
+    """Test the frequency sketch used for admission."""
+
+    def test_counts_and_saturates(self):
+        """Test that counts are estimated and capped."""
+        sketch = CountMinSketch(64)
+        for _ in range(3):
+            sketch.increment("a")
+        for _ in range(40):
+            sketch.increment("b")
+
+        assert sketch.frequency("a") >= 3
+        assert sketch.frequency("b") == CountMinSketch.MAX_COUNT
+        assert sketch.frequency("never") <= 1
+
+    def test_counts_age(self):
+        """Test that counts are halved once the sample size is reached."""
+        sketch = CountMinSketch(1)
+        for _ in range(20):
+            sketch.increment("a")
+
+        assert sketch.frequency("a") < CountMinSketch.MAX_COUNT
+
+
+class TestTraceBenchmark:
+    """Compare hit ratios on a synthetic query trace."""
+
+    @pytest.mark.parametrize("capacity", [25, 50, 100])
+    def test_tinylfu_beats_lru(self, capacity):
+        """Test that W-TinyLFU keeps more of the popular queries than LRU."""
+        trace = TRACE.read_text().splitlines()
+        ratios = {
+            name: replay(policy_class(capacity), trace)
+            for name, policy_class in POLICIES.items()
+        }
+
+        assert ratios["tinylfu"] > ratios["lru"] + 0.05, ratios
+        assert ratios["lfu"] > ratios["lru"], ratios
@@ -0,0 +1,238 @@
+"""Test the HTTP client shared by the upstream providers."""
+
+import asyncio
+import itertools
+from unittest.mock import MagicMock
+
+import aiohttp
+import pytest
+from aiohttp import web
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+
+from custom_components.llm_intents.http_client import (
+    Provider,
+    ProviderClient,
+    ProviderError,
+    RetryPolicy,
+    async_close_session,
+    async_get_session,
+)
+from custom_components.llm_intents.metrics import get_metrics, reset_metrics
+
+PROVIDER = Provider(
+    "tests.provider",
+    "Test Provider",
+    aiohttp.ClientTimeout(total=1, connect=1),
+    RetryPolicy(base_delay=0.01, max_delay=0.05),
+)
+
+
+# Numbers the requests made to /flaky, created before the app starts
+FLAKY_REQUESTS = web.AppKey("flaky_requests", itertools.count)
+
+
+async def _ok(request) -> web.Response:
+    return web.json_response({"q": request.query.get("q")})
+
+
+async def _unavailable(request) -> web.Response:
+    return web.Response(status=503, headers={"Retry-After": "30"}, text="busy")
+
+
+async def _flaky(request) -> web.Response:
+    # Fails until it has been asked as many times as the fails parameter
+    if next(request.app[FLAKY_REQUESTS]) <= int(request.query["fails"]):
+        return web.Response(status=503, headers={"Retry-After": "0"})
+    return web.Response(text="ok")
+
+
+async def _slow(request) -> web.Response:
+    await asyncio.sleep(5)
+    return web.Response()
+
+
+@pytest.fixture
+async def server():
+    """Run a local provider for the duration of a test."""
+    app = web.Application()
+    app[FLAKY_REQUESTS] = itertools.count(1)
+    app.router.add_get("/ok", _ok)
+    app.router.add_get("/unavailable", _unavailable)
+    app.router.add_get("/slow", _slow)
+    app.router.add_route("*", "/flaky", _flaky)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    yield f"http://127.0.0.1:{port}"
+    await runner.cleanup()
+
+
+@pytest.fixture
+async def hass():
+    """Mock hass holding the shared session."""
+    hass = MagicMock()
+    hass.data = {}
+    reset_metrics()
+    yield hass
+    await async_close_session(hass)
+    reset_metrics()
+
+
+@pytest.mark.usefixtures("socket_enabled")
+class TestProviderClient:
+    """Test requests, error mapping and timing."""
+
+    async def test_response_is_read_and_timed(self, hass, server):
+        """Test that the body is read and the request recorded."""
+        client = ProviderClient(hass, PROVIDER)
+
+        resp = await client.get(f"{server}/ok", params={"q": "paris"})
+
+        assert resp.status == 200
+        assert resp.json() == {"q": "paris"}
+        metrics = get_metrics("tests.provider")
+        assert metrics.requests == 1
+        assert metrics.request_errors == 0
+        assert len(metrics.request_latency) == 1
+
+    async def test_error_status_is_returned(self, hass, server):
+        """Test that HTTP errors are returned with their headers and counted."""
+        client = ProviderClient(hass, PROVIDER)
+
+        resp = await client.get(f"{server}/unavailable")
+
+        assert resp.status == 503
+        assert resp.headers["retry-after"] == "30"
+        assert resp.text() == "busy"
+        assert get_metrics("tests.provider").request_errors == 1
+
+    async def test_timeout_raises_provider_error(self, hass, server):
+        """Test that a slow provider is abandoned after its timeout."""
+        client = ProviderClient(hass, PROVIDER)
+        timeout = aiohttp.ClientTimeout(total=0.1)
+
+        with pytest.raises(ProviderError, match=r"did not respond within 0\.1s"):
+            await client.get(f"{server}/slow", request_timeout=timeout)
+        assert get_metrics("tests.provider").request_errors == 1
+
+    async def test_connection_failure_raises_provider_error(self, hass, server):
+        """Test that an unreachable provider raises a ProviderError."""
+        client = ProviderClient(hass, PROVIDER)
+
+        with pytest.raises(ProviderError, match="Could not reach Test Provider"):
+            await client.get("http://127.0.0.1:1/")
+
+    async def test_session_is_shared_until_closed(self, hass, server):
+        """Test that every provider reuses one session and its connections."""
+        session = async_get_session(hass)
+        await ProviderClient(hass, PROVIDER).get(f"{server}/ok")
+
+        assert async_get_session(hass) is session
+        await async_close_session(hass)
+        assert session.closed
+        assert async_get_session(hass) is not session
+
+    async def test_session_is_closed_on_shutdown(self, hass):
+        """Test that the session is closed when Home Assistant stops."""
+        session = async_get_session(hass)
+
+        event, listener = hass.bus.async_listen_once.call_args.args
+        assert event == EVENT_HOMEASSISTANT_CLOSE
+        await listener(None)
+        assert session.closed
+
+
+@pytest.mark.usefixtures("socket_enabled")
+class TestRetries:
+    """Test retrying transient failures."""
+
+    async def test_transient_errors_are_retried(self, hass, server):
+        """Test that retryable statuses are retried until one succeeds."""
+        client = ProviderClient(hass, PROVIDER)
+
+        resp = await client.get(f"{server}/flaky", params={"fails": 2})
+
+        assert resp.status == 200
+        metrics = get_metrics("tests.provider")
+        assert metrics.requests == 3
+        assert metrics.request_retries == 2
+
+    async def test_retries_are_limited(self, hass, server):
+        """Test that the last response is returned once retries run out."""
+        client = ProviderClient(hass, PROVIDER, retries=1)
+
+        resp = await client.get(f"{server}/flaky", params={"fails": 5})
+
+        assert resp.status == 503
+        assert get_metrics("tests.provider").requests == 2
+
+    async def test_long_retry_after_is_not_waited_for(self, hass, server):
+        """Test that a Retry-After longer than the policy allows ends retrying."""
+        client = ProviderClient(hass, PROVIDER)
+
+        resp = await client.get(f"{server}/unavailable")
+
+        assert resp.status == 503
+        assert get_metrics("tests.provider").request_retries == 0
+
+    async def test_non_idempotent_requests_are_not_retried(self, hass, server):
+        """Test that POSTs are only retried when marked idempotent."""
+        client = ProviderClient(hass, PROVIDER)
+        url = f"{server}/flaky?fails=2"
+
+        assert (await client.post(url)).status == 503
+        assert (await client.post(url, idempotent=True)).status == 200
+        assert get_metrics("tests.provider").request_retries == 1
+
+    async def test_connection_failures_are_retried(self, hass):
+        """Test that connection failures are retried before being raised."""
+        client = ProviderClient(hass, PROVIDER, retries=2)
+
+        with pytest.raises(ProviderError):
+            await client.get("http://127.0.0.1:1/")
+        assert get_metrics("tests.provider").requests == 3
+
+    async def test_deadline_stops_retries(self, hass, server):
+        """Test that no retry is started that could not finish by the deadline."""
+        client = ProviderClient(hass, PROVIDER, retries=5, deadline=0.2)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(ProviderError):
+            await client.get(f"{server}/slow")
+
+        assert loop.time() - start < 0.5
+        assert get_metrics("tests.provider").requests == 1
+
+    async def test_deadline_is_shared_by_requests(self, hass, server):
+        """Test that sequential requests share one deadline, for the whole call."""
+        client = ProviderClient(hass, PROVIDER, retries=5, deadline=0.2)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        assert (await client.get(f"{server}/ok")).status == 200
+        with pytest.raises(ProviderError):
+            await client.get(f"{server}/slow")
+        with pytest.raises(ProviderError):
+            await client.get(f"{server}/ok")
+
+        assert loop.time() - start < 0.5
+        assert get_metrics("tests.provider").requests == 2
+        assert (await client.renewed().get(f"{server}/ok")).status == 200
+
+
+class TestRetryPolicy:
+    """Test the backoff between retries."""
+
+    def test_backoff_is_capped_and_jittered(self):
+        """Test that waits grow exponentially up to the maximum, with jitter."""
+        policy = RetryPolicy(base_delay=0.5, max_delay=2)
+
+        first = [policy.backoff(1) for _ in range(100)]
+        late = [policy.backoff(10) for _ in range(100)]
+
+        assert all(0 <= delay <= 0.5 for delay in first)
+        assert all(0 <= delay <= 2 for delay in late)
+        assert len(set(late)) > 1
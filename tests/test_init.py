@@ -1,9 +1,11 @@
 """Test the LLM Intents integration."""
 
-from unittest.mock import Mock, patch
+import sqlite3
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
 from homeassistant.core import HomeAssistant
 
 from custom_components.llm_intents import (
@@ -12,6 +14,15 @@ from custom_components.llm_intents import (
     async_setup_entry,
     async_unload_entry,
 )
+from custom_components.llm_intents.cache import SQLiteCache
+from custom_components.llm_intents.const import CACHE_DB_NAME
+from custom_components.llm_intents.services import (
+    SERVICE_CACHE_STATS,
+    SERVICE_CLEAR_CACHE,
+    SERVICE_EXPORT_CACHE,
+    SERVICE_IMPORT_CACHE,
+    SERVICE_WARM_CACHE,
+)
 
 
 class TestLlmIntentsIntegration:
@@ -22,6 +33,7 @@ class TestLlmIntentsIntegration:
         """Create a mock Home Assistant instance."""
         hass = Mock(spec=HomeAssistant)
         hass.data = {}
+        hass.services = Mock()
         return hass
 
     @pytest.fixture
@@ -42,6 +54,16 @@ class TestLlmIntentsIntegration:
 
         assert result is True
         assert DOMAIN in hass.data
+        registered = {
+            call.args[:2] for call in hass.services.async_register.call_args_list
+        }
+        assert registered == {
+            (DOMAIN, SERVICE_CLEAR_CACHE),
+            (DOMAIN, SERVICE_CACHE_STATS),
+            (DOMAIN, SERVICE_WARM_CACHE),
+            (DOMAIN, SERVICE_EXPORT_CACHE),
+            (DOMAIN, SERVICE_IMPORT_CACHE),
+        }
 
     async def test_async_setup_entry(self, hass, config_entry):
         """Test setting up a config entry."""
@@ -63,6 +85,36 @@ class TestLlmIntentsIntegration:
             # Verify update listener was added
             config_entry.async_on_unload.assert_called_once()
 
+    async def test_cache_flushed_on_stop(self, hass, config_entry, tmp_path):
+        """Test that writes awaiting commit are flushed when Home Assistant stops."""
+        hass.config = Mock()
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        hass.async_create_background_task = lambda coro, **_: coro.close()
+        hass.bus = Mock()
+        hass.config_entries = Mock()
+        hass.config_entries.async_forward_entry_setups = AsyncMock()
+        config_entry.options = {}
+        SQLiteCache._instance = None
+
+        with (
+            patch("custom_components.llm_intents.setup_llm_functions"),
+            patch("custom_components.llm_intents.cache.async_track_time_interval"),
+            patch("custom_components.llm_intents.cache.async_call_later"),
+        ):
+            await async_setup_entry(hass, config_entry)
+            await SQLiteCache().async_set("tool", {"q": "test"}, {"results": ["a"]})
+
+        event, listener = hass.bus.async_listen_once.call_args.args
+        assert event == EVENT_HOMEASSISTANT_STOP
+        await listener(None)
+
+        conn = sqlite3.connect(tmp_path / ".storage" / CACHE_DB_NAME)
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 1
+        finally:
+            conn.close()
+        SQLiteCache._instance = None
+
     async def test_async_unload_entry(self, hass, config_entry):
         """Test unloading a config entry."""
         # Set up initial data as it would be after setup
@@ -0,0 +1,74 @@
+"""Test the tool performance metrics."""
+
+import pytest
+
+from custom_components.llm_intents.metrics import (
+    get_metrics,
+    percentile,
+    record_lookup,
+    reset_metrics,
+    track_tool_call,
+    track_upstream_call,
+)
+
+
+@track_tool_call
+async def tool_call(response):
+    """Return the given response as a tool would."""
+    return response
+
+
+@track_upstream_call
+async def upstream_call(exception):
+    """Fail as an upstream API would."""
+    raise exception
+
+
+class TestMetrics:
+    """Test the per-tool counters and latency tracking."""
+
+    @pytest.fixture(autouse=True)
+    def clean_metrics(self):
+        """Start every test from empty metrics."""
+        reset_metrics()
+        yield
+        reset_metrics()
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        samples = list(range(1, 101))
+
+        assert percentile(samples, 50) == 50
+        assert percentile(samples, 95) == 95
+        assert percentile([7], 95) == 7
+        assert percentile([], 50) is None
+
+    async def test_tool_calls_recorded_against_module(self):
+        """Test that calls, errors and latency are keyed by the tool module."""
+        await tool_call({"results": []})
+        await tool_call({"error": "Search error: 500"})
+
+        metrics = get_metrics(__name__)
+        assert metrics.calls == 2
+        assert metrics.errors == 1
+        assert len(metrics.call_latency) == 2
+        assert metrics.upstream_calls == 0
+
+    async def test_upstream_exception_counted_as_error(self):
+        """Test that a raising upstream call is still recorded."""
+        with pytest.raises(TimeoutError):
+            await upstream_call(TimeoutError())
+
+        metrics = get_metrics(__name__)
+        assert metrics.upstream_calls == 1
+        assert metrics.upstream_errors == 1
+        assert len(metrics.upstream_latency) == 1
+
+    def test_normalised_hits_only_count_new_phrasings(self):
+        """Test that hits the query as asked would have had are not counted."""
+        record_lookup(__name__, {"q": "paris"}, normalised=False, hit=False)
+        record_lookup(__name__, {"q": "Paris?"}, normalised=True, hit=True)
+        record_lookup(__name__, {"q": "Paris?"}, normalised=True, hit=True)
+        record_lookup(__name__, {"q": "paris"}, normalised=False, hit=True)
+
+        assert get_metrics(__name__).normalised_hits == 1
@@ -0,0 +1,83 @@
+"""Test the search query normalisation."""
+
+import pytest
+
+from custom_components.llm_intents.normalise import (
+    QueryRules,
+    filler_words,
+    normalise_query,
+)
+
+
+class TestNormaliseQuery:
+    """Test canonicalising queries for cache lookups."""
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            "Weather in Paris",
+            "weather in paris ",
+            "weather in Paris?",
+            "  WEATHER   in\tParis!!",
+            "weather in paris please",
+        ],
+    )
+    def test_equivalent_queries_share_a_form(self, query):
+        """Test that trivially different phrasings normalise identically."""
+        assert normalise_query(query, QueryRules()) == "weather in paris"
+
+    def test_unicode_compatibility_forms(self):
+        """Test that full-width characters and ligatures are folded."""
+        # "Eiffel Tower?" in full-width letters and punctuation
+        full_width = "\uff25\uff49\uff46\uff46\uff45\uff4c Tower\uff1f"
+        assert normalise_query(full_width, QueryRules()) == "eiffel tower"
+        assert normalise_query("ﬁsh and chips", QueryRules()) == "fish and chips"
+        assert normalise_query("Straße", QueryRules()) == "strasse"
+
+    def test_meaningful_symbols_are_kept(self):
+        """Test that only sentence punctuation is trimmed."""
+        assert normalise_query("learn C#", QueryRules()) == "learn c#"
+        assert normalise_query("what is C++?", QueryRules()) == "what is c++"
+
+    @pytest.mark.parametrize(
+        ("query", "other"),
+        [
+            ("Vitamin A", "vitamin"),
+            ("Hepatitis A", "hepatitis"),
+            ("What is on", "what is"),
+            ("Things to do in", "things to do"),
+        ],
+    )
+    def test_distinct_queries_stay_distinct(self, query, other):
+        """Test that trailing letters and prepositions are not trimmed by default."""
+        rules = QueryRules()
+
+        assert normalise_query(query, rules) != normalise_query(other, rules)
+
+    def test_single_letters_are_never_trimmed(self):
+        """Test that a configured filler word of one letter is kept."""
+        rules = QueryRules(stopwords=filler_words("a, please"))
+
+        assert normalise_query("vitamin a please", rules) == "vitamin a"
+
+    def test_never_trims_to_nothing(self):
+        """Test that a lone stopword or punctuation is kept."""
+        assert normalise_query("The", QueryRules()) == "the"
+        assert normalise_query("?", QueryRules()) == "?"
+
+    def test_rules_can_be_relaxed(self):
+        """Test that each step can be disabled per tool."""
+        rules = QueryRules(
+            casefold=False, strip_punctuation=False, stopwords=frozenset()
+        )
+
+        assert normalise_query("  Weather in  Paris? ", rules) == "Weather in Paris?"
+
+    def test_filler_words_from_options(self):
+        """Test that a tool's configured filler words replace the defaults."""
+        rules = QueryRules(stopwords=filler_words(" Near,me , ,"))
+
+        assert rules.stopwords == {"near", "me"}
+        assert normalise_query("pizza near me", rules) == "pizza"
+        assert normalise_query("pizza in", rules) == "pizza in"
+        assert filler_words("") == frozenset()
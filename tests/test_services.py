@@ -0,0 +1,126 @@
+"""Test the cache management services."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from homeassistant.exceptions import ServiceValidationError
+
+from custom_components.llm_intents.backends import SQLiteBackend
+from custom_components.llm_intents.BraveSearch import SearchWebTool
+from custom_components.llm_intents.cache import SQLiteCache
+from custom_components.llm_intents.const import (
+    CONF_BRAVE_ENABLED,
+    CONF_WIKIPEDIA_ENABLED,
+    DOMAIN,
+)
+from custom_components.llm_intents.services import (
+    WARM_CACHE_SCHEMA,
+    async_cache_stats,
+    async_clear_cache,
+    async_export_cache,
+    async_import_cache,
+    async_warm_cache,
+)
+from custom_components.llm_intents.Wikipedia import SearchWikipediaTool
+
+
+class TestServices:
+    """Test the clear, stats and warm services."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create a fresh cache instance backed by a temporary database."""
+        SQLiteCache._instance = None
+        cache = SQLiteCache()
+        cache._backend = SQLiteBackend(str(tmp_path / "cache.db"))
+        yield cache
+        cache._backend._executor.shutdown(wait=True)
+        SQLiteCache._instance = None
+
+    @pytest.fixture
+    def hass(self):
+        """Mock hass with Brave enabled and Wikipedia disabled."""
+        hass = MagicMock()
+        hass.data = {DOMAIN: {"config": {CONF_BRAVE_ENABLED: True}}}
+        entry = MagicMock()
+        entry.options = {CONF_WIKIPEDIA_ENABLED: False}
+        hass.config_entries.async_entries.return_value = [entry]
+        return hass
+
+    def make_call(self, hass, data):
+        """Build a service call with the given data."""
+        call = MagicMock()
+        call.hass = hass
+        call.data = data
+        return call
+
+    async def test_clear_cache_for_tool(self, cache, hass):
+        """Test that a tool name clears only that tool's entries."""
+        await cache.async_set(SearchWebTool.__module__, {"q": "a"}, {"r": 1})
+        await cache.async_set(SearchWikipediaTool.__module__, {"q": "a"}, {"r": 2})
+
+        await async_clear_cache(self.make_call(hass, {"tool": "search_web"}))
+
+        assert await cache.async_get(SearchWebTool.__module__, {"q": "a"}) is None
+        assert await cache.async_get(SearchWikipediaTool.__module__, {"q": "a"}) == {
+            "r": 2
+        }
+
+    async def test_cache_stats(self, cache, hass):
+        """Test that stats are reported per tool name."""
+        await cache.async_set(SearchWebTool.__module__, {"q": "a"}, {"r": 1})
+        await cache.async_get(SearchWebTool.__module__, {"q": "a"})
+        await cache.async_get(SearchWebTool.__module__, {"q": "b"})
+
+        response = await async_cache_stats(self.make_call(hass, {}))
+
+        assert response["tools"]["search_web"]["hits"] == 1
+        assert response["tools"]["search_web"]["misses"] == 1
+        assert response["tools"]["search_web"]["hit_ratio"] == 0.5
+        assert response["tools"]["search_web"]["entries"] == 1
+        assert response["entries"] == 1
+
+    async def test_warm_cache_runs_enabled_tools(self, hass):
+        """Test that each query is run through every enabled tool."""
+        data = WARM_CACHE_SCHEMA({"queries": ["a", "b", "c"]})
+
+        with patch.object(
+            SearchWebTool,
+            "async_call",
+            AsyncMock(side_effect=[{"results": []}, {"results": []}, {"error": "x"}]),
+        ) as mock_call:
+            response = await async_warm_cache(self.make_call(hass, data))
+
+        assert mock_call.call_count == 3
+        assert response["warmed"] == 2
+        assert response["failed"] == [
+            {"tool": "search_web", "query": "c", "error": "x"}
+        ]
+
+    async def test_warm_cache_rejects_disabled_tool(self, hass):
+        """Test that explicitly requesting a disabled tool is an error."""
+        data = WARM_CACHE_SCHEMA({"queries": ["a"], "tools": ["search_wikipedia"]})
+
+        with pytest.raises(ServiceValidationError):
+            await async_warm_cache(self.make_call(hass, data))
+
+    async def test_export_and_import_cache(self, cache, hass, tmp_path):
+        """Test that a snapshot written to an allowed path can be loaded back."""
+        hass.config.is_allowed_path.return_value = True
+        path = str(tmp_path / "snapshot.jsonl.gz")
+        await cache.async_set(SearchWebTool.__module__, {"q": "a"}, {"r": 1})
+
+        response = await async_export_cache(self.make_call(hass, {"path": path}))
+        assert response == {"path": path, "exported": 1}
+
+        await cache.async_clear()
+        response = await async_import_cache(self.make_call(hass, {"path": path}))
+        assert response == {"path": path, "imported": 1, "skipped": 0}
+        assert await cache.async_get(SearchWebTool.__module__, {"q": "a"}) == {"r": 1}
+
+    async def test_snapshot_path_must_be_allowed(self, cache, hass):
+        """Test that snapshots are not written outside the allowlisted directories."""
+        hass.config.is_allowed_path.return_value = False
+
+        with pytest.raises(ServiceValidationError):
+            await async_export_cache(self.make_call(hass, {"path": "/etc/snapshot"}))
@@ -0,0 +1,51 @@
+"""Test the similar query index."""
+
+from custom_components.llm_intents.similarity import SimilarityIndex, query_grams
+
+
+class TestSimilarityIndex:
+    """Test trigram matching of cached queries."""
+
+    def test_grams_ignore_word_order_and_case(self):
+        """Test that reordered words produce the same trigrams."""
+        assert query_grams("Prime Minister Australia") == query_grams(
+            "australia prime minister"
+        )
+
+    def test_finds_most_similar_query(self):
+        """Test that the closest query above the threshold is returned."""
+        index = SimilarityIndex()
+        index.add("k1", "scope", "australian prime minister")
+        index.add("k2", "scope", "australian cricket team")
+
+        key, query, score = index.search(
+            "scope", "current australian prime minister", 0.6
+        )
+
+        assert key == "k1"
+        assert query == "australian prime minister"
+        assert 0.6 <= score < 1
+
+    def test_threshold_rejects_weak_matches(self):
+        """Test that unrelated queries do not match."""
+        index = SimilarityIndex()
+        index.add("k1", "scope", "weather in paris")
+
+        assert index.search("scope", "weather in perth", 0.8) is None
+
+    def test_partitions_are_isolated(self):
+        """Test that queries only match within the same partition."""
+        index = SimilarityIndex()
+        index.add("k1", "one", "weather in paris")
+
+        assert index.search("two", "weather in paris", 0.5) is None
+
+    def test_discard_removes_postings(self):
+        """Test that discarded entries no longer match or use memory."""
+        index = SimilarityIndex()
+        index.add("k1", "scope", "weather in paris")
+        index.discard("k1")
+
+        assert len(index) == 0
+        assert index.search("scope", "weather in paris", 0.5) is None
+        assert not index._postings
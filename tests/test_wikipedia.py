@@ -0,0 +1,344 @@
+"""Test the Wikipedia search tool."""
+
+# The search is tested below the tool call, through its private steps
+# ruff: noqa: SLF001
+
+import asyncio
+import json
+import urllib.parse
+from unittest.mock import Mock, patch
+
+import pytest
+
+from custom_components.llm_intents.backends import SQLiteBackend
+from custom_components.llm_intents.cache import SQLiteCache
+from custom_components.llm_intents.const import (
+    CONF_WIKIPEDIA_NUM_RESULTS,
+    CONF_WIKIPEDIA_RETRIEVAL_MODE,
+    DOMAIN,
+)
+from custom_components.llm_intents.http_client import ProviderError, ProviderResponse
+from custom_components.llm_intents.Wikipedia import API_URL, SearchWikipediaTool
+
+WIKIPEDIA = SearchWikipediaTool.__module__
+
+
+def _response(body=None, status=200, headers=None) -> ProviderResponse:
+    return ProviderResponse(status, headers or {}, json.dumps(body or {}).encode())
+
+
+class NotModified(ProviderResponse):
+    """A 304 response that fails the test if its body is read."""
+
+    def __init__(self, headers) -> None:
+        """Answer with no body and the given headers."""
+        super().__init__(304, headers, b"")
+
+    def json(self):
+        """Fail, as the body of a 304 is empty."""
+        msg = "the body of a 304 should not be read"
+        raise AssertionError(msg)
+
+
+def _search_params(query) -> dict:
+    return {
+        "action": "query",
+        "format": "json",
+        "formatversion": 2,
+        "generator": "search",
+        "gsrsearch": query,
+        "gsrlimit": 3,
+        "prop": "extracts",
+        "exintro": 1,
+        "explaintext": 1,
+        "exlimit": 3,
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Back the shared cache with a temporary database."""
+    SQLiteCache._instance = None
+    cache = SQLiteCache()
+    cache._backend = SQLiteBackend(str(tmp_path / "cache.db"))
+    yield cache
+    cache._backend._executor.shutdown(wait=True)
+    SQLiteCache._instance = None
+
+
+class FakeClient:
+    """Answers Wikipedia requests from canned pages, recording each request."""
+
+    def __init__(
+        self, searches=None, extracts=None, summaries=None, delays=None
+    ) -> None:
+        """Answer from the given pages, delaying summaries as given."""
+        # Search pages by query, extracts by page id, REST summaries by title
+        self.searches = searches or {}
+        self.extracts = extracts or {}
+        self.summaries = summaries or {}
+        # Seconds each REST summary takes, by title
+        self.delays = delays or {}
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get(self, url, params=None, headers=None, request_timeout=None):
+        """Answer a search, extracts or REST summary request."""
+        self.requests.append((url, params or {}, headers or {}))
+        if url != API_URL:
+            title = urllib.parse.unquote(url.rsplit("/", 1)[1])
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(self.delays.get(title, 0))
+            finally:
+                self.in_flight -= 1
+
+            response = self.summaries.get(title, _response(status=404))
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        if "pageids" in params:
+            pages = [
+                {"pageid": int(pageid), "extract": self.extracts.get(int(pageid), "")}
+                for pageid in params["pageids"].split("|")
+            ]
+            return _response({"query": {"pages": pages}})
+
+        if "srsearch" in params:
+            return _response({"query": {"search": self.searches[params["srsearch"]]}})
+        return _response({"query": {"pages": self.searches[params["gsrsearch"]]}})
+
+    def urls(self):
+        """Return the URLs requested, in order."""
+        return [url for url, _, _ in self.requests]
+
+
+@pytest.mark.usefixtures("cache")
+class TestExtractsMode:
+    """Test searching with extracts returned by the search itself."""
+
+    async def _search(self, client, query) -> dict:
+        params = _search_params(query)
+        return await SearchWikipediaTool()._async_search(
+            client, query, params, params, "gsrsearch", 60, 2, 5
+        )
+
+    async def test_pages_are_ordered_by_search_rank(self):
+        """Test that unordered generator pages are returned by their index."""
+        client = FakeClient(
+            searches={
+                "paris": [
+                    {"index": 2, "pageid": 2, "title": "Paris Hilton", "extract": "B"},
+                    {"index": 1, "pageid": 1, "title": "Paris", "extract": "A"},
+                ]
+            }
+        )
+
+        response = await self._search(client, "paris")
+
+        assert response == {
+            "results": [
+                {"title": "Paris", "summary": "A"},
+                {"title": "Paris Hilton", "summary": "B"},
+            ]
+        }
+        assert client.urls() == [API_URL]
+
+    async def test_page_without_extract_uses_rest_summary(self):
+        """Test that a page with no extract falls back to its REST summary."""
+        client = FakeClient(
+            searches={"louvre": [{"index": 1, "pageid": 7, "title": "Louvre"}]},
+            summaries={"Louvre": _response({"extract": "A museum"})},
+        )
+
+        response = await self._search(client, "louvre")
+
+        assert response == {"results": [{"title": "Louvre", "summary": "A museum"}]}
+        assert client.urls()[-1].endswith("/page/summary/Louvre")
+
+    async def test_missing_summary_falls_back_to_title(self):
+        """Test that a page with neither an extract nor a summary keeps its title."""
+        client = FakeClient(
+            searches={"louvre": [{"index": 1, "pageid": 7, "title": "Louvre"}]}
+        )
+
+        response = await self._search(client, "louvre")
+
+        assert response == {"results": [{"title": "Louvre", "summary": "Louvre"}]}
+
+
+@pytest.mark.usefixtures("cache")
+class TestSummariesMode:
+    """Test searching for titles and fetching each summary separately."""
+
+    async def _search(self, client, query) -> dict:
+        params = {
+            "action": "query",
+            "format": "json",
+            "list": "search",
+            "srsearch": query,
+            "srlimit": 3,
+        }
+        return await SearchWikipediaTool()._async_search(
+            client, query, params, params, "srsearch", 60, 2, 5
+        )
+
+    async def test_article_is_shared_between_queries(self):
+        """Test that a page found by another query reuses its cached summary."""
+        page = {"pageid": 7, "title": "Louvre", "snippet": "The <b>Louvre</b>"}
+        client = FakeClient(
+            searches={"louvre": [page], "paris museum": [page]},
+            summaries={"Louvre": _response({"extract": "A museum"})},
+        )
+
+        first = await self._search(client, "louvre")
+        second = await self._search(client, "paris museum")
+
+        assert (
+            first == second == {"results": [{"title": "Louvre", "summary": "A museum"}]}
+        )
+        assert client.urls() == [
+            API_URL,
+            "https://en.wikipedia.org/api/rest_v1/page/summary/Louvre",
+            API_URL,
+        ]
+
+
+class TestLookups:
+    """Test how searches are counted in the cache stats."""
+
+    @pytest.mark.parametrize("mode", ["extracts", "summaries"])
+    async def test_search_is_one_lookup(self, cache, mode):
+        """Test that a search counts once, however many articles it finds."""
+        pages = [
+            {"index": 1, "pageid": 7, "title": "Louvre", "snippet": "The Louvre"},
+            {"index": 2, "pageid": 8, "title": "Louvre Pyramid", "snippet": "A"},
+        ]
+        client = FakeClient(
+            searches={"louvre": pages},
+            summaries={
+                "Louvre": _response({"extract": "A museum"}),
+                "Louvre Pyramid": _response({"extract": "A pyramid"}),
+            },
+        )
+        hass = Mock()
+        hass.data = {
+            DOMAIN: {
+                "config": {
+                    CONF_WIKIPEDIA_RETRIEVAL_MODE: mode,
+                    CONF_WIKIPEDIA_NUM_RESULTS: 2,
+                }
+            }
+        }
+        hass.config_entries.async_entries.return_value = [Mock(options={})]
+        tool_input = Mock(tool_args={"query": "louvre"})
+
+        with patch(f"{WIKIPEDIA}.ProviderClient", return_value=client):
+            for _ in range(2):
+                await SearchWikipediaTool().async_call(hass, tool_input, None)
+
+        stats = cache.stats[WIKIPEDIA]
+        assert (stats.hits, stats.misses) == (1, 1)
+
+
+@pytest.mark.usefixtures("cache")
+class TestSummaries:
+    """Test fetching the summaries of the articles found by a search."""
+
+    async def _results(self, client, titles, concurrency=2) -> dict:
+        articles = [
+            {"id": title, "title": title, "snippet": f"{title} snippet"}
+            for title in titles
+        ]
+        return await SearchWikipediaTool()._async_results(
+            client,
+            articles,
+            {},
+            use_extracts=False,
+            cache_max_age=60,
+            summary_concurrency=concurrency,
+            summary_timeout=5,
+        )
+
+    async def test_concurrency_is_capped(self):
+        """Test that no more summaries are fetched at once than allowed."""
+        titles = [f"Article {i}" for i in range(6)]
+        client = FakeClient(
+            summaries={title: _response({"extract": title}) for title in titles},
+            delays=dict.fromkeys(titles, 0.01),
+        )
+
+        await self._results(client, titles, concurrency=2)
+
+        assert len(client.requests) == 6
+        assert client.max_in_flight == 2
+
+    async def test_order_is_preserved(self):
+        """Test that results keep the search order, whichever summary is first."""
+        client = FakeClient(
+            summaries={
+                "Slow": _response({"extract": "slow"}),
+                "Fast": _response({"extract": "fast"}),
+            },
+            delays={"Slow": 0.05},
+        )
+
+        response = await self._results(client, ["Slow", "Fast"])
+
+        assert response == {
+            "results": [
+                {"title": "Slow", "summary": "slow"},
+                {"title": "Fast", "summary": "fast"},
+            ]
+        }
+
+    async def test_timed_out_summary_uses_snippet(self):
+        """Test that a summary that times out falls back to the search snippet."""
+        client = FakeClient(
+            summaries={
+                "Slow": ProviderError("Wikipedia did not respond within 5s"),
+                "Fast": _response({"extract": "fast"}),
+            }
+        )
+
+        response = await self._results(client, ["Slow", "Fast"])
+
+        assert response == {
+            "results": [
+                {"title": "Slow", "summary": "Slow snippet"},
+                {"title": "Fast", "summary": "fast"},
+            ]
+        }
+
+    async def test_stale_article_is_revalidated(self, cache):
+        """Test that a stale summary is revalidated with its validators on a 304."""
+        validators = {
+            "ETag": '"v1"',
+            "Last-Modified": "Wed, 21 Oct 2026 07:28:00 GMT",
+        }
+        client = FakeClient(
+            summaries={
+                "Louvre": _response(
+                    {"extract": "A museum"},
+                    headers={**validators, "Cache-Control": "max-age=0"},
+                )
+            }
+        )
+        await self._results(client, ["Louvre"])
+
+        client.summaries["Louvre"] = NotModified({"Cache-Control": "max-age=3600"})
+        response = await self._results(client, ["Louvre"])
+
+        assert response == {"results": [{"title": "Louvre", "summary": "A museum"}]}
+        _, _, headers = client.requests[-1]
+        assert headers == {
+            "If-None-Match": validators["ETag"],
+            "If-Modified-Since": validators["Last-Modified"],
+        }
+        assert cache.stats[WIKIPEDIA].revalidations == 1
+        entry, fresh = await cache.async_get_entry(WIKIPEDIA, {"article": "Louvre"})
+        assert fresh
+        assert entry["extract"] == "A museum"